@@ -0,0 +1,160 @@
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from testbench.context import CAPACITY_SEARCH_MODES, Context
+from testbench.integration import (
+    HasExpectedAddressTest,
+    IntegrationTest,
+    IntegrationTestResult,
+    IntegrationTestsRunner,
+    WiFiConnectionTest,
+)
+from testbench.utils.stats import Distribution
+from testbench.utils.wlan import WirelessDevice
+
+logger = Context.logger
+
+RAMP, BISECT = CAPACITY_SEARCH_MODES
+
+
+@dataclass(kw_only=True)
+class CapacityLevel:
+    """integration tests outcome with a given number of concurrent devices"""
+
+    nb_devices: int
+    nb_tests: int
+    nb_passed: int
+    # association durations of devices that connected
+    connect_times: list[float] = field(default_factory=list[float])
+    # DHCP lease wait of devices that got a valid address
+    lease_times: list[float] = field(default_factory=list[float])
+    duration: float = 0.0
+
+    @property
+    def pass_rate(self) -> float:
+        return self.nb_passed / self.nb_tests if self.nb_tests else 0.0
+
+    @property
+    def connect(self) -> Distribution:
+        return Distribution.of(self.connect_times)
+
+    @property
+    def lease(self) -> Distribution:
+        return Distribution.of(self.lease_times)
+
+    @classmethod
+    def from_runner(cls, runner: IntegrationTestsRunner) -> "CapacityLevel":
+        level = cls(
+            nb_devices=runner.nb_devices,
+            nb_tests=runner.nb_tests,
+            nb_passed=runner.nb_sucessful_tests,
+            duration=runner.duration,
+        )
+        for results in runner.results.values():
+            if result := results.get(WiFiConnectionTest.name):
+                level.connect_times.append(result.duration)
+            if result := results.get(HasExpectedAddressTest.name):
+                level.lease_times.append(result.duration)
+        return level
+
+
+def run_integration_level(
+    devices: list[WirelessDevice],
+    collection: list[type[IntegrationTest]],
+    params: dict[str, Any],
+    on_results: Callable[[list[IntegrationTestResult]], None] | None = None,
+) -> CapacityLevel:
+    """run the integration tests collection over all devices at once"""
+    runner = IntegrationTestsRunner(
+        devices=devices, collection=collection, params=params, on_results=on_results
+    )
+    runner.run()
+    return CapacityLevel.from_runner(runner)
+
+
+@dataclass(kw_only=True)
+class CapacityReport:
+    threshold: float
+    # all measured levels, by number of devices
+    levels: dict[int, CapacityLevel] = field(default_factory=dict[int, CapacityLevel])
+
+    @property
+    def capacity(self) -> int:
+        """largest number of devices meeting the threshold (0 if none)"""
+        return max(
+            (
+                nb_devices
+                for nb_devices, level in self.levels.items()
+                if level.pass_rate >= self.threshold
+            ),
+            default=0,
+        )
+
+    @property
+    def curve(self) -> list[CapacityLevel]:
+        return [self.levels[nb_devices] for nb_devices in sorted(self.levels)]
+
+
+class CapacitySearch:
+    """Searches the largest number of concurrent devices passing integration tests
+
+    - ramp: step, 2*step… until a level falls below threshold (or all devices)
+    - bisect: all devices first then halves the [passing, failing] interval.
+      Assumes pass rate decreases with the number of devices
+
+    `reset` is called before every level so each one starts disconnected"""
+
+    def __init__(
+        self,
+        devices: list[WirelessDevice],
+        run_level: Callable[[list[WirelessDevice]], CapacityLevel],
+        reset: Callable[[], Any],
+        *,
+        threshold: float,
+        mode: str = RAMP,
+        step: int = 1,
+    ):
+        if mode not in CAPACITY_SEARCH_MODES:
+            raise ValueError(f"Unknown capacity search mode: {mode}")
+        self.devices = devices
+        self.run_level = run_level
+        self.reset = reset
+        self.mode = mode
+        self.step = max(step, 1)
+        self.report = CapacityReport(threshold=threshold)
+
+    def measure(self, nb_devices: int) -> bool:
+        """whether nb_devices meet the threshold"""
+        if nb_devices not in self.report.levels:
+            self.reset()
+            logger.debug(f"Measuring capacity with {nb_devices} devices")
+            self.report.levels[nb_devices] = self.run_level(self.devices[:nb_devices])
+        return self.report.levels[nb_devices].pass_rate >= self.report.threshold
+
+    def ramp(self):
+        nb_devices = 0
+        while nb_devices < len(self.devices):
+            nb_devices = min(nb_devices + self.step, len(self.devices))
+            if not self.measure(nb_devices):
+                break
+
+    def bisect(self):
+        passing, failing = 0, len(self.devices)
+        if self.measure(failing):
+            return
+        while failing - passing > self.step:
+            middle = (passing + failing) // 2
+            if self.measure(middle):
+                passing = middle
+            else:
+                failing = middle
+
+    def run(self) -> CapacityReport:
+        if not self.devices:
+            return self.report
+        if self.mode == RAMP:
+            self.ramp()
+        else:
+            self.bisect()
+        return self.report
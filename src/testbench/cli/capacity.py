@@ -0,0 +1,127 @@
+import click
+from halo import Halo  # pyright: ignore [reportMissingTypeStubs]
+from humanfriendly import format_timespan
+from prettytable import PrettyTable
+
+from testbench.capacity import (
+    CapacityLevel,
+    CapacitySearch,
+    run_integration_level,
+)
+from testbench.cli.common import (
+    disconnect_all_devices,
+    get_filtered_wireless_devices,
+    get_integration_params,
+    greet_for,
+    open_run_store,
+)
+from testbench.context import Context
+from testbench.integration import get_tests_collection
+from testbench.utils.stats import Distribution
+from testbench.utils.wlan import WirelessDevice, get_some_wireless_devices
+
+context = Context.get()
+logger = context.logger
+
+
+def format_times(dist: Distribution) -> str:
+    if not dist.count:
+        return "-"
+    return f"{dist.p50:.1f}s / {dist.p95:.1f}s"
+
+
+def main() -> int:
+    greet_for(f"Capacity Search ({context.capacity_search})")
+
+    all_wireless_devices = get_filtered_wireless_devices()
+    devices = list(
+        get_some_wireless_devices(
+            ifnames=[dev.ifname for dev in all_wireless_devices.devices]
+        ).values()
+    )
+    collection = get_tests_collection(assume_online=context.assume_online)
+    params = get_integration_params()
+
+    def run_level(level_devices: list[WirelessDevice]) -> CapacityLevel:
+        with Halo(
+            text=f"Running {len(collection)} tests over {len(level_devices)} devices",
+            spinner="dots",
+        ) as spinner:
+            store = open_run_store("capacity", level_devices, params)
+            level = run_integration_level(
+                level_devices,
+                collection,
+                params,
+                on_results=store.add_results if store else None,
+            )
+            if store:
+                store.finish(
+                    {
+                        "nb_tests": level.nb_tests,
+                        "nb_passed": level.nb_passed,
+                        "duration": level.duration,
+                    }
+                )
+            message = (
+                f"{level.nb_devices} devices: {level.pass_rate:.1%} tests passed "
+                f"in {format_timespan(level.duration)}"
+            )
+            if level.pass_rate >= context.capacity_threshold:
+                spinner.succeed(message)  # pyright: ignore[reportUnknownMemberType]
+            else:
+                spinner.fail(message)  # pyright: ignore[reportUnknownMemberType]
+        return level
+
+    search = CapacitySearch(
+        devices,
+        run_level=run_level,
+        reset=disconnect_all_devices,
+        threshold=context.capacity_threshold,
+        mode=context.capacity_search,
+        step=context.capacity_step,
+    )
+    report = search.run()
+
+    disconnect_all_devices()
+
+    table = PrettyTable(
+        field_names=[
+            "Devices",
+            "Passed",
+            "Pass rate",
+            "Connect p50/p95",
+            "Lease p50/p95",
+            "Duration",
+        ]
+    )
+    for level in report.curve:
+        table.add_row(
+            [
+                level.nb_devices,
+                f"{level.nb_passed}/{level.nb_tests}",
+                f"{level.pass_rate:.1%}",
+                format_times(level.connect),
+                format_times(level.lease),
+                format_timespan(level.duration),
+            ]
+        )
+    click.echo(table.get_string())  # pyright: ignore [reportUnknownMemberType]
+
+    if not report.capacity:
+        click.echo(
+            click.style(
+                f"No number of devices passed {context.capacity_threshold:.0%} "
+                "of tests",
+                fg="red",
+            )
+        )
+        return 4
+
+    click.echo(
+        click.style(
+            f"Capacity: {report.capacity}/{len(devices)} devices "
+            f"(≥ {context.capacity_threshold:.0%} tests passed)",
+            fg="green" if report.capacity == len(devices) else "yellow",
+        )
+    )
+    return 0
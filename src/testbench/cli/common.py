@@ -1,9 +1,44 @@
+import datetime
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from ipaddress import IPv4Network
+from typing import Any
+
 import click
+from halo import Halo  # pyright: ignore [reportMissingTypeStubs]
+from humanfriendly import format_size, format_timespan
+from prettytable import PrettyTable
 
 from testbench.context import Context
-from testbench.hardware import WirelessDevicesList, get_all_wireless_devices
+from testbench.database import RunStore
+from testbench.hardware import (
+    SimpleWirelessDevice,
+    WirelessDevicesList,
+    get_all_wireless_devices,
+)
+from testbench.integration import retrieve_iplink
+from testbench.telemetry import (
+    TargetSampler,
+    TargetSummary,
+    fetch_metrics,
+    run_over_ssh,
+)
+from testbench.utils.host import HostSampler
+from testbench.utils.http import DeviceSession
+from testbench.utils.instrumentation import HISTOGRAM_BOUNDS, CommandRecorder
+from testbench.utils.radio import RadioSampler
+from testbench.utils.wlan import (
+    ConnectionsReport,
+    TeardownReport,
+    WirelessDevice,
+    connect_devices,
+    get_some_wireless_devices,
+    reset_connections,
+)
 
 context = Context.get()
+logger = context.logger
 
 
 def greet_for(name: str):
@@ -29,3 +64,273 @@ def get_filtered_wireless_devices() -> WirelessDevicesList:
         )
     )
     return all_wireless_devices
+
+
+def get_integration_params() -> dict[str, Any]:
+    """integration tests params from context"""
+    return {
+        "ssid": context.ssid,
+        "passphrase": context.passphrase,
+        "dhcp_timeout": context.dhcp_timeout,
+        "address_network": context.address_network,
+        "gateway_address": context.gateway_address,
+        "dns_address": context.dns_address,
+        "ping_address": context.ping_address,
+        "fqdn": context.fqdn,
+        "fqdn_answer": str(context.gateway_address),
+        "svc_fqdn": ".".join([context.svc_domain, context.fqdn]),
+        "svc_fqdn_answer": str(context.gateway_address),
+        "external_fqdn": "apple.com",
+        "external_fqdn_answer": str(context.dns_captured_address),
+        # when online
+        "external_fqdn_answer_network": IPv4Network("17.0.0.0/8"),
+        "zim_manager_fqdn": ".".join([context.zim_manager_domain, context.fqdn]),
+    }
+
+
+def open_run_store(
+    kind: str,
+    devices: Sequence[WirelessDevice | SimpleWirelessDevice],
+    params: dict[str, Any],
+) -> RunStore | None:
+    """record of the run in the database, None if it can't be stored"""
+    try:
+        return RunStore(kind, devices=devices, params=params)
+    except Exception as exc:
+        logger.error(f"Unable to store {kind} run: {exc}")
+        return None
+
+
+def start_radio_sampler(ifnames: list[str]) -> RadioSampler | None:
+    """background radio telemetry sampler for ifnames, unless disabled"""
+    if context.radio_interval <= 0:
+        return None
+    sampler = RadioSampler(ifnames=ifnames, interval=context.radio_interval)
+    sampler.start()
+    return sampler
+
+
+def start_host_sampler(ifnames: list[str]) -> HostSampler | None:
+    """background test host resources sampler, unless disabled"""
+    if context.host_interval <= 0:
+        return None
+    sampler = HostSampler(ifnames=ifnames, interval=context.host_interval)
+    sampler.start()
+    return sampler
+
+
+def echo_host_summary(sampler: HostSampler):
+    """test host's usage over the run and whether it limited the results"""
+    summary = sampler.summary()
+    rss = (
+        f"generator RSS {format_size(summary.rss_max, binary=True)} max, "
+        if summary.rss_max
+        else ""
+    )
+    click.echo(
+        f"Host: CPU {summary.cpu_avg:.0%} avg "
+        f"(busiest core {summary.busiest_core_avg:.0%}), "
+        f"softirq {summary.softirq_max:.0%} max, memory {summary.memory_max:.0%} max, "
+        f"{rss}ifaces RX/TX {format_size(int(summary.rx_rate_avg))}/"
+        f"{format_size(int(summary.tx_rate_avg))} per second."
+    )
+    click.echo(click.style(summary.verdict, fg="red" if summary.saturated else "green"))
+
+
+def get_host_record(
+    sampler: HostSampler | None, start: float | None = None, end: float | None = None
+) -> dict[str, Any] | None:
+    """host saturation verdict over [start, end], stored with the run"""
+    if not sampler:
+        return None
+    summary = sampler.summary(start=start, end=end)
+    return {"saturated": summary.saturated, "verdict": summary.verdict}
+
+
+def start_target_sampler() -> TargetSampler | None:
+    """background target resources collector (from gateway), unless disabled"""
+    if not context.telemetry or context.telemetry_interval <= 0:
+        return None
+    if context.telemetry == "ssh":
+        source = partial(run_over_ssh, context.gateway_address, context.telemetry_user)
+    else:
+        source = partial(fetch_metrics, context.gateway_address, context.telemetry_port)
+    sampler = TargetSampler(source=source, interval=context.telemetry_interval)
+    sampler.start()
+    return sampler
+
+
+# columns of a target's usage over a period, see format_target()
+TARGET_FIELDS: list[str] = ["Target CPU", "Target mem", "Load", "Temp"]
+
+
+def format_target(summary: TargetSummary) -> list[str]:
+    """target's peak usage over a period (TARGET_FIELDS), - if unknown"""
+    return [
+        f"{summary.cpu_max:.0%}" if summary.cpu_max is not None else "-",
+        f"{summary.memory_max:.0%}" if summary.nb_samples else "-",
+        f"{summary.load_max:.2f}" if summary.load_max is not None else "-",
+        (
+            f"{summary.temperature_max:.0f}°C"
+            if summary.temperature_max is not None
+            else "-"
+        ),
+    ]
+
+
+def echo_target_summary(sampler: TargetSampler):
+    """target's usage over the run, overall and per container"""
+    summary = sampler.summary()
+    if not summary.nb_samples:
+        click.echo(
+            click.style(
+                f"Target: no {context.telemetry} telemetry from "
+                f"{context.gateway_address}",
+                fg="yellow",
+            )
+        )
+        return
+    cpu = (
+        f"CPU {summary.cpu_avg:.0%} avg ({summary.cpu_max:.0%} max), "
+        if summary.cpu_avg is not None and summary.cpu_max is not None
+        else ""
+    )
+    load = f", load {summary.load_max:.2f} max" if summary.load_max is not None else ""
+    temperature = (
+        f", {summary.temperature_max:.0f}°C max"
+        if summary.temperature_max is not None
+        else ""
+    )
+    click.echo(
+        f"Target: {cpu}memory {summary.memory_max:.0%} max "
+        f"({format_size(summary.memory_used_max, binary=True)}){load}{temperature}."
+    )
+    if not summary.containers:
+        return
+    table = PrettyTable(field_names=["Container", "CPU avg", "CPU max", "Memory max"])
+    table.align["Container"] = "l"
+    for name, container in summary.containers.items():
+        table.add_row(
+            [
+                name,
+                f"{container.cpu_avg:.0%}",
+                f"{container.cpu_max:.0%}",
+                format_size(container.memory_max, binary=True),
+            ]
+        )
+    click.echo(table.get_string())  # pyright: ignore [reportUnknownMemberType]
+
+
+def connect_all_devices(ifnames: list[str]) -> ConnectionsReport:
+    """associate ifnames to context's SSID and display association timings"""
+    with Halo(text=f"Connecting {len(ifnames)} devices", spinner="dots") as spinner:
+        connections = connect_devices(
+            ifnames,
+            ssid=context.ssid,
+            passphrase=context.passphrase,
+            parallelism=context.connect_parallelism,
+            stagger=context.connect_stagger,
+            retries=context.connect_retries,
+        )
+        connected = connections.connected
+        if not connected:
+            spinner.fail(  # pyright: ignore[reportUnknownMemberType]
+                f"Could not connect any of {len(ifnames)} devices"
+            )
+        elif connections.failed:
+            spinner.warn(  # pyright: ignore[reportUnknownMemberType]
+                f"Connected {len(connected)}/{len(ifnames)} devices "
+                f"in {format_timespan(connections.duration)}. "
+                f"Failed: {', '.join(connections.failed)}"
+            )
+        else:
+            spinner.succeed(  # pyright: ignore[reportUnknownMemberType]
+                f"Connected {len(connected)} devices "
+                f"in {format_timespan(connections.duration)}"
+            )
+
+    assoc_table = PrettyTable(field_names=["Iface", "Attempts", "Association", "Total"])
+    for conn in connections.connections.values():
+        assoc_table.add_row(
+            [
+                conn.ifname,
+                conn.attempts,
+                format_timespan(conn.duration) if conn.succeeded else "❌",
+                format_timespan(conn.elapsed),
+            ]
+        )
+    click.echo(assoc_table.get_string())  # pyright: ignore [reportUnknownMemberType]
+    return connections
+
+
+def get_leased_devices(ifnames: list[str]) -> list[WirelessDevice]:
+    """devices of ifnames that got an IPv4 link (awaited concurrently)"""
+    devices = list(get_some_wireless_devices(ifnames=ifnames).values())
+    with ThreadPoolExecutor(max_workers=max(len(devices), 1)) as executor:
+        leased = list(executor.map(retrieve_iplink, devices))
+    for device, has_link in zip(devices, leased, strict=True):
+        if not has_link:
+            click.echo(click.style(f"No IPv4 lease for {device.ifname}", fg="yellow"))
+    return [
+        device for device, has_link in zip(devices, leased, strict=True) if has_link
+    ]
+
+
+def disconnect_all_devices() -> TeardownReport:
+    # pooled connections would not survive the disconnection
+    DeviceSession.close_all()
+    with Halo(text="Disconnecting all devices", spinner="dots") as spinner:
+        report = reset_connections()
+        if report.succeeded:
+            spinner.succeed(  # pyright: ignore[reportUnknownMemberType]
+                f"Disconnected all devices in {format_timespan(report.duration)}"
+            )
+        else:
+            spinner.warn(  # pyright: ignore[reportUnknownMemberType]
+                f"Failed to reset {len(report.failures)}/{report.nb_devices} "
+                f"devices: {', '.join(report.failures.keys())}"
+            )
+    return report
+
+
+def show_commands_report(recorder: CommandRecorder):
+    """per-kind summary and duration histogram of external commands"""
+    stats = recorder.get_stats()
+    run_duration = (
+        datetime.datetime.now(datetime.UTC) - recorder.started_on
+    ).total_seconds()
+    total = sum(entry.total for entry in stats.values())
+    click.echo("")
+    click.echo(
+        f"External commands: {sum(entry.count for entry in stats.values())} "
+        f"launched, {format_timespan(total)} cumulated "
+        f"over a {format_timespan(run_duration)} run"
+    )
+
+    table = PrettyTable(
+        field_names=["Command", "Count", "Failed", "p50", "p95", "Max", "Max conc."]
+    )
+    table.align["Command"] = "l"
+    for kind, entry in stats.items():
+        dist = entry.distribution
+        table.add_row(
+            [
+                kind,
+                entry.count,
+                entry.nb_failed,
+                f"{dist.p50:.2f}s",
+                f"{dist.p95:.2f}s",
+                f"{dist.max:.2f}s",
+                entry.max_concurrency,
+            ]
+        )
+    click.echo(table.get_string())  # pyright: ignore[reportUnknownMemberType]
+
+    bounds = [f"<{bound}s" for bound in HISTOGRAM_BOUNDS] + [
+        f">={HISTOGRAM_BOUNDS[-1]}s"
+    ]
+    histogram = PrettyTable(field_names=["Command", *bounds])
+    histogram.align["Command"] = "l"
+    for kind, entry in stats.items():
+        histogram.add_row([kind, *entry.histogram])
+    click.echo(histogram.get_string())  # pyright: ignore[reportUnknownMemberType]
@@ -0,0 +1,129 @@
+import itertools
+
+import click
+from halo import Halo  # pyright: ignore [reportMissingTypeStubs]
+from humanfriendly import format_timespan
+from prettytable import PrettyTable
+
+from testbench.cli.common import (
+    connect_all_devices,
+    disconnect_all_devices,
+    get_filtered_wireless_devices,
+    get_leased_devices,
+    greet_for,
+)
+from testbench.context import Context
+from testbench.dnsbench import LoadLevel, Source, get_default_mix, run_load_level
+from testbench.utils.aio import BackgroundLoop
+
+context = Context.get()
+logger = context.logger
+
+
+def main() -> int:
+    greet_for("DNS Load Testing")
+
+    all_wireless_devices = get_filtered_wireless_devices()
+    connections = connect_all_devices(
+        [device.ifname for device in all_wireless_devices.devices]
+    )
+    devices = get_leased_devices(connections.connected)
+    if not devices:
+        disconnect_all_devices()
+        return 3
+
+    sources = [
+        Source(address=device.ip4link.address, ifname=device.ifname)
+        for device in devices
+    ]
+    mix = get_default_mix()
+    click.echo(
+        f"Querying {context.dns_address} from {len(sources)} devices with "
+        f"{', '.join(entry.domain for entry in mix)}"
+    )
+
+    levels: list[LoadLevel] = []
+    for rate in sorted(context.dnsbench_rates):
+        with Halo(
+            text=f"Querying at {rate:g} q/s per device "
+            f"({rate * len(sources):g} q/s total)",
+            spinner="dots",
+        ) as spinner:
+            try:
+                level = BackgroundLoop.get().run(
+                    run_load_level(
+                        sources,
+                        context.dns_address,
+                        mix=mix,
+                        qps=rate,
+                        duration=context.dnsbench_duration,
+                        timeout=context.dnsbench_timeout,
+                    )
+                )
+            except OSError as exc:
+                spinner.fail(  # pyright: ignore[reportUnknownMemberType]
+                    f"Unable to query at {rate:g} q/s: {exc}"
+                )
+                break
+            levels.append(level)
+            message = (
+                f"{level.target_qps:g} q/s: {level.achieved_qps:.1f} answered/s, "
+                f"{level.success_rate:.1%} correct, p95 {level.latency.p95:.1f} ms"
+            )
+            if level.success_rate < 1:
+                spinner.warn(message)  # pyright: ignore[reportUnknownMemberType]
+            else:
+                spinner.succeed(message)  # pyright: ignore[reportUnknownMemberType]
+
+    click.echo("")
+    disconnect_all_devices()
+
+    click.echo("")
+    click.echo(
+        f"DNS load by target rate ({format_timespan(context.dnsbench_duration)} each)"
+    )
+    table = PrettyTable(
+        field_names=[
+            "Target q/s",
+            "Sent",
+            "Answered q/s",
+            "p50 ms",
+            "p95 ms",
+            "p99 ms",
+            "Max ms",
+            "Timeouts",
+            "Wrong",
+            "Errors",
+        ]
+    )
+    for level in levels:
+        latency = level.latency
+        table.add_row(
+            [
+                f"{level.target_qps:g}",
+                level.nb_sent,
+                f"{level.achieved_qps:.1f}",
+                f"{latency.p50:.1f}",
+                f"{latency.p95:.1f}",
+                f"{latency.p99:.1f}",
+                f"{latency.max:.1f}",
+                level.nb_timeouts,
+                level.nb_wrong,
+                level.nb_errors,
+            ]
+        )
+    click.echo(table.get_string())  # pyright: ignore [reportUnknownMemberType]
+
+    # levels fully answered, before the first degraded one
+    sustained = list(itertools.takewhile(lambda level: level.success_rate == 1, levels))
+    if not sustained:
+        click.echo(click.style("No load level fully answered", fg="red"))
+        return 4
+    click.echo(
+        click.style(
+            f"Fully answered up to {sustained[-1].target_qps:g} q/s "
+            f"(p95 {sustained[-1].latency.p95:.1f} ms)",
+            fg="green" if len(sustained) == len(levels) else "yellow",
+        )
+    )
+    return 0
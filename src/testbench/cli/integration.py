@@ -1,20 +1,28 @@
-from ipaddress import IPv4Network
-
 import click
-from halo import Halo  # pyright: ignore [reportMissingTypeStubs]
 from humanfriendly import format_timespan
 from prettytable import PrettyTable
 
-from testbench.cli.common import get_filtered_wireless_devices, greet_for
+from testbench.cli.common import (
+    disconnect_all_devices,
+    echo_host_summary,
+    echo_target_summary,
+    get_filtered_wireless_devices,
+    get_host_record,
+    get_integration_params,
+    greet_for,
+    open_run_store,
+    start_host_sampler,
+    start_radio_sampler,
+    start_target_sampler,
+)
 from testbench.context import Context
 from testbench.integration import (
     IntegrationTestsRunner,
     get_tests_collection,
 )
-from testbench.utils.wlan import (
-    get_some_wireless_devices,
-    reset_connections,
-)
+from testbench.utils.dns import DNSCache
+from testbench.utils.http import DeviceSession
+from testbench.utils.wlan import get_some_wireless_devices
 
 context = Context.get()
 logger = context.logger
@@ -30,27 +38,13 @@ def main() -> int:
         ).values()
     )
 
+    params = get_integration_params()
+    store = open_run_store("integration", devices, params)
     runner = IntegrationTestsRunner(
         devices=devices,
         collection=get_tests_collection(assume_online=context.assume_online),
-        params={
-            "ssid": context.ssid,
-            "passphrase": context.passphrase,
-            "dhcp_timeout": context.dhcp_timeout,
-            "address_network": context.address_network,
-            "gateway_address": context.gateway_address,
-            "dns_address": context.dns_address,
-            "ping_address": context.ping_address,
-            "fqdn": context.fqdn,
-            "fqdn_answer": str(context.gateway_address),
-            "svc_fqdn": ".".join([context.svc_domain, context.fqdn]),
-            "svc_fqdn_answer": str(context.gateway_address),
-            "external_fqdn": "apple.com",
-            "external_fqdn_answer": str(context.dns_captured_address),
-            # when online
-            "external_fqdn_answer_network": IPv4Network("17.0.0.0/8"),
-            "zim_manager_fqdn": ".".join([context.zim_manager_domain, context.fqdn]),
-        },
+        params=params,
+        on_results=store.add_results if store else None,
     )
 
     with click.progressbar(
@@ -60,27 +54,51 @@ def main() -> int:
         f"over {runner.nb_devices} devices",
     ) as bar:
 
-        def update(last: int) -> int:
-            new = runner.nb_completed_tests
-            bar.update(n_steps=new - last)
-            return new
-
         last = runner.nb_completed_tests
-        runner.start()
 
-        while runner.running:
-            runner.tick(0.1)
-            last = update(last)
-        runner.shutdown(wait=True)
-        update(last)
+        def update():
+            nonlocal last
+            new = runner.nb_completed_tests
+            bar.update(n_steps=new - last)
+            last = new
+
+        radio = start_radio_sampler([device.ifname for device in devices])
+        host = start_host_sampler([device.ifname for device in devices])
+        target = start_target_sampler()
+        runner.run(on_tick=update)
+        if radio:
+            radio.stop()
+        if host:
+            host.stop()
+        if target:
+            target.stop()
+        update()
 
     click.echo(f"Tests completed in {format_timespan(runner.duration)}.")
-
-    with Halo(text="Disconnecting all devices", spinner="dots") as spinner:
-        reset_connections()
-        spinner.succeed(  # pyright: ignore[reportUnknownMemberType]
-            "Disconnected all devices"
+    if store:
+        store.finish(
+            {
+                "nb_tests": runner.nb_tests,
+                "nb_passed": runner.nb_sucessful_tests,
+                "duration": runner.duration,
+                "host": get_host_record(host),
+            }
         )
+    if host:
+        echo_host_summary(host)
+    if target:
+        echo_target_summary(target)
+    dns_hits, dns_misses = DNSCache.get_totals()
+    if dns_hits or dns_misses:
+        click.echo(f"HTTP DNS cache: {dns_hits} hits, {dns_misses} misses.")
+    pools = DeviceSession.get_totals()
+    if pools.nb_requests:
+        click.echo(
+            f"HTTP connections: {pools.nb_opened} opened, {pools.nb_reused} reused, "
+            f"{pools.nb_dropped} dropped for {pools.nb_requests} requests."
+        )
+
+    disconnect_all_devices()
 
     if runner.all_succeeded:
         click.echo(click.style("All tests passed! 🎉", fg="green"))
@@ -97,11 +115,18 @@ def main() -> int:
     table.align["Test"] = "l"
     for test_name in tests_names:
         table.add_row([test_name])
+    if radio:
+        table.add_row(["📶 Signal"])
+        table.add_row(["📶 TX/RX Mb/s"])
+        table.add_row(["📶 Retries/Failed"])
     for ifname, device_data in runner.results.items():
         results: list[str] = []
         for test_name in tests_names:
             result = device_data[test_name]
             results.append("✅" if result.succeeded else f"❌ {result.feedback}")
+        if radio:
+            summary = radio.summary(ifname)
+            results += [summary.signal_text, summary.bitrate_text, summary.errors_text]
         table.add_column(
             ifname.replace("wlan", "wl"),
             results,
@@ -1,152 +1,688 @@
-import csv
-import re
+import os
+import sys
 import time
-from dataclasses import dataclass
+from functools import partial
+from typing import Any
 
 import click
 from halo import Halo  # pyright: ignore [reportMissingTypeStubs]
 from humanfriendly import format_number, format_timespan
 from prettytable import PrettyTable
 
-from testbench.cli.common import get_filtered_wireless_devices, greet_for
-from testbench.context import Context
+from testbench.cli.common import (
+    TARGET_FIELDS,
+    connect_all_devices,
+    disconnect_all_devices,
+    echo_host_summary,
+    echo_target_summary,
+    format_target,
+    get_filtered_wireless_devices,
+    get_host_record,
+    get_leased_devices,
+    greet_for,
+    open_run_store,
+    start_host_sampler,
+    start_radio_sampler,
+    start_target_sampler,
+)
+from testbench.context import PERF_ENGINES, Context
+from testbench.guard import HealthGuard
+from testbench.hardware import SimpleWirelessDevice
 from testbench.jmeter import JMeterRunner
-from testbench.utils.wlan import connect_device, reset_connections
+from testbench.jtl import (
+    GroupSummary,
+    IfnameIndex,
+    JTLColumns,
+    JTLTail,
+    RollingWindow,
+    Sample,
+    WindowStats,
+)
+from testbench.loadgen import HTTP_PORT, NativeRunner, OpenLoopRunner, get_scenario
+from testbench.stepped import LoadCurve, LoadStep, get_step_levels
+from testbench.telemetry import TargetSampler
+from testbench.utils.host import HostSampler
+from testbench.utils.wlan import WirelessDevice
+from testbench.watchdog import StallWatchdog, is_reachable
 
 context = Context.get()
 logger = context.logger
 
+NATIVE = PERF_ENGINES[1]
+Runner = JMeterRunner | NativeRunner
 
-@dataclass
-class Result:
-    nb_success: int
-    nb_failed: int
+# JMeter stopped by the watchdog (partial results reported)
+STALLED_RETURNCODE = 4
+# load stopped by the health guard (partial results reported)
+GUARDED_RETURNCODE = 5
 
-    @property
-    def nb_total(self) -> int:
-        return self.nb_success + self.nb_failed
 
-    @property
-    def success_pc(self) -> float:
-        return self.nb_success / self.nb_total
+# p50/p90/p99/max of each, in milliseconds
+TIMES_FIELDS = ["Elapsed ms", "Latency ms", "Connect ms"]
 
-    @property
-    def percent(self) -> str:
-        return f"{format_number(self.success_pc * 100, 2)}%"
 
+def get_perf_params() -> dict[str, Any]:
+    """perf settings, stored with runs"""
+    return {
+        "engine": context.perf_engine,
+        "jmx_path": context.jmx_path,
+        "jitter": context.perf_jitter,
+        "rate": context.perf_rate,
+        "arrivals": context.perf_arrivals,
+        "duration": context.perf_duration,
+        "warmup": context.perf_warmup,
+        "hold": context.perf_hold,
+    }
 
-def main() -> int:
 
-    greet_for("Performance Testing")
+def format_percent(summary: GroupSummary) -> str:
+    return f"{format_number(summary.success_rate * 100, 2)}%"
 
-    if not context.jmx_path.resolve().exists():
-        click.echo(
-            click.style(f"JMX path does not exists: {context.jmx_path}", fg="red")
-        )
-        return 2
 
-    all_wireless_devices = get_filtered_wireless_devices()
+def format_times(summary: GroupSummary) -> list[str]:
+    return [
+        f"{dist.p50:.0f}/{dist.p90:.0f}/{dist.p99:.0f}/{dist.max:.0f}"
+        for dist in (summary.elapsed, summary.latency, summary.connect)
+    ]
 
-    with Halo(
-        text=f"Connecting {all_wireless_devices.count} devices", spinner="dots"
-    ) as spinner:
-        for device in all_wireless_devices.devices:
-            logger.debug(f"Connecting {device.ifname}")
-            assert (  # noqa: S101
-                connect_device(
-                    device.ifname, ssid=context.ssid, passphrase=context.passphrase
-                ).returncode
-                == 0
-            )
-        spinner.succeed(  # pyright: ignore[reportUnknownMemberType]
-            f"Connected {all_wireless_devices.count} devices"
+
+class LiveView:
+    """rolling window's stats per label and per interface, redrawn in place"""
+
+    def __init__(self, index: IfnameIndex):
+        self.index = index
+        self.interactive = sys.stdout.isatty()
+        self.nb_lines: int = 0
+        self.last_shown_on: float = 0.0
+
+    @staticmethod
+    def get_table(name: str, stats: dict[str, WindowStats]) -> PrettyTable:
+        table = PrettyTable(
+            field_names=[name, "Req/s", "Errors", "p50 ms", "p90 ms", "p99 ms"]
         )
+        table.align[name] = "l"
+        for key, entry in stats.items():
+            table.add_row(
+                [
+                    key,
+                    f"{entry.rate:.1f}",
+                    f"{entry.error_rate:.1%}",
+                    f"{entry.elapsed.p50:.0f}",
+                    f"{entry.elapsed.p90:.0f}",
+                    f"{entry.elapsed.p99:.0f}",
+                ]
+            )
+        return table
+
+    def render(self, window: RollingWindow, title: str) -> str:
+        def get_ifname(sample: Sample) -> str:
+            return self.index.get(sample.thread, sample.ifname)
 
-    with Halo(text="Starting JMeter", spinner="dots") as spinner:
+        lines = [
+            f"{title}: {window.nb_total} samples, {window.nb_failed} failed "
+            f"(last {format_timespan(window.duration)} below)"
+        ]
+        if window.samples:
+            for name, key in (("Test", get_label), ("Iface", get_ifname)):
+                lines.append(
+                    self.get_table(
+                        name, window.get_stats(key)
+                    ).get_string()  # pyright: ignore [reportUnknownMemberType]
+                )
+        return "\n".join(lines)
+
+    def update(self, window: RollingWindow, title: str):
+        if not self.interactive:
+            # no redraw: a summary line every window
+            if time.monotonic() - self.last_shown_on < window.duration:
+                return
+            self.last_shown_on = time.monotonic()
+            click.echo(self.render(window, title).splitlines()[0])
+            return
+        text = self.render(window, title)
+        self.clear()
+        click.echo(text)
+        self.nb_lines = text.count("\n") + 1
+
+    def clear(self):
+        """erase previously drawn lines"""
+        if self.interactive and self.nb_lines:
+            click.echo(f"\x1b[{self.nb_lines}F\x1b[J", nl=False)
+        self.nb_lines = 0
+
+
+def get_label(sample: Sample) -> str:
+    return sample.label
+
+
+def get_engine_name() -> str:
+    return "native engine" if context.perf_engine == NATIVE else "JMeter"
+
+
+def start_engine(
+    ifnames: list[str],
+    devices: list[WirelessDevice],
+    host: HostSampler | None,
+    *,
+    loops: int = 1,
+) -> Runner:
+    """started load generator over ifnames (devices, for native engine)"""
+    with Halo(text=f"Starting {get_engine_name()}", spinner="dots") as spinner:
+
+        if context.perf_engine == NATIVE:
+            scenario = get_scenario(
+                fqdn=context.fqdn,
+                svc_domain=context.svc_domain,
+                content_id=context.content_id,
+            )
+            if context.perf_rate > 0:
+                jmeter = OpenLoopRunner(
+                    devices,
+                    rate=context.perf_rate,
+                    arrivals=context.perf_arrivals,
+                    # stepped load stops it instead
+                    duration=None if loops < 0 else context.perf_duration,
+                    scenario=scenario,
+                    dns_server=context.dns_address,
+                )
+                started = (
+                    f"Started native engine at {context.perf_rate:g} req/s "
+                    f"({context.perf_arrivals}) over {len(devices)} devices"
+                )
+            else:
+                jmeter = NativeRunner(
+                    devices,
+                    scenario=scenario,
+                    dns_server=context.dns_address,
+                    jitter=context.perf_jitter,
+                    loops=loops,
+                )
+                started = f"Started native engine with {len(devices)} users"
+            jmeter.start()
+            if host:
+                # users run in our own process
+                host.pid = os.getpid()
+            spinner.succeed(started)  # pyright: ignore[reportUnknownMemberType]
+            return jmeter
 
         jmeter = JMeterRunner(
             context.jmx_path.resolve(),
-            ifnames=[device.ifname for device in all_wireless_devices.devices],
+            ifnames=ifnames,
             assume_online="true" if context.assume_online else "false",
             content_id=context.content_id,
+            loops=loops,
         )
         jmeter.start()
+        if host:
+            host.pid = jmeter.ps.pid
         spinner.succeed(  # pyright: ignore[reportUnknownMemberType]
             f"Started JMeter, PID: {jmeter.ps.pid}"
         )
+        return jmeter
+
+
+def start_guard() -> HealthGuard | None:
+    """target health guard, unless disabled"""
+    if not context.guard_action:
+        return None
+    guard = HealthGuard(
+        address=context.gateway_address,
+        host=context.fqdn,
+        action=context.guard_action,
+        max_loss=context.guard_max_loss,
+        max_response=context.guard_max_response,
+        ifname=context.guard_ifname or None,
+    )
+    guard.start()
+    return guard
+
+
+def run_engine(
+    jmeter: Runner,
+    *,
+    title: str,
+    duration: float | None = None,
+    guard: HealthGuard | None = None,
+) -> bool:
+    """follow jmeter until it ends (stopped after duration seconds if set)
+
+    guard pauses or stops it should the target degrade.
+    Returns whether it stalled (and was stopped by the watchdog)"""
+    engine = get_engine_name()
+    tail = JTLTail(jmeter.results_csv_path)
+    window = RollingWindow(context.perf_window)
+    view = LiveView(IfnameIndex.from_csv(jmeter.ifnames_csv_path))
+    watchdog = (
+        None
+        if isinstance(jmeter, NativeRunner)
+        else StallWatchdog(
+            jmeter.ps.pid,
+            jmeter.results_csv_path,
+            timeout=context.perf_stall_timeout,
+            probe=partial(is_reachable, str(context.gateway_address), HTTP_PORT),
+        )
+    )
+    stop_requested = False
+    while jmeter.is_running:
+        time.sleep(1)
+        window.add(tail.read())
+        if guard and (
+            event := guard.apply(
+                jmeter,
+                elapsed=jmeter.elapsed,
+                nb_users=jmeter.nb_users,
+                rate=window.rate,
+            )
+        ):
+            view.clear()
+            click.echo(click.style(str(event), fg="yellow"))
+        if watchdog and guard and guard.paused:
+            watchdog.defer()
+        if watchdog:
+            watchdog.check()
+        if duration is not None and not stop_requested and jmeter.elapsed >= duration:
+            jmeter.stop()
+            stop_requested = True
+        view.update(window, f"{title} for {format_timespan(jmeter.elapsed)}")
+    view.clear()
 
-    with Halo(text="Running JMeter", spinner="dots") as spinner:
-        while jmeter.is_running:
-            time.sleep(1)
+    stalled = watchdog is not None and watchdog.stalled
+    with Halo(text=engine, spinner="dots") as spinner:
         if jmeter.succeeded:
             spinner.succeed(  # pyright: ignore[reportUnknownMemberType]
-                f"JMeter completed in {format_timespan(jmeter.duration)}."
+                f"{engine.capitalize()} completed in "
+                f"{format_timespan(jmeter.duration)}."
+            )
+        elif watchdog and stalled:
+            spinner.warn(  # pyright: ignore[reportUnknownMemberType]
+                f"{engine.capitalize()} stalled and was stopped after "
+                f"{format_timespan(jmeter.duration)}: {watchdog.verdict}. "
+                "Reporting partial results."
             )
         else:
             spinner.fail(  # pyright: ignore[reportUnknownMemberType]
-                f"JMeter failed with {jmeter.ps.returncode} "
+                f"{engine.capitalize()} failed with {jmeter.returncode} "
                 f"after {format_timespan(jmeter.duration)}."
             )
+    if isinstance(jmeter, JMeterRunner) and stalled:
+        click.echo(f"JMeter output (and thread dump) in {jmeter.output_path}")
+    return stalled
 
+
+def run_steps(
+    ifnames: list[str],
+    host: HostSampler | None,
+    guard: HealthGuard | None,
+    known_devices: list[SimpleWirelessDevice],
+) -> LoadCurve:
+    """run the load over increasing numbers of ifnames, reconnected for each
+
+    Steps end early should guard stop the load. Each step is stored as a run"""
+    curve = LoadCurve(knee_ratio=context.perf_knee_ratio)
+    native = context.perf_engine == NATIVE
+    for nb_users in get_step_levels(len(ifnames), context.perf_steps):
+        if guard and guard.stopped:
+            logger.warning(f"Target degraded, {nb_users} users step not run")
+            break
+        # each step starts from fresh associations and connections
+        disconnect_all_devices()
+        step_ifnames = connect_all_devices(ifnames[:nb_users]).connected
+        devices = get_leased_devices(step_ifnames) if native else []
+        if native:
+            step_ifnames = [device.ifname for device in devices]
+        if not step_ifnames:
+            logger.warning(f"No device for the {nb_users} users step, skipping")
+            continue
+
+        jmeter = start_engine(step_ifnames, devices, host, loops=-1)
+        stalled = run_engine(
+            jmeter,
+            title=f"{len(step_ifnames)} users step",
+            duration=context.perf_warmup + context.perf_hold,
+            guard=guard,
+        )
+        hold_from = jmeter.started_on.timestamp() + context.perf_warmup
+        step_end = min(hold_from + context.perf_hold, jmeter.ended_on.timestamp())
+        step = LoadStep.from_results(
+            len(step_ifnames),
+            jmeter.results_csv_path,
+            IfnameIndex.from_csv(jmeter.ifnames_csv_path),
+            hold_from=hold_from,
+            hold_to=step_end,
+        )
+        step.stalled = stalled
+        curve.steps.append(step)
+        if store := open_run_store(
+            "perf-step",
+            [device for device in known_devices if device.ifname in step_ifnames],
+            get_perf_params(),
+        ):
+            store.add_summaries("total", {"": step.summary})
+            store.finish(
+                {
+                    "rate": step.rate,
+                    "error_rate": step.error_rate,
+                    "stalled": step.stalled,
+                    "results_csv_path": step.results_csv_path,
+                    "host": get_host_record(host, hold_from, step_end),
+                }
+            )
+        click.echo(
+            f"{step.nb_users} users: {step.rate:.1f} req/s, "
+            f"{step.error_rate:.1%} errors, p90 {step.summary.elapsed.p90:.0f} ms"
+        )
+    return curve
+
+
+def show_guard(guard: HealthGuard):
+    """guard's actions on the load, if any"""
+    if not guard.events:
+        click.echo(click.style("Target stayed healthy", fg="green"))
+        return
+    click.echo("Health guard")
+    table = PrettyTable(field_names=["Load", "After", "Users", "Req/s", "Reason"])
+    table.align["Reason"] = "l"
+    for event in guard.events:
+        table.add_row(
+            [
+                event.action,
+                format_timespan(event.elapsed),
+                event.nb_users,
+                f"{event.rate:.1f}",
+                event.reason,
+            ]
+        )
+    click.echo(table.get_string())  # pyright: ignore [reportUnknownMemberType]
+    if first := guard.first_degradation:
+        click.echo(
+            click.style(
+                f"Target degraded at {first.nb_users} users, {first.rate:.1f} req/s",
+                fg="yellow",
+            )
+        )
+
+
+def show_curve(curve: LoadCurve, target: TargetSampler | None) -> int:
     click.echo("")
-    with Halo(text="Disconnecting all devices", spinner="dots") as spinner:
-        reset_connections()
-        spinner.succeed(  # pyright: ignore[reportUnknownMemberType]
-            "Disconnected all devices"
+    click.echo(
+        f"Capacity curve ({format_timespan(context.perf_warmup)} warm-up, "
+        f"{format_timespan(context.perf_hold)} measured per step)"
+    )
+    table = PrettyTable(
+        field_names=[
+            "Users",
+            "Req/s",
+            "Errors",
+            *TIMES_FIELDS,
+            *(TARGET_FIELDS if target else []),
+            "Results",
+        ]
+    )
+    for step in curve.steps:
+        table.add_row(
+            [
+                step.nb_users,
+                f"{step.rate:.1f}",
+                f"{step.error_rate:.1%}",
+                *format_times(step.summary),
+                *(
+                    format_target(
+                        target.summary(step.hold_from, step.hold_from + step.hold)
+                    )
+                    if target
+                    else []
+                ),
+                f"{step.results_csv_path}{' (stalled)' if step.stalled else ''}",
+            ]
         )
+    click.echo(table.get_string())  # pyright: ignore [reportUnknownMemberType]
+
+    nb_quarantined = sum(step.nb_quarantined for step in curve.steps)
+    if nb_quarantined:
+        click.echo(
+            click.style(
+                f"{nb_quarantined} unparsable rows left out "
+                "(see results.quarantine.csv of steps)",
+                fg="yellow",
+            )
+        )
+
+    click.echo("")
+    best = curve.best
+    if not best:
+        click.echo(click.style("No step completed", fg="red"))
+        return 1
+    if knee := curve.throughput_knee:
+        click.echo(
+            click.style(
+                f"Throughput flattens at {knee.nb_users} users "
+                f"({knee.rate:.1f} req/s). Best: {best.rate:.1f} req/s "
+                f"with {best.nb_users} users",
+                fg="yellow",
+            )
+        )
+    else:
+        click.echo(
+            click.style(
+                f"Throughput scaled up to {best.nb_users} users "
+                f"({best.rate:.1f} req/s)",
+                fg="green",
+            )
+        )
+    if knee := curve.latency_knee:
+        click.echo(
+            click.style(
+                f"Latency climbs from {knee.nb_users} users "
+                f"(p90 {knee.summary.elapsed.p90:.0f} ms, "
+                f"{curve.steps[0].summary.elapsed.p90:.0f} ms "
+                f"with {curve.steps[0].nb_users})",
+                fg="yellow",
+            )
+        )
+    return STALLED_RETURNCODE if any(step.stalled for step in curve.steps) else 0
 
-    if not jmeter.succeeded:
-        return jmeter.ps.returncode
+
+def main() -> int:
+
+    greet_for("Performance Testing")
+
+    native = context.perf_engine == NATIVE
+    if not native and not context.jmx_path.resolve().exists():
+        click.echo(
+            click.style(f"JMX path does not exists: {context.jmx_path}", fg="red")
+        )
+        return 2
+    if context.perf_rate > 0 and not native:
+        click.echo(click.style("Open loop (--rate) requires --engine native", fg="red"))
+        return 2
+
+    all_wireless_devices = get_filtered_wireless_devices()
+
+    connections = connect_all_devices(
+        [device.ifname for device in all_wireless_devices.devices]
+    )
+    ifnames = connections.connected
+
+    if not ifnames:
+        disconnect_all_devices()
+        return 3
+
+    # native engine's users need their device's address to bind to
+    devices = get_leased_devices(ifnames) if native else []
+    if native:
+        if not devices:
+            disconnect_all_devices()
+            return 3
+        ifnames = [device.ifname for device in devices]
+
+    radio = start_radio_sampler(ifnames)
+    host = start_host_sampler(ifnames)
+    target = start_target_sampler()
+
+    guard = start_guard()
+
+    if context.perf_stepped or context.perf_steps:
+        curve = run_steps(ifnames, host, guard, all_wireless_devices.devices)
+        if radio:
+            radio.stop()
+        if host:
+            host.stop()
+            echo_host_summary(host)
+        if target:
+            target.stop()
+            echo_target_summary(target)
+        if guard:
+            guard.stop()
+            show_guard(guard)
+        click.echo("")
+        disconnect_all_devices()
+        returncode = show_curve(curve, target)
+        return GUARDED_RETURNCODE if guard and guard.stopped else returncode
+
+    store = open_run_store(
+        "perf",
+        [device for device in all_wireless_devices.devices if device.ifname in ifnames],
+        get_perf_params(),
+    )
+    jmeter = start_engine(ifnames, devices, host)
+    stalled = run_engine(jmeter, title=f"Running {get_engine_name()}", guard=guard)
+
+    if radio:
+        radio.stop()
+    if host:
+        host.stop()
+        echo_host_summary(host)
+    if target:
+        target.stop()
+        echo_target_summary(target)
+    if guard:
+        guard.stop()
+        show_guard(guard)
+
+    click.echo("")
+    disconnect_all_devices()
+
+    if not jmeter.succeeded and not stalled:
+        if store:
+            store.finish(
+                {"returncode": jmeter.returncode, "host": get_host_record(host)}
+            )
+        return jmeter.returncode or 1
 
     click.echo(f"Results in {jmeter.results_csv_path}")
+    if isinstance(jmeter, OpenLoopRunner):
+        click.echo(
+            f"Open loop: {jmeter.rate:g} req/s offered ({jmeter.arrivals}), "
+            f"{jmeter.nb_samples / jmeter.duration:.1f} req/s completed. "
+            "Times are from each request's intended start"
+        )
+        if jmeter.nb_rejected:
+            click.echo(
+                click.style(
+                    f"{jmeter.nb_rejected} requests failed unsent "
+                    "(too many in flight)",
+                    fg="yellow",
+                )
+            )
 
-    def get_ifname_from_threadname(name: str) -> str:
-        m = re.match(r"Users 1-(?P<num>\d+){1,2}", name)
-        if m:
-            return all_wireless_devices.devices[int(m.groupdict()["num"]) - 1].ifname
-        raise ValueError(f"Inrecognized thread name: {name}")
-
-    tests_map: dict[str, Result] = {}
-    ifnames_map: dict[str, Result] = {}
-
-    with open(jmeter.results_csv_path) as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            label = row["label"]
-            ifname = get_ifname_from_threadname(row["threadName"])
-            success = row["success"] == "true"
-            if label not in tests_map:
-                tests_map[label] = Result(0, 0)
-            tests_map[label].nb_success += 1 if success else 0
-            tests_map[label].nb_failed += 1 if not success else 0
-            if ifname not in ifnames_map:
-                ifnames_map[ifname] = Result(0, 0)
-            ifnames_map[ifname].nb_success += 1 if success else 0
-            ifnames_map[ifname].nb_failed += 1 if not success else 0
+    index = IfnameIndex.from_csv(jmeter.ifnames_csv_path)
+    quarantine_path = jmeter.results_csv_path.with_suffix(".quarantine.csv")
+    results = JTLColumns.load(jmeter.results_csv_path, index, quarantine_path)
+    if results.nb_quarantined:
+        click.echo(
+            click.style(
+                f"{results.nb_quarantined} unparsable rows left out "
+                f"(see {quarantine_path})",
+                fg="yellow",
+            )
+        )
+    tests_map = results.by_label()
+    ifnames_map = results.by_ifname()
+    if store:
+        store.add_summaries(
+            "total", {"": results.get_summary(list(range(len(results))))}
+        )
+        store.add_summaries("label", tests_map)
+        store.add_summaries("ifname", ifnames_map)
+        store.finish(
+            {
+                "stalled": stalled,
+                "guard_stopped": bool(guard and guard.stopped),
+                "nb_quarantined": results.nb_quarantined,
+                "results_csv_path": jmeter.results_csv_path,
+                "host": get_host_record(host),
+            }
+        )
 
     click.echo("")
     click.echo("Results by Test")
 
     tests_table = PrettyTable(
-        field_names=["Test", "Success", "Failure", "Success rate"]
+        field_names=["Test", "Success", "Failure", "Success rate", *TIMES_FIELDS]
     )
     tests_table.align["Test"] = "l"
-    for label, results in tests_map.items():
+    for label, summary in tests_map.items():
         tests_table.add_row(
-            [label, results.nb_success, results.nb_failed, results.percent]
+            [
+                label,
+                summary.nb_success,
+                summary.nb_failed,
+                format_percent(summary),
+                *format_times(summary),
+            ]
         )
     click.echo(tests_table.get_string())  # pyright: ignore [reportUnknownMemberType]
 
     click.echo("")
     click.echo("Results by Iface")
 
+    radio_fields = ["Signal", "TX/RX Mb/s", "Retries/Failed"] if radio else []
     ifnames_table = PrettyTable(
-        field_names=["Iface", "Success", "Failure", "Success rate"]
+        field_names=[
+            "Iface",
+            "Success",
+            "Failure",
+            "Success rate",
+            *TIMES_FIELDS,
+            *radio_fields,
+        ]
     )
-    for ifname, results in ifnames_map.items():
-        ifnames_table.add_row(
-            [ifname, results.nb_success, results.nb_failed, results.percent]
-        )
+    for ifname, summary in ifnames_map.items():
+        iface_row: list[str | int] = [
+            ifname,
+            summary.nb_success,
+            summary.nb_failed,
+            format_percent(summary),
+            *format_times(summary),
+        ]
+        if radio:
+            radio_summary = radio.summary(ifname)
+            iface_row += [
+                radio_summary.signal_text,
+                radio_summary.bitrate_text,
+                radio_summary.errors_text,
+            ]
+        ifnames_table.add_row(iface_row)
     click.echo(ifnames_table.get_string())  # pyright: ignore [reportUnknownMemberType]
 
-    return 0
+    click.echo("")
+    click.echo(f"Requests per second ({format_timespan(context.perf_bucket)} buckets)")
+    rates_table = PrettyTable(
+        field_names=["From", "Req/s", *(TARGET_FIELDS if target else [])]
+    )
+    # target samples over each bucket, on the same (test host's) clock
+    started_on = min(results.timestamp, default=0) / 1000
+    for offset, rate in results.get_rates(context.perf_bucket):
+        rate_row = [format_timespan(offset), f"{rate:.1f}"]
+        if target:
+            rate_row += format_target(
+                target.summary(
+                    started_on + offset, started_on + offset + context.perf_bucket
+                )
+            )
+        rates_table.add_row(rate_row)
+    click.echo(rates_table.get_string())  # pyright: ignore [reportUnknownMemberType]
+
+    if stalled:
+        return STALLED_RETURNCODE
+    return GUARDED_RETURNCODE if guard and guard.stopped else 0
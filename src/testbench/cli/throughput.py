@@ -0,0 +1,179 @@
+import click
+from halo import Halo  # pyright: ignore [reportMissingTypeStubs]
+from humanfriendly import format_timespan
+from prettytable import PrettyTable
+
+from testbench.cli.common import (
+    connect_all_devices,
+    disconnect_all_devices,
+    get_filtered_wireless_devices,
+    get_leased_devices,
+    greet_for,
+    start_radio_sampler,
+)
+from testbench.context import Context
+from testbench.throughput import (
+    BUCKET_WIDTH,
+    DOWNLOAD,
+    UPLOAD,
+    Target,
+    ThroughputLevel,
+    get_ramp_levels,
+    measure_throughput,
+)
+from testbench.utils.stats import find_knee
+
+context = Context.get()
+logger = context.logger
+
+
+def show_knee(direction: str, levels: list[ThroughputLevel]):
+    points = [(level.nb_devices, level.mbps) for level in levels]
+    best = max(levels, key=lambda level: level.mbps)
+    knee = find_knee(points, context.throughput_knee_ratio)
+    if knee:
+        click.echo(
+            click.style(
+                f"{direction.title()} saturates at {knee[0]} devices "
+                f"({knee[1]:.1f} Mb/s). Best: {best.mbps:.1f} Mb/s "
+                f"with {best.nb_devices} devices",
+                fg="yellow",
+            )
+        )
+    else:
+        click.echo(
+            click.style(
+                f"{direction.title()} scaled up to {best.nb_devices} devices "
+                f"({best.mbps:.1f} Mb/s)",
+                fg="green",
+            )
+        )
+
+
+def main() -> int:
+    greet_for("Throughput Testing")
+
+    try:
+        targets = {DOWNLOAD: Target.from_url(context.throughput_url)}
+        if context.throughput_upload_url:
+            targets[UPLOAD] = Target.from_url(context.throughput_upload_url)
+    except ValueError as exc:
+        click.echo(click.style(str(exc), fg="red"))
+        return 2
+
+    all_wireless_devices = get_filtered_wireless_devices()
+    connections = connect_all_devices(
+        [device.ifname for device in all_wireless_devices.devices]
+    )
+    devices = get_leased_devices(connections.connected)
+    if not devices:
+        disconnect_all_devices()
+        return 3
+
+    radio = start_radio_sampler([device.ifname for device in devices])
+
+    results: dict[str, list[ThroughputLevel]] = {direction: [] for direction in targets}
+    for nb_devices in get_ramp_levels(len(devices), context.throughput_step):
+        for direction, target in targets.items():
+            with Halo(
+                text=f"Measuring {direction} over {nb_devices} devices",
+                spinner="dots",
+            ) as spinner:
+                level = measure_throughput(
+                    devices[:nb_devices],
+                    target,
+                    direction=direction,
+                    duration=context.throughput_duration,
+                    dns_server=context.dns_address,
+                )
+                results[direction].append(level)
+                message = (
+                    f"{direction.title()} over {nb_devices} devices: "
+                    f"{level.mbps:.1f} Mb/s"
+                )
+                if level.nb_failed:
+                    spinner.warn(  # pyright: ignore[reportUnknownMemberType]
+                        f"{message} ({level.nb_failed} failed)"
+                    )
+                else:
+                    spinner.succeed(message)  # pyright: ignore[reportUnknownMemberType]
+
+    if radio:
+        radio.stop()
+
+    click.echo("")
+    disconnect_all_devices()
+
+    click.echo("")
+    click.echo(
+        f"Throughput by number of devices "
+        f"({format_timespan(context.throughput_duration)} each)"
+    )
+    levels_table = PrettyTable(
+        field_names=[
+            "Devices",
+            *[
+                f"{direction.title()} {column}"
+                for direction in targets
+                for column in ("Mb/s", "Mb/s/dev", "Failed")
+            ],
+        ]
+    )
+    for index, level in enumerate(results[DOWNLOAD]):
+        levels_row: list[str | int] = [level.nb_devices]
+        for direction in targets:
+            entry = results[direction][index]
+            levels_row += [
+                f"{entry.mbps:.1f}",
+                f"{entry.mbps / entry.nb_devices:.1f}",
+                entry.nb_failed,
+            ]
+        levels_table.add_row(levels_row)
+    click.echo(levels_table.get_string())  # pyright: ignore [reportUnknownMemberType]
+
+    click.echo("")
+    click.echo(f"Throughput by Iface ({len(devices)} devices)")
+    radio_fields = ["Signal", "TX/RX Mb/s", "Retries/Failed"] if radio else []
+    ifaces_table = PrettyTable(
+        field_names=[
+            "Iface",
+            *[f"{direction.title()} Mb/s" for direction in targets],
+            *radio_fields,
+            "Error",
+        ]
+    )
+    for index, device in enumerate(devices):
+        streams = [results[direction][-1].streams[index] for direction in targets]
+        iface_row = [device.ifname, *[f"{stream.mbps:.1f}" for stream in streams]]
+        if radio:
+            summary = radio.summary(device.ifname)
+            iface_row += [
+                summary.signal_text,
+                summary.bitrate_text,
+                summary.errors_text,
+            ]
+        iface_row.append(" ".join(stream.error for stream in streams if stream.error))
+        ifaces_table.add_row(iface_row)
+    click.echo(ifaces_table.get_string())  # pyright: ignore [reportUnknownMemberType]
+
+    click.echo("")
+    click.echo(f"Aggregate throughput over time ({len(devices)} devices)")
+    timeline_table = PrettyTable(
+        field_names=["Time", *[f"{direction.title()} Mb/s" for direction in targets]]
+    )
+    timelines = [results[direction][-1].timeline for direction in targets]
+    for index, slot in enumerate(zip(*timelines, strict=True)):
+        timeline_table.add_row(
+            [f"{index * BUCKET_WIDTH:.0f}s", *[f"{mbps:.1f}" for mbps in slot]]
+        )
+    click.echo(timeline_table.get_string())  # pyright: ignore [reportUnknownMemberType]
+
+    click.echo("")
+    for direction, levels in results.items():
+        show_knee(direction, levels)
+
+    if all(
+        levels[-1].nb_failed == levels[-1].nb_devices for levels in results.values()
+    ):
+        return 4
+    return 0
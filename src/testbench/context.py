@@ -9,6 +9,7 @@ from playhouse.sqlite_ext import (  # pyright: ignore[reportMissingTypeStubs]
 )
 
 DEFAULT_DEBUG: bool = False
+DEFAULT_INSTRUMENT: bool = False
 NAME: str = "test-bench"
 NAME_CLI: str = "testbench"
 
@@ -31,6 +32,44 @@ DEFAULT_CONTENT_ID: str = ""
 DEFAULT_DB_PATH: Path = Path("testbench.db")
 DEFAULT_JMX_PATH: Path = Path(__file__).parent.joinpath("perf.jmx").resolve()
 DEFAULT_DHCP_TIMEOUT: int = 20
+DEFAULT_CONNECT_PARALLELISM: int = 4
+DEFAULT_CONNECT_STAGGER: float = 0.5
+DEFAULT_CONNECT_RETRIES: int = 2
+DEFAULT_TEARDOWN_PARALLELISM: int = 16
+DEFAULT_TEARDOWN_TIMEOUT: float = 15.0
+DEFAULT_RADIO_INTERVAL: float = 1.0
+DEFAULT_HOST_INTERVAL: float = 1.0
+TELEMETRY_SOURCES: tuple[str, ...] = ("http", "ssh")
+DEFAULT_TELEMETRY_INTERVAL: float = 5.0
+DEFAULT_TELEMETRY_PORT: int = 9100
+DEFAULT_TELEMETRY_USER: str = "root"
+CAPACITY_SEARCH_MODES: tuple[str, ...] = ("ramp", "bisect")
+DEFAULT_CAPACITY_THRESHOLD: float = 0.95
+DEFAULT_CAPACITY_STEP: int = 1
+DEFAULT_DNS_CACHE_MIN_TTL: float = 5.0
+DEFAULT_DNS_CACHE_NEGATIVE_TTL: float = 5.0
+DEFAULT_DNSBENCH_RATES: list[float] = [5, 10, 20, 50, 100]
+DEFAULT_DNSBENCH_DURATION: float = 10.0
+DEFAULT_DNSBENCH_TIMEOUT: float = 2.0
+DEFAULT_THROUGHPUT_URL: str = (
+    f"http://zim-download.{DEFAULT_FLD}.{DEFAULT_TLD}/kiwix-macos_3.8.0.dmg".lower()
+)
+DEFAULT_THROUGHPUT_DURATION: float = 10.0
+DEFAULT_THROUGHPUT_STEP: int = 1
+DEFAULT_THROUGHPUT_KNEE_RATIO: float = 0.25
+PERF_ENGINES: tuple[str, ...] = ("jmeter", "native")
+ARRIVALS: tuple[str, ...] = ("constant", "poisson")
+GUARD_ACTIONS: tuple[str, ...] = ("pause", "stop")
+DEFAULT_GUARD_MAX_LOSS: float = 0.5
+DEFAULT_GUARD_MAX_RESPONSE: float = 2000.0
+DEFAULT_PERF_JITTER: float = 0.5
+DEFAULT_PERF_DURATION: float = 60.0
+DEFAULT_PERF_WINDOW: float = 10.0
+DEFAULT_PERF_BUCKET: float = 60.0
+DEFAULT_PERF_STALL_TIMEOUT: float = 300.0
+DEFAULT_PERF_WARMUP: float = 30.0
+DEFAULT_PERF_HOLD: float = 120.0
+DEFAULT_PERF_KNEE_RATIO: float = 0.25
 
 
 @dataclass(kw_only=True)
@@ -42,10 +81,60 @@ class Context:
 
     # debug flag
     debug: bool = DEFAULT_DEBUG
+    # record external commands and report on them
+    instrument: bool = DEFAULT_INSTRUMENT
     command: str
 
     dhcp_timeout: int = DEFAULT_DHCP_TIMEOUT
 
+    # devices association
+    connect_parallelism: int = DEFAULT_CONNECT_PARALLELISM
+    connect_stagger: float = DEFAULT_CONNECT_STAGGER
+    connect_retries: int = DEFAULT_CONNECT_RETRIES
+    teardown_parallelism: int = DEFAULT_TEARDOWN_PARALLELISM
+    teardown_timeout: float = DEFAULT_TEARDOWN_TIMEOUT
+
+    # radio telemetry sampling interval (seconds). 0 disables it
+    radio_interval: float = DEFAULT_RADIO_INTERVAL
+    # test host resources sampling interval (seconds). 0 disables it
+    host_interval: float = DEFAULT_HOST_INTERVAL
+    # target resources collection (from gateway), disabled unless http or ssh
+    telemetry: str = ""
+    telemetry_interval: float = DEFAULT_TELEMETRY_INTERVAL
+    # node-exporter-style metrics endpoint (http)
+    telemetry_port: int = DEFAULT_TELEMETRY_PORT
+    # login of the target (ssh)
+    telemetry_user: str = DEFAULT_TELEMETRY_USER
+
+    # capacity search (integration), disabled unless set to ramp or bisect
+    capacity_search: str = ""
+    # min ratio of passed tests for a number of devices to be sustained
+    capacity_threshold: float = DEFAULT_CAPACITY_THRESHOLD
+    capacity_step: int = DEFAULT_CAPACITY_STEP
+
+    # per-device DNS cache of HTTP clients
+    bypass_dns_cache: bool = False
+    # min duration (seconds) answers are kept for, whatever their TTL
+    dns_cache_min_ttl: float = DEFAULT_DNS_CACHE_MIN_TTL
+    # duration (seconds) NXDOMAIN and empty answers are kept for
+    dns_cache_negative_ttl: float = DEFAULT_DNS_CACHE_NEGATIVE_TTL
+
+    # DNS load test: queries per second (per device) of each step
+    dnsbench_rates: list[float] = field(
+        default_factory=lambda: list(DEFAULT_DNSBENCH_RATES)
+    )
+    dnsbench_duration: float = DEFAULT_DNSBENCH_DURATION
+    dnsbench_timeout: float = DEFAULT_DNSBENCH_TIMEOUT
+
+    # throughput test
+    throughput_url: str = DEFAULT_THROUGHPUT_URL
+    # upload disabled unless set
+    throughput_upload_url: str = ""
+    throughput_duration: float = DEFAULT_THROUGHPUT_DURATION
+    throughput_step: int = DEFAULT_THROUGHPUT_STEP
+    # saturated once an added device brings less than this ratio of average
+    throughput_knee_ratio: float = DEFAULT_THROUGHPUT_KNEE_RATIO
+
     tld: str = DEFAULT_TLD
     fld: str = DEFAULT_FLD
     svc_domain: str = DEFAULT_SVC_DOMAIN
@@ -53,8 +142,39 @@ class Context:
 
     # database
     db_path: Path = DEFAULT_DB_PATH
+    # Hotspot image under test, runs are stored with it
+    hotspot_version: str = ""
     jmx_path: Path = DEFAULT_JMX_PATH
 
+    # perf: load generator (jmeter or native) and, for native, max think time
+    perf_engine: str = PERF_ENGINES[0]
+    perf_jitter: float = DEFAULT_PERF_JITTER
+    # open loop (native): requests per second over all devices, 0 for closed loop
+    perf_rate: float = 0.0
+    perf_arrivals: str = ARRIVALS[0]
+    perf_duration: float = DEFAULT_PERF_DURATION
+    # live stats over the last seconds of results
+    perf_window: float = DEFAULT_PERF_WINDOW
+    # width (seconds) of the requests rate buckets of the final report
+    perf_bucket: float = DEFAULT_PERF_BUCKET
+    # JMeter is stopped once results did not grow for that long (negative disables)
+    perf_stall_timeout: float = DEFAULT_PERF_STALL_TIMEOUT
+    # target health guard, disabled unless set to pause or stop
+    guard_action: str = ""
+    # probes' interface (dedicated or wired), routing table's if empty
+    guard_ifname: str = ""
+    # degraded over that ICMP loss ratio or response time (ms, ICMP or HTTP)
+    guard_max_loss: float = DEFAULT_GUARD_MAX_LOSS
+    guard_max_response: float = DEFAULT_GUARD_MAX_RESPONSE
+    # stepped load: 1, 2, 4… all devices (or those numbers of devices)
+    perf_stepped: bool = False
+    perf_steps: list[int] = field(default_factory=list[int])
+    # each step's ramp-up then measured durations (seconds)
+    perf_warmup: float = DEFAULT_PERF_WARMUP
+    perf_hold: float = DEFAULT_PERF_HOLD
+    # throughput flattens once an added user brings less than this ratio of average
+    perf_knee_ratio: float = DEFAULT_PERF_KNEE_RATIO
+
     # e2e params
     ssid: str = DEFAULT_SSID
     passphrase: str = DEFAULT_PASSPHRASE
@@ -1,17 +1,281 @@
-from peewee import CharField, DateTimeField, Model
+import datetime
+import json
+import time
+from collections.abc import Callable, Sequence
+from functools import partial
+from typing import Any, cast
+
+from peewee import (
+    AutoField,
+    BooleanField,
+    CharField,
+    DatabaseError,
+    DateTimeField,
+    FloatField,
+    ForeignKeyField,
+    IntegerField,
+    Model,
+    TextField,
+)
 from playhouse.sqlite_ext import JSONField  # pyright: ignore [reportMissingTypeStubs]
 
 from testbench.context import Context
+from testbench.hardware import SimpleWirelessDevice
+from testbench.integration import IntegrationTestResult
+from testbench.jtl import GroupSummary
+from testbench.utils.instrumentation import CommandSample
+from testbench.utils.wlan import WirelessDevice
 
 context = Context.get()
 logger = context.logger
 
+BATCH_SIZE: int = 100
+# pending results are written at least that often (seconds)
+FLUSH_INTERVAL: float = 5.0
+# params may hold addresses, paths…
+json_dumps = partial(json.dumps, default=str)
+
 
 class Status(Model):
     on = DateTimeField()
     kind = CharField()
     params = JSONField(default={})
-    results = JSONField(defaul={})
+    results = JSONField(default={})
+
+    class Meta:
+        database = context.db
+
+
+class ExternalCommand(Model):
+    """an external command (nmcli, ping…) launched during an instrumented run"""
+
+    run_id = CharField(index=True)
+    kind = CharField()
+    ifname = CharField(null=True)
+    started_on = DateTimeField()
+    duration = FloatField()
+    returncode = IntegerField()
+    concurrency = IntegerField()
+
+    class Meta:
+        database = context.db
+        indexes = ((("run_id", "kind"), False),)
+
+
+def save_command_samples(run_id: str, samples: list[CommandSample]) -> None:
+    context.db.create_tables(  # pyright: ignore[reportUnknownMemberType]
+        [ExternalCommand], safe=True
+    )
+    rows = [
+        {
+            "run_id": run_id,
+            "kind": sample.kind,
+            "ifname": sample.ifname,
+            "started_on": sample.started_on,
+            "duration": sample.duration,
+            "returncode": sample.returncode,
+            "concurrency": sample.concurrency,
+        }
+        for sample in samples
+    ]
+    with context.db.atomic():  # pyright: ignore[reportUnknownMemberType]
+        for index in range(0, len(rows), BATCH_SIZE):
+            ExternalCommand.insert_many(  # pyright: ignore[reportUnknownMemberType]
+                rows[index : index + BATCH_SIZE]
+            ).execute()
+
+
+class Run(Model):
+    """an integration or perf run (or a capacity level, a perf step) of a Hotspot"""
+
+    id = AutoField()
+    kind = CharField()
+    started_on = DateTimeField(index=True)
+    ended_on = DateTimeField(null=True)
+    hotspot_version = CharField(default="")
+    nb_devices = IntegerField(index=True)
+    params = JSONField(default={}, json_dumps=json_dumps)
+    # overall outcome, once ended
+    results = JSONField(default={}, json_dumps=json_dumps)
+
+    class Meta:
+        database = context.db
+        indexes = ((("hotspot_version", "started_on"), False),)
+
+
+class Device(Model):
+    """a device (interface) used by a run"""
+
+    run = ForeignKeyField(Run, backref="devices", on_delete="CASCADE")
+    ifname = CharField()
+    hwaddr = CharField()
+    vendor = CharField()
 
     class Meta:
         database = context.db
+        indexes = ((("run", "ifname"), True),)
+
+
+class IntegrationResult(Model):
+    """outcome of an integration test on a device"""
+
+    run = ForeignKeyField(Run, backref="integration_results", on_delete="CASCADE")
+    device = ForeignKeyField(Device, backref="results", on_delete="CASCADE")
+    name = CharField()
+    on = DateTimeField()
+    succeeded = BooleanField()
+    feedback = TextField(default="")
+    duration = FloatField()
+
+    class Meta:
+        database = context.db
+        indexes = ((("run", "name"), False),)
+
+
+class PerfAggregate(Model):
+    """perf samples of a label or interface (or all, as total), times in ms"""
+
+    run = ForeignKeyField(Run, backref="perf_aggregates", on_delete="CASCADE")
+    # label, ifname or total
+    group = CharField()
+    key = CharField()
+    nb_success = IntegerField()
+    nb_failed = IntegerField()
+    elapsed_p50 = FloatField()
+    elapsed_p90 = FloatField()
+    elapsed_p99 = FloatField()
+    elapsed_max = FloatField()
+    latency_p50 = FloatField()
+    latency_p90 = FloatField()
+    latency_p99 = FloatField()
+    connect_p50 = FloatField()
+    connect_p90 = FloatField()
+    connect_p99 = FloatField()
+
+    class Meta:
+        database = context.db
+        indexes = ((("run", "group", "key"), True),)
+
+
+RESULTS_TABLES: list[type[Model]] = [Run, Device, IntegrationResult, PerfAggregate]
+
+
+class RunStore:
+    """Records a run, its devices and results in the database as they come
+
+    Integration results are buffered and written in transactions of up to
+    BATCH_SIZE rows, at least every FLUSH_INTERVAL seconds. A failing write
+    is logged and its rows dropped: storing never fails the run itself"""
+
+    def __init__(
+        self,
+        kind: str,
+        *,
+        devices: Sequence[WirelessDevice | SimpleWirelessDevice],
+        params: dict[str, Any] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        context.db.create_tables(  # pyright: ignore[reportUnknownMemberType]
+            RESULTS_TABLES, safe=True
+        )
+        self.clock = clock
+        self.pending: list[IntegrationTestResult] = []
+        self.flushed_on: float = self.clock()
+        with context.db.atomic():  # pyright: ignore[reportUnknownMemberType]
+            self.run_id = cast(
+                int,
+                Run.insert(  # pyright: ignore[reportUnknownMemberType]
+                    kind=kind,
+                    started_on=datetime.datetime.now(datetime.UTC),
+                    hotspot_version=context.hotspot_version,
+                    nb_devices=len(devices),
+                    params=params or {},
+                ).execute(),
+            )
+            self.device_ids: dict[str, int] = {
+                device.ifname: Device.insert(  # pyright: ignore[reportUnknownMemberType]
+                    run=self.run_id,
+                    ifname=device.ifname,
+                    hwaddr=device.hwaddr,
+                    vendor=device.vendor,
+                ).execute()
+                for device in devices
+            }
+
+    def insert(self, model: type[Model], rows: list[dict[str, Any]]):
+        """rows in a single transaction, BATCH_SIZE per statement"""
+        try:
+            with context.db.atomic():  # pyright: ignore[reportUnknownMemberType]
+                for index in range(0, len(rows), BATCH_SIZE):
+                    model.insert_many(  # pyright: ignore[reportUnknownMemberType]
+                        rows[index : index + BATCH_SIZE]
+                    ).execute()
+        except DatabaseError as exc:
+            logger.error(f"Unable to store {len(rows)} {model.__name__} rows: {exc}")
+
+    def add_results(self, results: list[IntegrationTestResult]):
+        """integration results, written once enough are pending (or old enough)"""
+        self.pending += results
+        if (
+            len(self.pending) >= BATCH_SIZE
+            or self.clock() - self.flushed_on >= FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def flush(self):
+        pending, self.pending = self.pending, []
+        self.flushed_on = self.clock()
+        if not pending:
+            return
+        self.insert(
+            IntegrationResult,
+            [
+                {
+                    "run": self.run_id,
+                    "device": self.device_ids.get(result.ifname),
+                    "name": result.name,
+                    "on": result.on,
+                    "succeeded": result.succeeded,
+                    "feedback": result.feedback,
+                    "duration": result.duration,
+                }
+                for result in pending
+                if result.ifname in self.device_ids
+            ],
+        )
+
+    def add_summaries(self, group: str, summaries: dict[str, GroupSummary]):
+        """perf aggregates of group (label, ifname or total), by key"""
+        self.insert(
+            PerfAggregate,
+            [
+                {
+                    "run": self.run_id,
+                    "group": group,
+                    "key": key,
+                    "nb_success": summary.nb_success,
+                    "nb_failed": summary.nb_failed,
+                    "elapsed_p50": summary.elapsed.p50,
+                    "elapsed_p90": summary.elapsed.p90,
+                    "elapsed_p99": summary.elapsed.p99,
+                    "elapsed_max": summary.elapsed.max,
+                    "latency_p50": summary.latency.p50,
+                    "latency_p90": summary.latency.p90,
+                    "latency_p99": summary.latency.p99,
+                    "connect_p50": summary.connect.p50,
+                    "connect_p90": summary.connect.p90,
+                    "connect_p99": summary.connect.p99,
+                }
+                for key, summary in summaries.items()
+            ],
+        )
+
+    def finish(self, results: dict[str, Any] | None = None):
+        """write pending results and record the run's end and outcome"""
+        self.flush()
+        try:
+            Run.update(  # pyright: ignore[reportUnknownMemberType]
+                ended_on=datetime.datetime.now(datetime.UTC), results=results or {}
+            ).where(Run.id == self.run_id).execute()
+        except DatabaseError as exc:
+            logger.error(f"Unable to store run outcome: {exc}")
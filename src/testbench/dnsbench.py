@@ -0,0 +1,249 @@
+import asyncio
+import random
+import socket
+import struct
+from dataclasses import dataclass, field
+from ipaddress import IPv4Address
+
+import dns.exception
+import dns.message
+import dns.rcode
+import dns.rdatatype
+
+from testbench.context import Context
+from testbench.utils.dns import DNS_PORT, get_a_records
+from testbench.utils.icmp import SO_BINDTODEVICE
+from testbench.utils.stats import Distribution
+
+logger = Context.logger
+
+# DNS header starts with the 16-bit query id
+QUERY_ID = struct.Struct("!H")
+DNS_HEADER_SIZE: int = 12
+# public names captured by the hotspot (answered with the captured address offline)
+CAPTURED_DOMAINS: list[str] = [
+    "apple.com",
+    "captive.apple.com",
+    "connectivitycheck.gstatic.com",
+    "www.msftconnecttest.com",
+]
+
+
+@dataclass(kw_only=True)
+class MixEntry:
+    domain: str
+    # None accepts any address
+    expected: IPv4Address | None
+    weight: int = 1
+
+
+def get_default_mix() -> list[MixEntry]:
+    """hotspot names (most queried) then captured public ones"""
+    context = Context.get()
+    hotspot = context.gateway_address
+    captured = None if context.assume_online else context.dns_captured_address
+    return [
+        MixEntry(domain=context.fqdn, expected=hotspot, weight=4),
+        MixEntry(
+            domain=".".join([context.svc_domain, context.fqdn]),
+            expected=hotspot,
+            weight=3,
+        ),
+        MixEntry(
+            domain=".".join([context.zim_manager_domain, context.fqdn]),
+            expected=hotspot,
+        ),
+        *[MixEntry(domain=domain, expected=captured) for domain in CAPTURED_DOMAINS],
+    ]
+
+
+@dataclass(kw_only=True)
+class LoadLevel:
+    """outcome of all sources querying at qps for duration seconds"""
+
+    qps: float  # target rate, per source
+    nb_sources: int
+    duration: float
+    nb_sent: int = 0
+    nb_correct: int = 0
+    # answered but not with the expected address (incl. error rcodes)
+    nb_wrong: int = 0
+    nb_timeouts: int = 0
+    # unsendable queries and unparsable responses
+    nb_errors: int = 0
+    # of all answered queries, in milliseconds
+    latencies: list[float] = field(default_factory=list[float])
+
+    @property
+    def target_qps(self) -> float:
+        return self.qps * self.nb_sources
+
+    @property
+    def achieved_qps(self) -> float:
+        """rate of answered queries"""
+        return len(self.latencies) / self.duration if self.duration else 0.0
+
+    @property
+    def success_rate(self) -> float:
+        return self.nb_correct / self.nb_sent if self.nb_sent else 0.0
+
+    @property
+    def latency(self) -> Distribution:
+        return Distribution.of(self.latencies)
+
+
+class QuerySender(asyncio.DatagramProtocol):
+    """Fires queries from a single socket, matching answers on query id
+
+    Open-loop: queries are sent on schedule whether previous ones were
+    answered or not, so a slow server does not slow the load down."""
+
+    def __init__(
+        self,
+        mix: list[MixEntry],
+        level: LoadLevel,
+        timeout: float,
+        seed: int = 0,
+    ):
+        self.level = level
+        self.timeout = timeout
+        self.loop = asyncio.get_running_loop()
+        self.transport: asyncio.DatagramTransport | None = None
+        self.pending: dict[int, tuple[float, MixEntry, asyncio.TimerHandle]] = {}
+        rng = random.Random(seed)  # noqa: S311
+        self.next_id = rng.getrandbits(16)
+        # weighted, shuffled, round-robin schedule of pre-encoded queries
+        self.schedule = [entry for entry in mix for _ in range(entry.weight)]
+        rng.shuffle(self.schedule)
+        self.wires = {
+            entry.domain: dns.message.make_query(
+                entry.domain, dns.rdatatype.A
+            ).to_wire()
+            for entry in mix
+        }
+
+    def connection_made(self, transport: asyncio.BaseTransport):
+        self.transport = transport  # pyright: ignore[reportAttributeAccessIssue]
+
+    def error_received(self, exc: Exception):
+        logger.debug(f"DNS socket error: {exc}")
+
+    def send(self, entry: MixEntry):
+        if not self.transport:
+            return
+        qid = self.next_id
+        while qid in self.pending:
+            qid = (qid + 1) & 0xFFFF
+        self.next_id = (qid + 1) & 0xFFFF
+        wire = bytearray(self.wires[entry.domain])
+        QUERY_ID.pack_into(wire, 0, qid)
+        self.level.nb_sent += 1
+        try:
+            self.transport.sendto(wire)
+        except OSError:
+            self.level.nb_errors += 1
+            return
+        self.pending[qid] = (
+            self.loop.time(),
+            entry,
+            self.loop.call_later(self.timeout, self.expire, qid),
+        )
+
+    def expire(self, qid: int):
+        if self.pending.pop(qid, None):
+            self.level.nb_timeouts += 1
+
+    def datagram_received(
+        self, data: bytes, addr: tuple[str | bytes, int]  # noqa: ARG002
+    ):
+        if len(data) < DNS_HEADER_SIZE:
+            return
+        item = self.pending.pop(QUERY_ID.unpack_from(data)[0], None)
+        if not item:
+            # answered after timeout
+            return
+        sent_on, entry, timer = item
+        timer.cancel()
+        self.level.latencies.append((self.loop.time() - sent_on) * 1000)
+        try:
+            response = dns.message.from_wire(data)
+        except dns.exception.DNSException:
+            self.level.nb_errors += 1
+            return
+        addresses, _ = get_a_records(response)
+        correct = response.rcode() == dns.rcode.NOERROR and (
+            addresses == [entry.expected] if entry.expected else bool(addresses)
+        )
+        if correct:
+            self.level.nb_correct += 1
+        else:
+            self.level.nb_wrong += 1
+
+    async def fire(self, qps: float, duration: float):
+        start = self.loop.time()
+        for index in range(round(qps * duration)):
+            delay = start + index / qps - self.loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.send(self.schedule[index % len(self.schedule)])
+
+    async def drain(self):
+        """wait for all pending queries to be answered or timed-out"""
+        while self.pending:
+            await asyncio.sleep(0.05)
+
+    def close(self):
+        for _, _, timer in self.pending.values():
+            timer.cancel()
+        if self.transport:
+            self.transport.close()
+
+
+@dataclass(kw_only=True)
+class Source:
+    address: IPv4Address
+    # interface to bind to (address only otherwise)
+    ifname: str | None = None
+
+
+def open_socket(source: Source, server: IPv4Address, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        if source.ifname:
+            sock.setsockopt(socket.SOL_SOCKET, SO_BINDTODEVICE, source.ifname.encode())
+        sock.bind((str(source.address), 0))
+        sock.connect((str(server), port))
+        sock.setblocking(False)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+async def run_load_level(
+    sources: list[Source],
+    server: IPv4Address,
+    *,
+    mix: list[MixEntry],
+    qps: float,
+    duration: float,
+    timeout: float,
+    port: int = DNS_PORT,
+) -> LoadLevel:
+    """query server from all sources at once, each at qps for duration seconds"""
+    loop = asyncio.get_running_loop()
+    level = LoadLevel(qps=qps, nb_sources=len(sources), duration=duration)
+    senders: list[QuerySender] = []
+    try:
+        for index, source in enumerate(sources):
+            sender = QuerySender(mix, level, timeout=timeout, seed=index)
+            await loop.create_datagram_endpoint(
+                lambda sender=sender: sender, sock=open_socket(source, server, port)
+            )
+            senders.append(sender)
+        await asyncio.gather(*[sender.fire(qps, duration) for sender in senders])
+        await asyncio.gather(*[sender.drain() for sender in senders])
+    finally:
+        for sender in senders:
+            sender.close()
+    return level
@@ -6,7 +6,18 @@ from pathlib import Path
 from types import FrameType
 
 from testbench.__about__ import __version__
-from testbench.context import DEFAULT_DB_PATH, NAME_CLI, Context
+from testbench.context import (
+    ARRIVALS,
+    CAPACITY_SEARCH_MODES,
+    DEFAULT_DB_PATH,
+    DEFAULT_DNSBENCH_RATES,
+    GUARD_ACTIONS,
+    NAME_CLI,
+    PERF_ENGINES,
+    TELEMETRY_SOURCES,
+    Context,
+)
+from testbench.utils.instrumentation import CommandRecorder
 
 logger = Context.logger
 
@@ -25,6 +36,13 @@ def prepare_context(raw_args: list[str]) -> None:
         default=Context.debug,
     )
 
+    parser.add_argument(
+        "--instrument",
+        help="Record all external commands (nmcli, ping…) and report on them",
+        action="store_true",
+        default=Context.instrument,
+    )
+
     parser.add_argument(
         "--db",
         help="Path to SQLite database",
@@ -33,6 +51,14 @@ def prepare_context(raw_args: list[str]) -> None:
         dest="db_path",
     )
 
+    parser.add_argument(
+        "--hotspot-version",
+        help="Version of the Hotspot image under test, stored with runs' results",
+        dest="hotspot_version",
+        default=Context.hotspot_version,
+        required=False,
+    )
+
     parser.add_argument(
         "--version",
         help="Display version and exit",
@@ -81,6 +107,134 @@ def prepare_context(raw_args: list[str]) -> None:
         required=False,
     )
 
+    parser.add_argument(
+        "--connect-parallelism",
+        help="Max number of devices associating concurrently",
+        dest="connect_parallelism",
+        type=int,
+        default=Context.connect_parallelism,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--connect-stagger",
+        help="Min delay (seconds) between two association attempts",
+        dest="connect_stagger",
+        type=float,
+        default=Context.connect_stagger,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--connect-retries",
+        help="Number of association retries per device before giving up on it",
+        dest="connect_retries",
+        type=int,
+        default=Context.connect_retries,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--teardown-parallelism",
+        help="Max number of devices being disconnected concurrently",
+        dest="teardown_parallelism",
+        type=int,
+        default=Context.teardown_parallelism,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--teardown-timeout",
+        help="Max duration (seconds) to disconnect a single device",
+        dest="teardown_timeout",
+        type=float,
+        default=Context.teardown_timeout,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--radio-interval",
+        help="Interval (seconds) of per-device radio telemetry sampling. "
+        "Negative to disable",
+        dest="radio_interval",
+        type=float,
+        default=Context.radio_interval,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--host-interval",
+        help="Interval (seconds) of test host's resources sampling (CPU, memory, "
+        "load generator's RSS, interfaces counters). Negative to disable",
+        dest="host_interval",
+        type=float,
+        default=Context.host_interval,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--telemetry",
+        help="Collect target's resources (CPU, memory, load, temperature and "
+        "containers) from the gateway while running: node-exporter-style "
+        "metrics endpoint (http) or commands over SSH (ssh)",
+        dest="telemetry",
+        choices=TELEMETRY_SOURCES,
+        default=Context.telemetry,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--telemetry-interval",
+        help="Interval (seconds) of target's resources collection",
+        dest="telemetry_interval",
+        type=float,
+        default=Context.telemetry_interval,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--telemetry-port",
+        help="Port of gateway's metrics endpoint (http telemetry)",
+        dest="telemetry_port",
+        type=int,
+        default=Context.telemetry_port,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--telemetry-user",
+        help="User to log into the gateway as (ssh telemetry, key-based)",
+        dest="telemetry_user",
+        default=Context.telemetry_user,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--bypass-dns-cache",
+        help="Resolve every HTTP connection's host (measures cold resolution)",
+        action="store_true",
+        dest="bypass_dns_cache",
+        default=Context.bypass_dns_cache,
+    )
+
+    parser.add_argument(
+        "--dns-cache-min-ttl",
+        help="Min duration (seconds) DNS answers are cached for, whatever their TTL",
+        dest="dns_cache_min_ttl",
+        type=float,
+        default=Context.dns_cache_min_ttl,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--dns-cache-negative-ttl",
+        help="Duration (seconds) NXDOMAIN and empty DNS answers are cached for",
+        dest="dns_cache_negative_ttl",
+        type=float,
+        default=Context.dns_cache_negative_ttl,
+        required=False,
+    )
+
     subparsers = parser.add_subparsers(
         help="Available subcommands", required=True, dest="command"
     )
@@ -148,6 +302,34 @@ def prepare_context(raw_args: list[str]) -> None:
         required=False,
     )
 
+    integration_parser.add_argument(
+        "--capacity-search",
+        help="Search the max number of devices passing tests, "
+        "ramping up or bisecting the number of devices",
+        dest="capacity_search",
+        choices=CAPACITY_SEARCH_MODES,
+        default=Context.capacity_search,
+        required=False,
+    )
+
+    integration_parser.add_argument(
+        "--capacity-threshold",
+        help="Min ratio of passed tests for a number of devices to be sustained",
+        dest="capacity_threshold",
+        type=float,
+        default=Context.capacity_threshold,
+        required=False,
+    )
+
+    integration_parser.add_argument(
+        "--capacity-step",
+        help="Number of devices added at each ramp step (resolution of bisect)",
+        dest="capacity_step",
+        type=int,
+        default=Context.capacity_step,
+        required=False,
+    )
+
     perf_parser = subparsers.add_parser(
         "perf",
         help="Query the testbench host for its status "
@@ -175,13 +357,308 @@ def prepare_context(raw_args: list[str]) -> None:
         required=False,
     )
 
+    perf_parser.add_argument(
+        "--engine",
+        help="Load generator: JMeter (with the JMX) "
+        "or the built-in one (perf.jmx scenario)",
+        choices=PERF_ENGINES,
+        dest="perf_engine",
+        default=Context.perf_engine,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--jitter",
+        help="Max random think time between requests of native engine's users "
+        "(seconds)",
+        type=float,
+        dest="perf_jitter",
+        default=Context.perf_jitter,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--rate",
+        help="Open loop: requests per second (over all devices) started on "
+        "schedule, whether previous ones were answered or not. Native engine only",
+        type=float,
+        dest="perf_rate",
+        default=Context.perf_rate,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--arrivals",
+        help="Open loop's schedule: evenly spaced or Poisson process",
+        choices=ARRIVALS,
+        dest="perf_arrivals",
+        default=Context.perf_arrivals,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--duration",
+        help="Duration (seconds) of the open loop run",
+        type=float,
+        dest="perf_duration",
+        default=Context.perf_duration,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--window",
+        help="Duration (seconds) of the rolling window of live stats",
+        type=float,
+        dest="perf_window",
+        default=Context.perf_window,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--bucket",
+        help="Duration (seconds) of the requests rate buckets in the final report",
+        type=float,
+        dest="perf_bucket",
+        default=Context.perf_bucket,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--stall-timeout",
+        help="Stop JMeter (thread dump, SIGTERM then SIGKILL) once no results "
+        "were written for that long (seconds). Negative disables",
+        type=float,
+        dest="perf_stall_timeout",
+        default=Context.perf_stall_timeout,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--guard",
+        help="Probe the target (ICMP and HTTP) during the run and pause or stop "
+        "the load once it degrades",
+        choices=GUARD_ACTIONS,
+        dest="guard_action",
+        default=Context.guard_action,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--guard-ifname",
+        help="Interface to probe the target from (a spare device or the wired "
+        "link). Defaults to routing table's",
+        dest="guard_ifname",
+        default=Context.guard_ifname,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--guard-max-loss",
+        help="ICMP loss ratio from which the target is degraded",
+        type=float,
+        dest="guard_max_loss",
+        default=Context.guard_max_loss,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--guard-max-response",
+        help="ICMP or HTTP response time (ms) from which the target is degraded",
+        type=float,
+        dest="guard_max_response",
+        default=Context.guard_max_response,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--stepped",
+        help="Run in steps of 1, 2, 4… all devices, reporting a capacity curve",
+        action="store_true",
+        dest="perf_stepped",
+        default=Context.perf_stepped,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--step",
+        help="Number of devices of a step (implies --stepped). Repeatable",
+        type=int,
+        dest="perf_steps",
+        action="append",
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--warmup",
+        help="Duration (seconds) of each step's warm-up, left out of its stats. "
+        "Should cover ramp-up (1s per device)",
+        type=float,
+        dest="perf_warmup",
+        default=Context.perf_warmup,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--hold",
+        help="Duration (seconds) of each step's measured load, after warm-up",
+        type=float,
+        dest="perf_hold",
+        default=Context.perf_hold,
+        required=False,
+    )
+
+    perf_parser.add_argument(
+        "--knee-ratio",
+        help="Throughput flattens once a step's added devices bring less than "
+        "this ratio of the average per device",
+        type=float,
+        dest="perf_knee_ratio",
+        default=Context.perf_knee_ratio,
+        required=False,
+    )
+
+    throughput_parser = subparsers.add_parser(
+        "throughput", help="Max aggregate WiFi throughput over all devices"
+    )
+
+    throughput_parser.add_argument(
+        "--ssid",
+        help="SSID of network to connect to (Offspot SSID)",
+        dest="ssid",
+        default=Context.ssid,
+        required=False,
+    )
+
+    throughput_parser.add_argument(
+        "--passphrase",
+        help="WPA2 Passphrase of network to connect to",
+        dest="passphrase",
+        default=Context.passphrase,
+        required=False,
+    )
+
+    throughput_parser.add_argument(
+        "--download-url",
+        help="HTTP URL of a large file to download",
+        dest="throughput_url",
+        default=Context.throughput_url,
+        required=False,
+    )
+
+    throughput_parser.add_argument(
+        "--upload-url",
+        help="HTTP URL to POST bulk payloads to (upload not tested otherwise)",
+        dest="throughput_upload_url",
+        default=Context.throughput_upload_url,
+        required=False,
+    )
+
+    throughput_parser.add_argument(
+        "--duration",
+        help="Duration (seconds) of each measure",
+        dest="throughput_duration",
+        type=float,
+        default=Context.throughput_duration,
+        required=False,
+    )
+
+    throughput_parser.add_argument(
+        "--step",
+        help="Number of devices added at each ramp step",
+        dest="throughput_step",
+        type=int,
+        default=Context.throughput_step,
+        required=False,
+    )
+
+    throughput_parser.add_argument(
+        "--knee-ratio",
+        help="Throughput is saturated once an added device brings less "
+        "than this ratio of the average per-device throughput",
+        dest="throughput_knee_ratio",
+        type=float,
+        default=Context.throughput_knee_ratio,
+        required=False,
+    )
+
+    dnsbench_parser = subparsers.add_parser(
+        "dns-bench", help="Load test the Hotspot's DNS server from all devices"
+    )
+
+    dnsbench_parser.add_argument(
+        "--ssid",
+        help="SSID of network to connect to (Offspot SSID)",
+        dest="ssid",
+        default=Context.ssid,
+        required=False,
+    )
+
+    dnsbench_parser.add_argument(
+        "--passphrase",
+        help="WPA2 Passphrase of network to connect to",
+        dest="passphrase",
+        default=Context.passphrase,
+        required=False,
+    )
+
+    dnsbench_parser.add_argument(
+        "--rate",
+        help="Queries per second per device of a load step (repeat for more steps). "
+        f"Defaults to {', '.join(str(rate) for rate in DEFAULT_DNSBENCH_RATES)}",
+        dest="dnsbench_rates",
+        type=float,
+        action="append",
+        required=False,
+    )
+
+    dnsbench_parser.add_argument(
+        "--duration",
+        help="Duration (seconds) of each load step",
+        dest="dnsbench_duration",
+        type=float,
+        default=Context.dnsbench_duration,
+        required=False,
+    )
+
+    dnsbench_parser.add_argument(
+        "--timeout",
+        help="Duration (seconds) after which a query is considered lost",
+        dest="dnsbench_timeout",
+        type=float,
+        default=Context.dnsbench_timeout,
+        required=False,
+    )
+
+    dnsbench_parser.add_argument(
+        "--assume-online",
+        help="Whether target device is assumed to be online or not",
+        action="store_true",
+        dest="assume_online",
+        default=Context.assume_online,
+        required=False,
+    )
+
     args = parser.parse_args(raw_args)
     # ignore unset values in order to not override Context defaults
-    args_dict = {key: value for key, value in args._get_kwargs() if value}
+    # (but keep falsy ones: 0 is a valid delay, retries or TTL)
+    args_dict = {key: value for key, value in args._get_kwargs() if value is not None}
 
     Context.setup(**args_dict)
 
 
+def report_commands(recorder: CommandRecorder):
+    """display and store external commands recorded during the run"""
+    # late import as to have an initialized Context
+    from testbench.cli.common import show_commands_report
+    from testbench.database import save_command_samples
+
+    show_commands_report(recorder)
+    try:
+        save_command_samples(recorder.run_id, recorder.samples)
+    except Exception as exc:
+        logger.error(f"Unable to store external commands: {exc}")
+
+
 def main() -> int:
     debug = Context.debug
     try:
@@ -195,11 +672,20 @@ def main() -> int:
 
                 from testbench.cli.status import main as main_prog
 
+            case "integration" if context.capacity_search:
+                from testbench.cli.capacity import main as main_prog
+
             case "integration":
                 from testbench.cli.integration import main as main_prog
 
             case "perf":
                 from testbench.cli.perf import main as main_prog
+
+            case "throughput":
+                from testbench.cli.throughput import main as main_prog
+
+            case "dns-bench":
+                from testbench.cli.dnsbench import main as main_prog
             case _:
                 return 1
 
@@ -212,6 +698,12 @@ def main() -> int:
         signal.signal(signal.SIGINT, exit_gracefully)
         signal.signal(signal.SIGQUIT, exit_gracefully)
 
+        if context.instrument:
+            recorder = CommandRecorder.enable()
+            try:
+                return main_prog()
+            finally:
+                report_commands(recorder)
         return main_prog()
     except Exception as exc:
         logger.error(f"General failure: {exc!s}")
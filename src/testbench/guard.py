@@ -0,0 +1,234 @@
+import socket
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from ipaddress import IPv4Address
+from typing import Protocol
+
+from testbench.context import GUARD_ACTIONS, Context
+from testbench.utils.icmp import ICMP_UNAVAILABLE, SO_BINDTODEVICE, PingStats, ping
+from testbench.utils.sampler import PeriodicSampler
+
+logger = Context.logger
+
+PAUSE, STOP = GUARD_ACTIONS
+PAUSED, RESUMED, STOPPED = "paused", "resumed", "stopped"
+
+PROBE_INTERVAL: float = 2.0
+PROBE_TIMEOUT: float = 5.0
+HTTP_PORT: int = 80
+# consecutive probes for the target to be considered degraded / recovered
+DEGRADED_PROBES: int = 3
+RECOVERED_PROBES: int = 3
+# paused load is stopped if the target did not recover meanwhile
+PAUSE_TIMEOUT: float = 120.0
+
+Pinger = Callable[[str, str | None], PingStats]
+
+
+class Controllable(Protocol):
+    def pause(self) -> None: ...
+
+    def resume(self) -> None: ...
+
+    def stop(self) -> None: ...
+
+
+def ping_gateway(host: str, ifname: str | None) -> PingStats:
+    return ping(host, ifname, count=3, interval=0.1, timeout=1)
+
+
+def probe_http(
+    address: IPv4Address,
+    host: str,
+    *,
+    port: int = HTTP_PORT,
+    path: str = "/",
+    ifname: str | None = None,
+    timeout: float = PROBE_TIMEOUT,
+) -> float:
+    """time to first byte (ms) of a GET, connection included. OSError on failure"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        if ifname:
+            sock.setsockopt(socket.SOL_SOCKET, SO_BINDTODEVICE, ifname.encode())
+        sock.settimeout(timeout)
+        start = time.perf_counter()
+        sock.connect((str(address), port))
+        sock.sendall(
+            f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode()
+        )
+        data = sock.recv(16)
+        response = (time.perf_counter() - start) * 1000
+    if not data.startswith(b"HTTP/"):
+        raise OSError("Not an HTTP response")
+    return response
+
+
+@dataclass(kw_only=True, slots=True)
+class HealthSample:
+    on: float  # timestamp
+    # None when ICMP is unavailable
+    loss: float | None
+    rtt: float | None  # ms, average
+    response: float | None  # ms, HTTP time to first byte
+    # why this probe is degraded (empty if healthy)
+    reasons: list[str] = field(default_factory=list[str])
+
+
+@dataclass(kw_only=True)
+class GuardEvent:
+    """an action on the load, and the load level at that time"""
+
+    action: str
+    reason: str
+    # seconds since load started
+    elapsed: float
+    nb_users: int
+    # requests per second, over the live window
+    rate: float
+
+    def __str__(self) -> str:
+        return (
+            f"Load {self.action} after {self.elapsed:.0f}s at {self.nb_users} users, "
+            f"{self.rate:.1f} req/s: {self.reason}"
+        )
+
+
+class HealthGuard(PeriodicSampler[HealthSample]):
+    """Probes the target during a run, pausing or stopping the load if degraded
+
+    ICMP to address and a GET on its HTTP server, over ifname (a dedicated
+    interface or the wired link; routing table's if None).
+    Probes run in the background; apply() acts on the load from the caller's
+    thread, once DEGRADED_PROBES probes in a row crossed a threshold.
+    Paused load is resumed after RECOVERED_PROBES healthy probes in a row"""
+
+    name: str = "guard"
+
+    def __init__(
+        self,
+        *,
+        address: IPv4Address,
+        host: str,
+        action: str,
+        max_loss: float,
+        max_response: float,
+        ifname: str | None = None,
+        interval: float = PROBE_INTERVAL,
+        port: int = HTTP_PORT,
+        pinger: Pinger = ping_gateway,
+        pause_timeout: float = PAUSE_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if action not in GUARD_ACTIONS:
+            raise ValueError(f"Unknown guard action: {action}")
+        super().__init__(interval=interval)
+        self.address = address
+        self.host = host
+        self.action = action
+        self.max_loss = max_loss
+        self.max_response = max_response
+        self.ifname = ifname
+        self.port = port
+        self.pinger = pinger
+        self.pause_timeout = pause_timeout
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.events: list[GuardEvent] = []
+        # consecutive degraded / healthy probes
+        self.nb_degraded: int = 0
+        self.nb_healthy: int = 0
+        self.icmp_available: bool = True
+        self.paused_on: float | None = None
+        self.stopped: bool = False
+
+    @property
+    def paused(self) -> bool:
+        return self.paused_on is not None
+
+    @property
+    def first_degradation(self) -> GuardEvent | None:
+        return next((event for event in self.events if event.action != RESUMED), None)
+
+    def sample(self):
+        sample = HealthSample(on=time.time(), loss=None, rtt=None, response=None)
+        if self.icmp_available:
+            stats = self.pinger(str(self.address), self.ifname)
+            if stats.error.startswith(ICMP_UNAVAILABLE):
+                logger.warning(f"Guard goes on without ICMP: {stats.error}")
+                self.icmp_available = False
+            else:
+                sample.loss = stats.loss
+                sample.rtt = stats.rtt.avg if stats.nb_received else None
+        if sample.loss is not None and sample.loss >= self.max_loss:
+            sample.reasons.append(f"{sample.loss:.0%} ICMP loss")
+        if sample.rtt is not None and sample.rtt >= self.max_response:
+            sample.reasons.append(f"ICMP RTT {sample.rtt:.0f} ms")
+
+        try:
+            sample.response = probe_http(
+                self.address, self.host, port=self.port, ifname=self.ifname
+            )
+        except OSError as exc:
+            sample.reasons.append(f"HTTP failed: {exc or type(exc).__name__}")
+        if sample.response is not None and sample.response >= self.max_response:
+            sample.reasons.append(f"HTTP in {sample.response:.0f} ms")
+
+        self.record(sample)
+        with self.lock:
+            if sample.reasons:
+                self.nb_degraded += 1
+                self.nb_healthy = 0
+            else:
+                self.nb_healthy += 1
+                self.nb_degraded = 0
+
+    def apply(
+        self, runner: Controllable, *, elapsed: float, nb_users: int, rate: float
+    ) -> GuardEvent | None:
+        """pause, resume or stop runner depending on recent probes
+
+        elapsed, nb_users and rate describe the current load, for the record"""
+        if self.stopped:
+            return None
+        with self.lock:
+            degraded = self.nb_degraded >= DEGRADED_PROBES
+            recovered = self.nb_healthy >= RECOVERED_PROBES
+            samples = self.samples()
+            reason = "; ".join(samples[-1].reasons) if samples else ""
+
+        def record(action: str, reason: str) -> GuardEvent:
+            event = GuardEvent(
+                action=action,
+                reason=reason,
+                elapsed=elapsed,
+                nb_users=nb_users,
+                rate=rate,
+            )
+            self.events.append(event)
+            logger.warning(str(event))
+            return event
+
+        if self.paused_on is not None:
+            if recovered:
+                self.paused_on = None
+                runner.resume()
+                return record(RESUMED, "target recovered")
+            if self.clock() - self.paused_on >= self.pause_timeout:
+                self.stopped = True
+                runner.stop()
+                return record(
+                    STOPPED, f"not recovered after {self.pause_timeout:.0f}s pause"
+                )
+            return None
+
+        if not degraded:
+            return None
+        if self.action == PAUSE:
+            self.paused_on = self.clock()
+            runner.pause()
+            return record(PAUSED, reason)
+        self.stopped = True
+        runner.stop()
+        return record(STOPPED, reason)
@@ -3,8 +3,7 @@ from pydantic import BaseModel
 from testbench.context import Context
 from testbench.utils.wlan import get_wireless_devices
 
-context = Context.get()
-logger = context.logger
+logger = Context.logger
 
 
 class SimpleWirelessDevice(BaseModel):
@@ -1,6 +1,7 @@
 import datetime
 import time
 from abc import ABC
+from collections.abc import Callable
 from concurrent.futures import (
     FIRST_COMPLETED,
     Future,
@@ -13,16 +14,16 @@ from queue import Empty, Queue
 from typing import Any, NamedTuple
 
 from testbench.context import Context
-from testbench.utils.dns import verify_dns_for, verify_dns_within_for
-from testbench.utils.http import assert_url_contains
+from testbench.utils.dns import resolve
+from testbench.utils.http import match_url
+from testbench.utils.icmp import ping
+from testbench.utils.linkwatch import DeviceStateWatcher
 from testbench.utils.wlan import (
     WirelessDevice,
     connect_device,
-    ping_host,
 )
 
-context = Context.get()
-logger = context.logger
+logger = Context.logger
 
 
 @dataclass
@@ -33,6 +34,8 @@ class IntegrationTestResult:
     params: dict[str, Any]
     succeeded: bool
     feedback: str
+    # time spent running the test (seconds)
+    duration: float = 0.0
 
     def __bool__(self) -> bool:
         return self.succeeded
@@ -71,9 +74,15 @@ class IntegrationTest(ABC):
     name: str
     # /!\ you must define your params using annotations
 
-    def __init__(self, device: WirelessDevice, **kwargs: dict[str, Any]) -> None:
+    def __init__(
+        self,
+        device: WirelessDevice,
+        watcher: DeviceStateWatcher | None = None,
+        **kwargs: dict[str, Any],
+    ) -> None:
         super().__init__()
         self.device = device
+        self.watcher = watcher
         for key, value in kwargs.items():
             setattr(self, key, value)
 
@@ -121,11 +130,22 @@ class WiFiConnectionTest(IntegrationTest):
         )
 
 
-def retrieve_iplink(device: WirelessDevice, timeout: int | None = None) -> bool:
-    """await a maximum of timeout seconds to get an IP link (assuming post-connect)"""
+def retrieve_iplink(
+    device: WirelessDevice,
+    timeout: int | None = None,
+    watcher: DeviceStateWatcher | None = None,
+) -> bool:
+    """await a maximum of timeout seconds to get an IP link (assuming post-connect)
+
+    Wakes up on address event if a running watcher is supplied, polls otherwise"""
     if timeout is None:
-        timeout = context.dhcp_timeout
+        timeout = Context.get().dhcp_timeout
     end = datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=timeout)
+    if watcher and watcher.running:
+        if watcher.wait_for_ip4(device, timeout=timeout):
+            return True
+        if not watcher.running:
+            logger.debug(f"Watcher stopped, polling {device.ifname} for IP link")
     while datetime.datetime.now(datetime.UTC) <= end:
         device.refresh()
         if device.ip4 is not None:
@@ -143,7 +163,9 @@ class HasExpectedAddressTest(IntegrationTest):
 
     def run(self) -> IntegrationTestResult:
         is_valid = (
-            retrieve_iplink(device=self.device, timeout=self.dhcp_timeout)
+            retrieve_iplink(
+                device=self.device, timeout=self.dhcp_timeout, watcher=self.watcher
+            )
             and bool(self.device.ip4)
             and self.device.ip4.address in self.address_network
         )
@@ -178,8 +200,8 @@ class CanPingTest(IntegrationTest):
     ping_address: IPv4Address
 
     def run(self) -> IntegrationTestResult:
-        success, output = ping_host(self.device.ifname, str(self.ping_address))
-        return self.get_result(succeeded=success, feedback=output)
+        stats = ping(str(self.ping_address), self.device.ifname)
+        return self.get_result(succeeded=stats.succeeded, feedback=str(stats))
 
 
 class ResolvesFQDNProperlyTest(IntegrationTest):
@@ -189,13 +211,15 @@ class ResolvesFQDNProperlyTest(IntegrationTest):
     fqdn_answer: str
 
     def run(self) -> IntegrationTestResult:
-        is_valid = verify_dns_for(
-            source_addr=str(self.device.ip4link.address),
-            server=str(self.device.ip4link.dns),
-            domain=self.fqdn,
-            dest_address=self.fqdn_answer,
+        answer = resolve(
+            self.fqdn,
+            server=self.device.ip4link.dns or Context.get().dns_address,
+            source=self.device.ip4link.address,
+        )
+        return self.get_result(
+            succeeded=answer.matches(IPv4Address(self.fqdn_answer)),
+            feedback=f"{self.fqdn_answer}: {answer}",
         )
-        return self.get_result(succeeded=is_valid, feedback=self.fqdn_answer)
 
     def __str__(self) -> str:
         return f"DNS {self.fqdn}"
@@ -208,13 +232,15 @@ class ResolvesServiceDomainProperlyTest(IntegrationTest):
     svc_fqdn_answer: str
 
     def run(self) -> IntegrationTestResult:
-        is_valid = verify_dns_for(
-            source_addr=str(self.device.ip4link.address),
-            server=str(self.device.ip4link.dns),
-            domain=self.svc_fqdn,
-            dest_address=self.svc_fqdn_answer,
+        answer = resolve(
+            self.svc_fqdn,
+            server=self.device.ip4link.dns or Context.get().dns_address,
+            source=self.device.ip4link.address,
+        )
+        return self.get_result(
+            succeeded=answer.matches(IPv4Address(self.svc_fqdn_answer)),
+            feedback=f"{self.svc_fqdn_answer}: {answer}",
         )
-        return self.get_result(succeeded=is_valid, feedback=self.svc_fqdn_answer)
 
     def __str__(self) -> str:
         return f"DNS {self.svc_fqdn}"
@@ -227,13 +253,15 @@ class ResolvesExternalDomainProperlyTest(IntegrationTest):
     external_fqdn_answer: str
 
     def run(self) -> IntegrationTestResult:
-        is_valid = verify_dns_for(
-            source_addr=str(self.device.ip4link.address),
-            server=str(self.device.ip4link.dns),
-            domain=self.external_fqdn,
-            dest_address=self.external_fqdn_answer,
+        answer = resolve(
+            self.external_fqdn,
+            server=self.device.ip4link.dns or Context.get().dns_address,
+            source=self.device.ip4link.address,
+        )
+        return self.get_result(
+            succeeded=answer.matches(IPv4Address(self.external_fqdn_answer)),
+            feedback=f"{self.external_fqdn_answer}: {answer}",
         )
-        return self.get_result(succeeded=is_valid, feedback=self.external_fqdn_answer)
 
     def __str__(self) -> str:
         return f"DNS {self.external_fqdn}"
@@ -246,14 +274,14 @@ class ResolvesExternalDomainOnlineTest(IntegrationTest):
     external_fqdn_answer_network: IPv4Network
 
     def run(self) -> IntegrationTestResult:
-        is_valid = verify_dns_within_for(
-            source_addr=self.device.ip4link.address,
+        answer = resolve(
+            self.external_fqdn,
             server=self.device.ip4link.dns or IPv4Address("1.1.1.1"),
-            domain=self.external_fqdn,
-            dest_network=self.external_fqdn_answer_network,
+            source=self.device.ip4link.address,
         )
         return self.get_result(
-            succeeded=is_valid, feedback=str(self.external_fqdn_answer_network)
+            succeeded=answer.within(self.external_fqdn_answer_network),
+            feedback=f"{self.external_fqdn_answer_network}: {answer}",
         )
 
     def __str__(self) -> str:
@@ -267,14 +295,14 @@ class HTTPGetDashboardTest(IntegrationTest):
     dns_address: IPv4Address
 
     def run(self) -> IntegrationTestResult:
+        match = match_url(
+            device=self.device,
+            dns_server=self.dns_address,
+            url=f"http://{self.fqdn}/",
+            marker="<title>Kiwix Hotspot</title>",
+        )
         return self.get_result(
-            succeeded=assert_url_contains(
-                device=self.device,
-                dns_server=self.dns_address,
-                url=f"http://{self.fqdn}/",
-                title="<title>Kiwix Hotspot</title>",
-            ),
-            feedback=str(self.fqdn),
+            succeeded=match.succeeded, feedback=f"{self.fqdn}: {match}"
         )
 
 
@@ -285,14 +313,14 @@ class HTTPGetZimManagerTest(IntegrationTest):
     dns_address: IPv4Address
 
     def run(self) -> IntegrationTestResult:
+        match = match_url(
+            device=self.device,
+            dns_server=self.dns_address,
+            url=f"http://{self.zim_manager_fqdn}/",
+            marker="<title>File Manager</title>",
+        )
         return self.get_result(
-            succeeded=assert_url_contains(
-                device=self.device,
-                dns_server=self.dns_address,
-                url=f"http://{self.zim_manager_fqdn}/",
-                title="<title>File Manager</title>",
-            ),
-            feedback=str(self.zim_manager_fqdn),
+            succeeded=match.succeeded, feedback=f"{self.zim_manager_fqdn}: {match}"
         )
 
 
@@ -341,11 +369,12 @@ def run_for_ifname(
     device: WirelessDevice,
     all_params: dict[str, Any],
     stack: Queue[IntegrationTestResult],
+    watcher: DeviceStateWatcher | None = None,
 ) -> None:
     skip: bool = False
     for test_cls in collection:
         params = get_test_params(test_cls, all_params)
-        test = test_cls(device, **params)
+        test = test_cls(device, watcher, **params)
         if skip:
             stack.put(
                 item=IntegrationTestResult.using(
@@ -357,6 +386,7 @@ def run_for_ifname(
                 )
             )
             continue
+        start = time.monotonic()
         try:
             res = test.run()
         except Exception as exc:
@@ -369,6 +399,9 @@ def run_for_ifname(
                 name=test_cls.name,
             )
         finally:
+            res.duration = (  # pyright: ignore [reportPossiblyUnboundVariable]
+                time.monotonic() - start
+            )
             stack.put(item=res)  # pyright: ignore [reportPossiblyUnboundVariable]
 
 
@@ -385,8 +418,11 @@ class IntegrationTestsRunner:
         devices: list[WirelessDevice],
         collection: list[type[IntegrationTest]],
         params: dict[str, Any],
+        on_results: Callable[[list[IntegrationTestResult]], None] | None = None,
     ):
+        """on_results is called with each batch of results recorded by tick()"""
         self.running: bool = False
+        self.on_results = on_results
 
         self.devices = devices
         self.collection = collection
@@ -411,9 +447,13 @@ class IntegrationTestsRunner:
         self.futures: list[Future[None]] = []
         self.started_on = self.ended_on = datetime.datetime.now(datetime.UTC)
 
+        # updates devices' IP link from address events (instead of polling)
+        self.watcher = DeviceStateWatcher(devices=self.devices)
+
     def start(self):
         self.running = True
         self.started_on = datetime.datetime.now(datetime.UTC)
+        self.watcher.start()
 
         # use one worker per device
         # only submit one task per device.
@@ -427,19 +467,24 @@ class IntegrationTestsRunner:
                     all_params=self.all_params,
                     device=device,
                     stack=self.all_results,
+                    watcher=self.watcher,
                 )
             )
 
     def tick(self, timeout: int | float | None = None) -> None:
         """query status of runner"""
         # consume and record all pending results from queue
+        results: list[IntegrationTestResult] = []
         while True:
             try:
-                self.record_result(self.all_results.get(block=False))
+                results.append(self.all_results.get(block=False))
             except Empty:
                 break
             else:
+                self.record_result(results[-1])
                 self.all_results.task_done()
+        if results and self.on_results:
+            self.on_results(results)
 
         # consume done futures from executor (done futures ~= a device)
         # in order to clean up the futures list
@@ -464,9 +509,13 @@ class IntegrationTestsRunner:
             self.nb_failed_tests += 1
 
     def record_all_remainings(self):
+        results: list[IntegrationTestResult] = []
         while not self.all_results.empty():
-            self.record_result(self.all_results.get())
+            results.append(self.all_results.get())
+            self.record_result(results[-1])
             self.all_results.task_done()
+        if results and self.on_results:
+            self.on_results(results)
 
     @property
     def nb_completed_tests(self) -> int:
@@ -484,5 +533,15 @@ class IntegrationTestsRunner:
 
     def shutdown(self, *, wait: bool = True, cancel_futures: bool = False):
         self.executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+        self.watcher.stop()
         self.record_all_remainings()
         self.all_results.join()
+
+    def run(self, on_tick: Callable[[], Any] | None = None, interval: float = 0.1):
+        """start then tick every interval seconds (calling on_tick) until done"""
+        self.start()
+        while self.running:
+            self.tick(interval)
+            if on_tick:
+                on_tick()
+        self.shutdown(wait=True)
@@ -1,10 +1,16 @@
 import datetime
 import os
 import shutil
+import signal
+import socket
 import subprocess
 import tempfile
+import threading
 from pathlib import Path
 
+from testbench.jtl import IFNAME_FIELD
+from testbench.watchdog import signal_tree
+
 """
     --?
         print command line options and exit
@@ -74,6 +80,23 @@ from pathlib import Path
 """
 
 
+# command (to JMeter's non-GUI UDP port) ending the test once samples in flight end
+SHUTDOWN_COMMAND: bytes = b"Shutdown"
+# seconds JMeter has to honor SHUTDOWN_COMMAND before its tree gets SIGTERM
+STOP_GRACE: float = 30.0
+
+
+def get_free_udp_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def write_ifnames(path: Path, ifnames: list[str]):
+    """ifnames.csv: JMeter threads read it in order, a row per iteration"""
+    path.write_text("\n".join([IFNAME_FIELD, *ifnames]))
+
+
 def get_workdir():
     return Path(tempfile.mkdtemp(dir=Path.cwd(), prefix="jmeter_"))
 
@@ -90,6 +113,7 @@ class JMeterRunner:
         assume_online: str | None = None,
         content_id: str | None = None,
         workdir: Path | None = None,
+        loops: int = 1,
     ):
         self.jmx = jmx
         self.ifnames = ifnames
@@ -100,11 +124,15 @@ class JMeterRunner:
         self.assume_online = assume_online
         self.content_id = content_id
         self.workdir = workdir or get_workdir()
+        # scenario iterations of each thread, -1 looping until stop()
+        self.loops = loops
+        self.control_port = get_free_udp_port()
+        self.paused: bool = False
         self.write_ifnames()
         self.started_on = self.ended_on = datetime.datetime.now(datetime.UTC)
 
     def write_ifnames(self):
-        self.ifnames_csv_path.write_text("\n".join(["ifname", *self.ifnames]))
+        write_ifnames(self.ifnames_csv_path, self.ifnames)
 
     def start(self):
         environ = os.environ.copy()
@@ -116,6 +144,12 @@ class JMeterRunner:
             "-t",
             str(self.jmx),
             f"-Jnb_users={self.nb_users}",
+            f"-Jloops={self.loops}",
+            # JMeter only listens on ports from nongui.port up to nongui.maxport
+            f"-Jjmeterengine.nongui.port={self.control_port}",
+            f"-Jjmeterengine.nongui.maxport={self.control_port}",
+            # saves each sample's interface in results (last column)
+            f"-Jsample_variables={IFNAME_FIELD}",
         ]
         for key in (
             "fqdn",
@@ -126,19 +160,52 @@ class JMeterRunner:
         ):
             if getattr(self, key):
                 args.append(f"-J{key}={getattr(self, key)}")
-        self.ps = subprocess.Popen(
-            args=args,
-            cwd=self.workdir,
-            env=environ,
-            text=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
+        # to a file rather than a pipe no one reads (which blocks JMeter once
+        # full), also keeping thread dumps requested by the watchdog
+        with open(self.output_path, "w") as output:
+            self.ps = subprocess.Popen(
+                args=args,
+                cwd=self.workdir,
+                env=environ,
+                text=True,
+                stdout=output,
+                stderr=subprocess.STDOUT,
+            )
+
+    def stop(self, grace: float = STOP_GRACE):
+        """ask JMeter to end the test once its samples in flight end
+
+        Its process tree is sent SIGTERM should it still run after grace seconds"""
+        if self.paused:
+            self.resume()
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.sendto(SHUTDOWN_COMMAND, ("127.0.0.1", self.control_port))
+        timer = threading.Timer(grace, self.terminate)
+        timer.daemon = True
+        timer.start()
+
+    def terminate(self):
+        """SIGTERM to JMeter's process tree, if still running"""
+        if self.ps.poll() is None:
+            signal_tree(self.ps.pid, signal.SIGTERM)
+
+    def pause(self):
+        """freeze JMeter's processes (requests in flight included)"""
+        signal_tree(self.ps.pid, signal.SIGSTOP)
+        self.paused = True
+
+    def resume(self):
+        signal_tree(self.ps.pid, signal.SIGCONT)
+        self.paused = False
 
     @property
     def succeeded(self) -> bool:
         return self.ps.returncode == 0
 
+    @property
+    def returncode(self) -> int | None:
+        return self.ps.returncode
+
     @property
     def is_running(self) -> bool:
         if self.ps.poll() is not None:
@@ -154,6 +221,16 @@ class JMeterRunner:
     def ifnames_csv_path(self) -> Path:
         return self.workdir.joinpath("ifnames.csv")
 
+    @property
+    def output_path(self) -> Path:
+        """JMeter's stdout and stderr"""
+        return self.workdir.joinpath("jmeter.out")
+
     @property
     def duration(self) -> float:
         return (self.ended_on - self.started_on).total_seconds()
+
+    @property
+    def elapsed(self) -> float:
+        """since start, while running"""
+        return (datetime.datetime.now(datetime.UTC) - self.started_on).total_seconds()
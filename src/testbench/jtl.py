@@ -0,0 +1,439 @@
+import array
+import bisect
+import csv
+import gc
+import io
+import itertools
+import operator
+from collections import Counter, deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from testbench.utils.stats import Distribution
+
+# rows read (and converted) at once when loading columns
+LOAD_BATCH_SIZE: int = 50_000
+# JMeter variable saved as last column of each row (see sample_variables)
+IFNAME_FIELD: str = "ifname"
+
+
+class IfnameIndex:
+    """Maps results' rows to interfaces, from the run's ifnames.csv
+
+    Rows carrying their ifname (saved sample variable) are mapped to it: threads
+    going on reading ifnames.csv (loops), a thread's interface changes.
+    Without the column, rows are mapped through their thread number
+    (<group> <g>-<number>): threads read ifnames.csv in start order.
+    Anything else maps to itself"""
+
+    def __init__(self, ifnames: list[str]):
+        self.ifnames = ifnames
+        self.known = set(ifnames)
+
+    @classmethod
+    def from_csv(cls, path: Path) -> "IfnameIndex":
+        with open(path, newline="") as fh:
+            rows = list(csv.reader(fh))
+        # first line is the header
+        return cls([row[0].strip() for row in rows[1:] if row and row[0].strip()])
+
+    def get(self, thread: str, ifname: str | None = None) -> str:
+        """thread's interface, ifname being None without the ifname column"""
+        if ifname is not None:
+            return ifname or thread
+        _, _, number = thread.rpartition("-")
+        if number.isdigit() and 0 < int(number) <= len(self.ifnames):
+            return self.ifnames[int(number) - 1]
+        return thread
+
+
+@dataclass(kw_only=True)
+class Sample:
+    """a JTL (results CSV) row, fields used for live stats only"""
+
+    # end of the sample, epoch seconds
+    ended_on: float
+    label: str
+    thread: str
+    # when saved in results
+    ifname: str | None = None
+    # milliseconds
+    elapsed: int
+    success: bool
+
+
+def get_records_end(data: bytes) -> int:
+    """offset after the last complete CSV record of data (0 if none)
+
+    Newlines inside quoted fields (multi-line messages) don't end records"""
+    end = position = 0
+    quoted = False
+    while (newline := data.find(b"\n", position)) >= 0:
+        # escaped quotes ("") count twice, leaving parity unchanged
+        if data.count(b'"', position, newline) % 2:
+            quoted = not quoted
+        position = newline + 1
+        if not quoted:
+            end = position
+    return end
+
+
+class JTLTail:
+    """Follows a JTL file as it is appended to, parsing only new records
+
+    Incomplete last records (incl. multi-line ones) are kept until their
+    end is written. Unparsable records are counted and skipped"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.offset: int = 0
+        self.pending: bytes = b""
+        self.columns: dict[str, int] = {}
+        self.nb_malformed: int = 0
+
+    def read(self) -> list[Sample]:
+        """samples appended since previous call"""
+        try:
+            with open(self.path, "rb") as fh:
+                fh.seek(self.offset)
+                data = fh.read()
+        except FileNotFoundError:
+            # not created yet
+            return []
+        self.offset += len(data)
+        data = self.pending + data
+        end = get_records_end(data)
+        self.pending = data[end:]
+        if not end:
+            return []
+        reader = csv.reader(io.StringIO(data[:end].decode("utf-8", "replace")))
+        if not self.columns:
+            header = next(reader)
+            self.columns = {name: index for index, name in enumerate(header)}
+        samples: list[Sample] = []
+        for row in reader:
+            try:
+                samples.append(self.parse(row))
+            except (IndexError, KeyError, ValueError):
+                self.nb_malformed += 1
+        return samples
+
+    def parse(self, row: list[str]) -> Sample:
+        columns = self.columns
+        if len(row) != len(columns):
+            raise ValueError("Unexpected number of fields")
+        elapsed = int(row[columns["elapsed"]])
+        return Sample(
+            ended_on=(int(row[columns["timeStamp"]]) + elapsed) / 1000,
+            label=row[columns["label"]],
+            thread=row[columns["threadName"]],
+            ifname=row[columns[IFNAME_FIELD]] if IFNAME_FIELD in columns else None,
+            elapsed=elapsed,
+            success=row[columns["success"]] == "true",
+        )
+
+
+@dataclass(kw_only=True)
+class WindowStats:
+    """samples of a group over the rolling window"""
+
+    nb_samples: int
+    nb_failed: int
+    # samples per second
+    rate: float
+    elapsed: Distribution
+
+    @property
+    def error_rate(self) -> float:
+        return self.nb_failed / self.nb_samples if self.nb_samples else 0.0
+
+
+class RollingWindow:
+    """Samples which ended in the last `duration` seconds (of results time)
+
+    The newest sample's end is the window's end so a stalled or finished
+    run keeps its last figures"""
+
+    def __init__(self, duration: float = 10.0):
+        self.duration = duration
+        self.samples: deque[Sample] = deque()
+        self.nb_total: int = 0
+        self.nb_failed: int = 0
+        # end of the newest sample
+        self.end: float = 0.0
+
+    def add(self, samples: list[Sample]):
+        for sample in samples:
+            self.samples.append(sample)
+            self.nb_total += 1
+            self.nb_failed += 0 if sample.success else 1
+            self.end = max(self.end, sample.ended_on)
+        start = self.end - self.duration
+        # samples are roughly ordered by end: drop from the oldest side
+        while self.samples and self.samples[0].ended_on < start:
+            self.samples.popleft()
+
+    @property
+    def rate(self) -> float:
+        """samples per second"""
+        return len(self.samples) / self.duration
+
+    def get_stats(self, key: Callable[[Sample], str]) -> dict[str, WindowStats]:
+        """window's stats grouped by key (label, interface…)"""
+        groups: dict[str, list[Sample]] = {}
+        for sample in self.samples:
+            groups.setdefault(key(sample), []).append(sample)
+        return {
+            name: WindowStats(
+                nb_samples=len(samples),
+                nb_failed=sum(1 for sample in samples if not sample.success),
+                rate=len(samples) / self.duration,
+                elapsed=Distribution.of(sample.elapsed for sample in samples),
+            )
+            for name, samples in sorted(groups.items())
+        }
+
+
+def is_valid(row: list[str], fields: list[int]) -> bool:
+    """whether row's numeric fields (4 first of fields) are integers"""
+    try:
+        for field in fields[:4]:
+            int(row[field])
+    except ValueError:
+        return False
+    return True
+
+
+class Quarantine:
+    """CSV of the rows that couldn't be loaded, for later inspection"""
+
+    def __init__(self, path: Path | None, header: list[str]):
+        self.path = path
+        self.fh = open(path, "w", newline="") if path else None
+        self.writer = csv.writer(self.fh) if self.fh else None
+        if self.writer:
+            self.writer.writerow(header)
+
+    def add(self, rows: list[list[str]]):
+        if self.writer:
+            self.writer.writerows(rows)
+
+    def close(self):
+        if self.fh:
+            self.fh.close()
+
+
+@dataclass(kw_only=True)
+class GroupSummary:
+    """all samples of a label or interface"""
+
+    nb_success: int
+    nb_failed: int
+    # milliseconds: whole sample, time to first byte and connection
+    elapsed: Distribution
+    latency: Distribution
+    connect: Distribution
+
+    @property
+    def nb_total(self) -> int:
+        return self.nb_success + self.nb_failed
+
+    @property
+    def success_rate(self) -> float:
+        return self.nb_success / self.nb_total if self.nb_total else 0.0
+
+
+class JTLColumns:
+    """A JTL file loaded into typed, column-wise arrays
+
+    Labels and interfaces are stored as codes into `labels` and `ifnames`
+    so rows hold numbers only and thread names are mapped once each.
+    Rows that can't be parsed (truncated, wrong values) are counted and
+    written to a quarantine file instead of aborting the load"""
+
+    def __init__(self):
+        self.labels: list[str] = []
+        self.ifnames: list[str] = []
+        # epoch milliseconds (start of sample)
+        self.timestamp = array.array("q")
+        self.elapsed = array.array("l")
+        self.latency = array.array("l")
+        self.connect = array.array("l")
+        self.success = array.array("b")
+        self.label = array.array("H")
+        self.ifname = array.array("H")
+        self.nb_quarantined: int = 0
+        self.label_codes: dict[str, int] = {}
+        self.ifname_codes: dict[str, int] = {}
+        # (thread, ifname field): ifname code
+        self.thread_codes: dict[tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @classmethod
+    def load(
+        cls, path: Path, index: IfnameIndex, quarantine_path: Path | None = None
+    ) -> "JTLColumns":
+        """columns of all path's rows, threads mapped through index
+
+        Rows are read in batches, transposed and converted column-wise
+        (map/extend run in C), never as per-row Python objects.
+        csv handles quoted fields (incl. multi-line ones)"""
+        columns = cls()
+        quarantine: Quarantine | None = None
+
+        with open(path, newline="") as fh:
+            reader = csv.reader(fh)
+            header = next(reader, None)
+            if header is None:
+                # empty file
+                return columns
+            positions = {name: position for position, name in enumerate(header)}
+            fields = [
+                positions[name]
+                for name in (
+                    "timeStamp",
+                    "elapsed",
+                    "Latency",
+                    "Connect",
+                    "success",
+                    "label",
+                    "threadName",
+                    # thread name again if not saved
+                    IFNAME_FIELD if IFNAME_FIELD in positions else "threadName",
+                )
+            ]
+            # batches of short-lived lists: cyclic GC would only slow it down
+            gc.disable()
+            try:
+                while batch := list(itertools.islice(reader, LOAD_BATCH_SIZE)):
+                    rows = [row for row in batch if len(row) == len(header)]
+                    rejected = [row for row in batch if len(row) != len(header)]
+                    try:
+                        columns.extend(rows, fields, index)
+                    except ValueError:
+                        # some values are not numbers: sort rows out one by one
+                        valid = [row for row in rows if is_valid(row, fields)]
+                        rejected += [row for row in rows if not is_valid(row, fields)]
+                        columns.extend(valid, fields, index)
+                    if rejected:
+                        if not quarantine:
+                            quarantine = Quarantine(quarantine_path, header)
+                        quarantine.add(rejected)
+                        columns.nb_quarantined += len(rejected)
+            finally:
+                gc.enable()
+                if quarantine:
+                    quarantine.close()
+        return columns
+
+    def extend(self, rows: list[list[str]], fields: list[int], index: IfnameIndex):
+        """append a batch of rows (all or none)"""
+        (
+            timestamps,
+            elapseds,
+            latencies,
+            connects,
+            successes,
+            labels,
+            threads,
+            ifnames,
+        ) = (list(map(operator.itemgetter(field), rows)) for field in fields)
+        # converted first so a bad value leaves columns untouched
+        numbers = [
+            array.array(column.typecode, map(int, values))
+            for column, values in (
+                (self.timestamp, timestamps),
+                (self.elapsed, elapseds),
+                (self.latency, latencies),
+                (self.connect, connects),
+            )
+        ]
+        for column, values in zip(
+            (self.timestamp, self.elapsed, self.latency, self.connect),
+            numbers,
+            strict=True,
+        ):
+            column.extend(values)
+        self.success.extend(map("true".__eq__, successes))
+
+        # in order of appearance
+        for label in dict.fromkeys(labels):
+            if label not in self.label_codes:
+                self.label_codes[label] = len(self.labels)
+                self.labels.append(label)
+        self.label.extend(map(self.label_codes.__getitem__, labels))
+
+        keys = list(zip(threads, ifnames, strict=True))
+        for thread, ifname_field in dict.fromkeys(keys):
+            if (thread, ifname_field) in self.thread_codes:
+                continue
+            ifname = index.get(thread, None if ifname_field == thread else ifname_field)
+            if ifname not in self.ifname_codes:
+                self.ifname_codes[ifname] = len(self.ifnames)
+                self.ifnames.append(ifname)
+            self.thread_codes[(thread, ifname_field)] = self.ifname_codes[ifname]
+        self.ifname.extend(map(self.thread_codes.__getitem__, keys))
+
+    def summarize(
+        self, codes: "array.array[int]", names: list[str]
+    ) -> dict[str, GroupSummary]:
+        # rows grouped by code: each group is a contiguous slice of order
+        order = sorted(range(len(codes)), key=codes.__getitem__)
+        ordered_codes = list(map(codes.__getitem__, order))
+        summaries: dict[str, GroupSummary] = {}
+        for code, name in enumerate(names):
+            rows = order[
+                bisect.bisect_left(ordered_codes, code) : bisect.bisect_right(
+                    ordered_codes, code
+                )
+            ]
+            summaries[name] = self.get_summary(rows)
+        return summaries
+
+    def get_summary(self, rows: list[int]) -> GroupSummary:
+        nb_success = sum(map(self.success.__getitem__, rows))
+        return GroupSummary(
+            nb_success=nb_success,
+            nb_failed=len(rows) - nb_success,
+            elapsed=Distribution.of(map(self.elapsed.__getitem__, rows)),
+            latency=Distribution.of(map(self.latency.__getitem__, rows)),
+            connect=Distribution.of(map(self.connect.__getitem__, rows)),
+        )
+
+    def between(self, start: int, end: int) -> GroupSummary:
+        """all samples started within [start, end) epoch milliseconds"""
+        return self.get_summary(
+            [
+                row
+                for row, timestamp in enumerate(self.timestamp)
+                if start <= timestamp < end
+            ]
+        )
+
+    def by_label(self) -> dict[str, GroupSummary]:
+        return self.summarize(self.label, self.labels)
+
+    def by_ifname(self) -> dict[str, GroupSummary]:
+        return self.summarize(self.ifname, self.ifnames)
+
+    def get_rates(self, width: float) -> list[tuple[float, float]]:
+        """(offset from first sample, requests per second) of width-wide buckets
+
+        samples are counted in the bucket of their start"""
+        if not self.timestamp:
+            return []
+        width_ms = max(int(width * 1000), 1)
+        start = min(self.timestamp)
+        counts = [0] * ((max(self.timestamp) - start) // width_ms + 1)
+        offsets = map(operator.sub, self.timestamp, itertools.repeat(start))
+        for bucket, count in Counter(
+            map(operator.floordiv, offsets, itertools.repeat(width_ms))
+        ).items():
+            counts[bucket] = count
+        return [
+            (bucket * width_ms / 1000, count / (width_ms / 1000))
+            for bucket, count in enumerate(counts)
+        ]
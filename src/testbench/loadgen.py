@@ -0,0 +1,717 @@
+import asyncio
+import csv
+import datetime
+import itertools
+import random
+import re
+import socket
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from ipaddress import IPv4Address
+from pathlib import Path
+from typing import IO, Any
+from urllib.parse import urljoin, urlsplit
+
+from testbench.context import ARRIVALS, Context
+from testbench.jmeter import get_workdir, write_ifnames
+from testbench.jtl import IFNAME_FIELD
+from testbench.utils.aio import BackgroundLoop
+from testbench.utils.dns import query
+from testbench.utils.icmp import SO_BINDTODEVICE
+from testbench.utils.wlan import WirelessDevice
+
+logger = Context.logger
+
+# perf.jmx's default when no content_id is passed
+DEFAULT_CONTENT_ID: str = "openzim_wikipedia_en_top_nopic"
+# JMeter's CSV (JTL) columns, as configured in perf.jmx (and JMeterRunner)
+JTL_FIELDS: list[str] = [
+    "timeStamp",
+    "elapsed",
+    "label",
+    "responseCode",
+    "responseMessage",
+    "threadName",
+    "dataType",
+    "success",
+    "failureMessage",
+    "bytes",
+    "sentBytes",
+    "grpThreads",
+    "allThreads",
+    "URL",
+    "Latency",
+    "IdleTime",
+    "Connect",
+    IFNAME_FIELD,
+]
+HTTP_PORT: int = 80
+TIMEOUT: float = 30.0
+READ_SIZE: int = 64 * 1024
+MAX_REDIRECTS: int = 5
+REDIRECTS: tuple[int, ...] = (301, 302, 303, 307, 308)
+# concurrent downloads of embedded resources (JMeter's concurrentPool)
+EMBEDDED_CONCURRENCY: int = 6
+# bodies are only kept (to find embedded resources) below this size
+MAX_KEPT_BODY: int = 2 * 1024 * 1024
+EMBEDDED_RE = re.compile(
+    rb"<(?:img|script|link)\b[^>]*?\b(?:src|href)=[\"']([^\"'#]+)[\"']", re.I
+)
+SEARCH_TERMS: list[str] = ["water", "music", "history", "africa", "science"]
+POISSON: str = ARRIVALS[1]
+# open loop: arrivals beyond that many requests in flight fail right away
+MAX_IN_FLIGHT: int = 1024
+REJECTED_MESSAGE: str = "Not sent: too many requests in flight"
+# how often paused users check whether they were resumed (seconds)
+PAUSE_POLL: float = 0.1
+# results rows are written once that many are pending, and flushed that often
+RESULTS_BATCH_SIZE: int = 100
+RESULTS_FLUSH_INTERVAL: float = 1.0
+
+
+@dataclass(kw_only=True)
+class Sampler:
+    """a request of the scenario, named like perf.jmx's samplers"""
+
+    label: str
+    host: str
+    path: str
+    accepted: tuple[int, ...] = (200,)
+    # also fetch images, scripts and stylesheets (JMeter's image parser)
+    embedded: bool = False
+
+
+def get_scenario(*, fqdn: str, svc_domain: str, content_id: str) -> list[Sampler]:
+    """perf.jmx samplers, followed by suggestion and full-text searches"""
+    content_id = content_id or DEFAULT_CONTENT_ID
+    kiwix = f"{svc_domain}.{fqdn}"
+    return [
+        Sampler(label="Dashboard", host=fqdn, path="/"),
+        Sampler(
+            label="Download Kiwix macOS",
+            host=f"zim-download.{fqdn}",
+            path="/kiwix-macos_3.8.0.dmg",
+        ),
+        Sampler(
+            label="Full OPDS catalog", host=kiwix, path="/catalog/v2/entries?count=-1"
+        ),
+        Sampler(
+            label="Content Home",
+            host=kiwix,
+            path=f"/content/{content_id}",
+            accepted=(200, 302),
+            embedded=True,
+        ),
+        Sampler(
+            label="Content Random",
+            host=kiwix,
+            path=f"/random?content={content_id}",
+            accepted=(200, 302),
+        ),
+        Sampler(
+            label="Content Suggest",
+            host=kiwix,
+            path=f"/suggest?content={content_id}&term={{term}}",
+        ),
+        Sampler(
+            label="Content Search",
+            host=kiwix,
+            path=f"/search?content={content_id}&pattern={{term}}",
+        ),
+    ]
+
+
+@dataclass(kw_only=True)
+class Response:
+    status: int = 0
+    message: str = ""
+    headers: dict[str, str] = field(default_factory=dict[str, str])
+    nb_bytes: int = 0
+    nb_sent: int = 0
+    # time to first byte (from request start, incl. connect), in milliseconds
+    latency: float = 0.0
+    connect: float = 0.0
+    # kept only when requested (and small enough)
+    body: bytes = b""
+
+
+class Connection:
+    """HTTP/1.1 keep-alive connection from a device's interface"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.nb_served: int = 0
+        self.reusable: bool = True
+
+    @classmethod
+    async def open(
+        cls, address: IPv4Address, port: int, *, source: IPv4Address, ifname: str
+    ) -> "Connection":
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, SO_BINDTODEVICE, ifname.encode())
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.bind((str(source), 0))
+            sock.setblocking(False)
+            await asyncio.wait_for(
+                loop.sock_connect(sock, (str(address), port)), TIMEOUT
+            )
+        except BaseException:
+            sock.close()
+            raise
+        reader, writer = await asyncio.open_connection(sock=sock, limit=READ_SIZE)
+        return cls(reader, writer)
+
+    def close(self):
+        self.reusable = False
+        self.writer.close()
+
+    async def read_headers(self, response: Response):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by server")
+        _, status, *message = status_line.decode("latin-1").split(" ", 2)
+        response.status = int(status)
+        response.message = message[0].strip() if message else ""
+        while line := (await self.reader.readline()).decode("latin-1").strip():
+            name, _, value = line.partition(":")
+            response.headers[name.strip().lower()] = value.strip()
+        response.nb_bytes += len(status_line)
+
+    async def read_body(self, response: Response, *, keep: bool):
+        chunks: list[bytes] = []
+
+        def consume(data: bytes):
+            response.nb_bytes += len(data)
+            if keep and response.nb_bytes <= MAX_KEPT_BODY:
+                chunks.append(data)
+
+        headers = response.headers
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while size := int((await self.reader.readline()).split(b";")[0], 16):
+                remaining = size
+                while remaining:
+                    data = await self.reader.read(min(remaining, READ_SIZE))
+                    if not data:
+                        raise asyncio.IncompleteReadError(b"", remaining)
+                    remaining -= len(data)
+                    consume(data)
+                await self.reader.readline()
+            # trailers
+            while (await self.reader.readline()).strip():
+                pass
+        elif "content-length" in headers:
+            remaining = int(headers["content-length"])
+            while remaining:
+                data = await self.reader.read(min(remaining, READ_SIZE))
+                if not data:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                remaining -= len(data)
+                consume(data)
+        elif response.status >= HTTPStatus.OK and response.status not in (
+            HTTPStatus.NO_CONTENT,
+            HTTPStatus.NOT_MODIFIED,
+        ):
+            # delimited by connection close
+            while data := await self.reader.read(READ_SIZE):
+                consume(data)
+            self.reusable = False
+        if headers.get("connection", "").lower() == "close":
+            self.reusable = False
+        response.body = b"".join(chunks)
+
+    async def request(
+        self, host: str, path: str, response: Response, *, keep: bool, start: float
+    ):
+        payload = (
+            f"GET {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: testbench\r\n"
+            "Accept: */*\r\nConnection: keep-alive\r\n\r\n"
+        ).encode("latin-1")
+        self.nb_served += 1
+        self.writer.write(payload)
+        await self.writer.drain()
+        response.nb_sent += len(payload)
+        await self.read_headers(response)
+        response.latency = (time.perf_counter() - start) * 1000
+        await self.read_body(response, keep=keep)
+
+
+class VirtualUser:
+    """Runs the scenario over a single device, like a JMeter thread would
+
+    Connections are kept alive per host and DNS answers are cached for
+    an iteration (perf.jmx's DNS Cache Manager clears them on each)"""
+
+    def __init__(
+        self,
+        index: int,
+        device: WirelessDevice,
+        *,
+        dns_server: IPv4Address,
+        record: Callable[[dict[str, str | int]], None],
+        active: Callable[[], int],
+        jitter: float = 0.0,
+        port: int = HTTP_PORT,
+    ):
+        self.index = index
+        self.device = device
+        self.source = device.ip4link.address
+        self.dns_server = dns_server
+        self.record = record
+        self.active = active
+        self.jitter = jitter
+        self.port = port
+        self.rng = random.Random(index)  # noqa: S311
+        self.addresses: dict[str, IPv4Address] = {}
+        self.idle: dict[str, list[Connection]] = {}
+
+    @property
+    def name(self) -> str:
+        # the thread name JMeter uses (and perf's results are grouped by)
+        return f"Users 1-{self.index + 1}"
+
+    async def resolve(self, host: str) -> IPv4Address:
+        try:
+            return IPv4Address(host)
+        except ValueError:
+            pass
+        if host not in self.addresses:
+            answer = await query(host, self.dns_server, self.source)
+            if not answer.address:
+                raise OSError(f"Unable to resolve {host}: {answer}")
+            self.addresses[host] = answer.address
+        return self.addresses[host]
+
+    async def fetch(
+        self, host: str, path: str, *, keep: bool = False, start: float | None = None
+    ) -> Response:
+        """GET on a pooled connection, retried once should a reused one be stale
+
+        latency is from start (perf_counter), defaults to now"""
+        response = Response()
+        begin = time.perf_counter()
+        start = begin if start is None else start
+        for _ in range(2):
+            idle = self.idle.setdefault(host, [])
+            conn = idle.pop() if idle else None
+            if not conn:
+                address = await self.resolve(host)
+                conn = await Connection.open(
+                    address, self.port, source=self.source, ifname=self.device.ifname
+                )
+                response.connect = (time.perf_counter() - begin) * 1000
+            try:
+                await asyncio.wait_for(
+                    conn.request(host, path, response, keep=keep, start=start),
+                    TIMEOUT,
+                )
+            except (OSError, asyncio.IncompleteReadError) as exc:
+                conn.close()
+                # server closed an idle keep-alive connection
+                if conn.nb_served > 1 and not response.status:
+                    continue
+                raise OSError(str(exc) or type(exc).__name__) from exc
+            except BaseException:
+                conn.close()
+                raise
+            if conn.reusable:
+                idle.append(conn)
+            else:
+                conn.close()
+            return response
+        raise OSError("Unable to reuse connection")
+
+    async def fetch_embedded(self, host: str, path: str, body: bytes) -> Response:
+        """total of all embedded resources (same host only), fetched concurrently"""
+        base = f"http://{host}{path}"
+        urls: list[str] = []
+        for match in EMBEDDED_RE.finditer(body):
+            url = urljoin(base, match.group(1).decode("utf-8", "replace"))
+            if urlsplit(url).hostname == host and url not in urls:
+                urls.append(url)
+        total = Response()
+        semaphore = asyncio.Semaphore(EMBEDDED_CONCURRENCY)
+
+        async def get(url: str):
+            parts = urlsplit(url)
+            async with semaphore:
+                resp = await self.fetch(
+                    host, parts.path + (f"?{parts.query}" if parts.query else "")
+                )
+            total.nb_bytes += resp.nb_bytes
+            total.nb_sent += resp.nb_sent
+            if resp.status >= HTTPStatus.BAD_REQUEST:
+                total.status = resp.status
+
+        await asyncio.gather(*[get(url) for url in urls])
+        return total
+
+    async def sample(self, sampler: Sampler, intended: float | None = None):
+        """run sampler and record its result row
+
+        With an intended start (perf_counter), elapsed and latency are measured
+        from it rather than from when the request could actually be sent"""
+        path = sampler.path.format(term=self.rng.choice(SEARCH_TERMS))
+        host = sampler.host
+        start = time.perf_counter() if intended is None else intended
+        started_on = time.time() - (time.perf_counter() - start)
+        response = Response()
+        error = ""
+        nb_bytes = nb_sent = 0
+        latency = connect = None
+        try:
+            for _ in range(MAX_REDIRECTS + 1):
+                response = await self.fetch(
+                    host, path, keep=sampler.embedded, start=start
+                )
+                nb_bytes += response.nb_bytes
+                nb_sent += response.nb_sent
+                latency = response.latency if latency is None else latency
+                connect = response.connect if connect is None else connect
+                location = response.headers.get("location")
+                if not location or response.status not in REDIRECTS:
+                    break
+                parts = urlsplit(urljoin(f"http://{host}{path}", location))
+                host = parts.hostname or host
+                path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            if sampler.embedded and response.body:
+                embedded = await self.fetch_embedded(host, path, response.body)
+                nb_bytes += embedded.nb_bytes
+                nb_sent += embedded.nb_sent
+                if embedded.status:
+                    error = f"Embedded resource failed with {embedded.status}"
+        except (OSError, TimeoutError) as exc:
+            error = str(exc) or type(exc).__name__
+        elapsed = (time.perf_counter() - start) * 1000
+        if not error and response.status not in sampler.accepted:
+            error = f"not {sampler.accepted[0]}"
+        self.record(
+            {
+                "timeStamp": int(started_on * 1000),
+                "elapsed": round(elapsed),
+                "label": sampler.label,
+                "responseCode": response.status or "Non HTTP response code",
+                "responseMessage": response.message or error,
+                "threadName": self.name,
+                "dataType": (
+                    "text"
+                    if response.headers.get("content-type", "").startswith("text")
+                    else "bin"
+                ),
+                "success": "false" if error else "true",
+                "failureMessage": error,
+                "bytes": nb_bytes,
+                "sentBytes": nb_sent,
+                "grpThreads": self.active(),
+                "allThreads": self.active(),
+                "URL": f"http://{host}{path}",
+                "Latency": round(latency or elapsed),
+                "IdleTime": 0,
+                "Connect": round(connect or 0),
+                IFNAME_FIELD: self.device.ifname,
+            }
+        )
+
+    def reject(self, sampler: Sampler, intended: float):
+        """record sampler as failed, without sending it"""
+        row: dict[str, str | int] = dict.fromkeys(JTL_FIELDS, 0)
+        row.update(
+            {
+                "timeStamp": int(
+                    (time.time() - (time.perf_counter() - intended)) * 1000
+                ),
+                "label": sampler.label,
+                "responseCode": "Non HTTP response code",
+                "responseMessage": REJECTED_MESSAGE,
+                "threadName": self.name,
+                "dataType": "",
+                "success": "false",
+                "failureMessage": REJECTED_MESSAGE,
+                "grpThreads": self.active(),
+                "allThreads": self.active(),
+                "URL": f"http://{sampler.host}{sampler.path}",
+                IFNAME_FIELD: self.device.ifname,
+            }
+        )
+        self.record(row)
+
+    async def run(
+        self,
+        scenario: list[Sampler],
+        loops: int = 1,
+        stopping: Callable[[], bool] = lambda: False,
+        paused: Callable[[], bool] = lambda: False,
+    ):
+        """scenario loops times (forever if negative) or until stopping()
+
+        No request is started while paused()"""
+        try:
+            for _ in itertools.count() if loops < 0 else range(loops):
+                self.addresses.clear()
+                for sampler in scenario:
+                    while paused() and not stopping():
+                        await asyncio.sleep(PAUSE_POLL)
+                    if stopping():
+                        return
+                    await self.sample(sampler)
+                    if self.jitter:
+                        await asyncio.sleep(self.rng.uniform(0, self.jitter))
+        finally:
+            self.close()
+
+    def close(self):
+        """close idle connections"""
+        for conns in self.idle.values():
+            for conn in conns:
+                conn.close()
+        self.idle.clear()
+
+
+class NativeRunner:
+    """Built-in load generator running perf.jmx's scenario on the shared loop
+
+    One virtual user per device, started one per second (JMeter's ramp-up),
+    writing JMeter-compatible results.csv so both engines share the reports"""
+
+    def __init__(
+        self,
+        devices: list[WirelessDevice],
+        *,
+        scenario: list[Sampler],
+        dns_server: IPv4Address,
+        jitter: float = 0.0,
+        loops: int = 1,
+        ramp_up: float | None = None,
+        port: int = HTTP_PORT,
+        workdir: Path | None = None,
+    ):
+        self.devices = devices
+        self.scenario = scenario
+        self.dns_server = dns_server
+        self.jitter = jitter
+        self.loops = loops
+        self.ramp_up = len(devices) if ramp_up is None else ramp_up
+        self.port = port
+        self.workdir = workdir or get_workdir()
+        write_ifnames(self.ifnames_csv_path, [device.ifname for device in devices])
+        self.nb_active: int = 0
+        self.nb_samples: int = 0
+        self.stopping: bool = False
+        self.paused: bool = False
+        self.users: list[VirtualUser] = []
+        self.future: Future[None] | None = None
+        self.started_on = self.ended_on = datetime.datetime.now(datetime.UTC)
+
+    @property
+    def results_csv_path(self) -> Path:
+        return self.workdir.joinpath("results.csv")
+
+    @property
+    def ifnames_csv_path(self) -> Path:
+        return self.workdir.joinpath("ifnames.csv")
+
+    def start(self):
+        self.started_on = datetime.datetime.now(datetime.UTC)
+        self.future = BackgroundLoop.get().submit(self.run())
+
+    def stop(self):
+        """users stop once their current sample is recorded"""
+        self.stopping = True
+
+    def pause(self):
+        """no new request until resume(), those in flight complete"""
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    @property
+    def nb_users(self) -> int:
+        return len(self.devices)
+
+    async def run_user(self, user: VirtualUser, delay: float):
+        await asyncio.sleep(delay)
+        self.nb_active += 1
+        try:
+            await user.run(
+                self.scenario,
+                self.loops,
+                lambda: self.stopping,
+                lambda: self.paused,
+            )
+        finally:
+            self.nb_active -= 1
+
+    async def run(self):
+        with open(self.results_csv_path, "w", newline="") as fh:
+            writer = csv.DictWriter(fh, fieldnames=JTL_FIELDS)
+            writer.writeheader()
+            # rows are buffered not to block the shared loop on every sample
+            pending: list[dict[str, str | int]] = []
+
+            def write(*, flush: bool, fh: IO[str] = fh):
+                writer.writerows(pending)
+                pending.clear()
+                if flush:
+                    fh.flush()
+
+            def record(row: dict[str, str | int]):
+                pending.append(row)
+                self.nb_samples += 1
+                if len(pending) >= RESULTS_BATCH_SIZE:
+                    write(flush=False)
+
+            async def flush_periodically():
+                while True:
+                    await asyncio.sleep(RESULTS_FLUSH_INTERVAL)
+                    write(flush=True)
+
+            self.users = [
+                VirtualUser(
+                    index,
+                    device,
+                    dns_server=self.dns_server,
+                    record=record,
+                    active=lambda: self.nb_active,
+                    jitter=self.jitter,
+                    port=self.port,
+                )
+                for index, device in enumerate(self.devices)
+            ]
+            flusher = asyncio.create_task(flush_periodically())
+            try:
+                await self.drive()
+            finally:
+                flusher.cancel()
+                write(flush=True)
+                self.ended_on = datetime.datetime.now(datetime.UTC)
+
+    async def drive(self):
+        """run users, started ramp_up seconds apart in total"""
+        interval = self.ramp_up / len(self.users) if self.users else 0
+        await asyncio.gather(
+            *[
+                self.run_user(user, index * interval)
+                for index, user in enumerate(self.users)
+            ]
+        )
+
+    @property
+    def is_running(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+    @property
+    def succeeded(self) -> bool:
+        return self.returncode == 0
+
+    @property
+    def returncode(self) -> int | None:
+        if not self.future or not self.future.done():
+            return None
+        if exc := self.future.exception():
+            logger.error(f"Native engine failed: {exc}")
+            return 1
+        return 0
+
+    @property
+    def duration(self) -> float:
+        return (self.ended_on - self.started_on).total_seconds()
+
+    @property
+    def elapsed(self) -> float:
+        """since start, while running"""
+        return (datetime.datetime.now(datetime.UTC) - self.started_on).total_seconds()
+
+
+class OpenLoopRunner(NativeRunner):
+    """Native engine issuing requests on an arrival schedule (open loop)
+
+    Requests are started at `rate` per second, evenly spaced (constant) or
+    as a Poisson process, whether previous ones were answered or not.
+    Arrivals go to devices in turn, each device going through the scenario.
+    Elapsed and latency are measured from each request's intended start so
+    a slow target can't hide behind a lower offered load (coordinated omission)"""
+
+    def __init__(
+        self,
+        devices: list[WirelessDevice],
+        *,
+        rate: float,
+        arrivals: str = ARRIVALS[0],
+        duration: float | None = None,
+        seed: int = 0,
+        **kwargs: Any,
+    ):
+        if rate <= 0:
+            raise ValueError(f"Arrival rate must be positive: {rate}")
+        if arrivals not in ARRIVALS:
+            raise ValueError(f"Unknown arrivals: {arrivals}")
+        super().__init__(devices, **kwargs)
+        self.rate = rate
+        self.arrivals = arrivals
+        # until stop() if None
+        self.run_for = duration
+        self.rng = random.Random(seed)  # noqa: S311
+        self.nb_rejected: int = 0
+
+    def get_offsets(self) -> Iterator[float]:
+        """intended start of each request, in seconds from the first"""
+        offset = 0.0
+        for number in itertools.count(1):
+            yield offset
+            if self.arrivals == POISSON:
+                offset += self.rng.expovariate(self.rate)
+            else:
+                # not accumulated: no rounding drift
+                offset = number / self.rate
+
+    async def issue(self, user: VirtualUser, sampler: Sampler, intended: float):
+        self.nb_active += 1
+        try:
+            await user.sample(sampler, intended)
+        finally:
+            self.nb_active -= 1
+
+    async def drive(self):
+        if not self.users or not self.scenario:
+            return
+        tasks: set[asyncio.Task[None]] = set()
+        start = time.perf_counter()
+        try:
+            for number, offset in enumerate(self.get_offsets()):
+                if self.stopping or (
+                    self.run_for is not None and offset >= self.run_for
+                ):
+                    break
+                if self.paused:
+                    paused_on = time.perf_counter()
+                    while self.paused and not self.stopping:
+                        await asyncio.sleep(PAUSE_POLL)
+                    if self.stopping:
+                        break
+                    # schedule goes on from resume, without catching up
+                    start += time.perf_counter() - paused_on
+                delay = start + offset - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                user = self.users[number % len(self.users)]
+                sampler = self.scenario[
+                    (number // len(self.users)) % len(self.scenario)
+                ]
+                if len(tasks) >= MAX_IN_FLIGHT:
+                    # offered load is kept: counted as failed rather than delayed
+                    self.nb_rejected += 1
+                    user.reject(sampler, start + offset)
+                    continue
+                task = asyncio.create_task(self.issue(user, sampler, start + offset))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            for user in self.users:
+                user.close()
@@ -0,0 +1,104 @@
+import itertools
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from testbench.jtl import GroupSummary, IfnameIndex, JTLColumns
+from testbench.utils.stats import find_knee
+
+# latency climbed once a step's p90 is that many times the first step's
+LATENCY_CLIMB: float = 2.0
+
+
+def get_step_levels(nb_devices: int, steps: list[int]) -> list[int]:
+    """number of users of each step: steps (within nb_devices) or 1, 2, 4… all"""
+    if steps:
+        return sorted({step for step in steps if 0 < step <= nb_devices})
+    if not nb_devices:
+        return []
+    doubling = itertools.takewhile(
+        lambda level: level < nb_devices, (2**power for power in itertools.count())
+    )
+    return [*doubling, nb_devices]
+
+
+@dataclass(kw_only=True)
+class LoadStep:
+    """results of a number of users, over its hold period"""
+
+    nb_users: int
+    # measured duration (seconds), after warm-up
+    hold: float
+    # timestamp the measured duration started on
+    hold_from: float = 0.0
+    summary: GroupSummary
+    results_csv_path: Path
+    nb_quarantined: int = 0
+    stalled: bool = False
+
+    @property
+    def rate(self) -> float:
+        """requests per second"""
+        return self.summary.nb_total / self.hold if self.hold > 0 else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        total = self.summary.nb_total
+        return self.summary.nb_failed / total if total else 0.0
+
+    @classmethod
+    def from_results(
+        cls,
+        nb_users: int,
+        path: Path,
+        index: IfnameIndex,
+        *,
+        hold_from: float,
+        hold_to: float,
+    ) -> "LoadStep":
+        """step of samples of path started within [hold_from, hold_to] timestamps"""
+        columns = JTLColumns.load(path, index, path.with_suffix(".quarantine.csv"))
+        return cls(
+            nb_users=nb_users,
+            hold=hold_to - hold_from,
+            hold_from=hold_from,
+            summary=columns.between(int(hold_from * 1000), int(hold_to * 1000)),
+            results_csv_path=path,
+            nb_quarantined=columns.nb_quarantined,
+        )
+
+
+@dataclass(kw_only=True)
+class LoadCurve:
+    """steps of increasing number of users and where they stop paying off"""
+
+    knee_ratio: float
+    steps: list[LoadStep] = field(default_factory=list[LoadStep])
+
+    @property
+    def throughput_knee(self) -> LoadStep | None:
+        """step past which adding users stops adding requests per second"""
+        knee = find_knee(
+            [(step.nb_users, step.rate) for step in self.steps], self.knee_ratio
+        )
+        return self.get_step(knee[0]) if knee else None
+
+    @property
+    def latency_knee(self) -> LoadStep | None:
+        """first step whose p90 elapsed climbed (LATENCY_CLIMB) from the first's"""
+        if not self.steps or self.steps[0].summary.elapsed.p90 <= 0:
+            return None
+        base = self.steps[0].summary.elapsed.p90
+        for step in self.steps[1:]:
+            if step.summary.elapsed.p90 >= LATENCY_CLIMB * base:
+                return step
+        return None
+
+    @property
+    def best(self) -> LoadStep | None:
+        return max(self.steps, key=lambda step: step.rate, default=None)
+
+    def get_step(self, nb_users: int) -> LoadStep | None:
+        for step in self.steps:
+            if step.nb_users == nb_users:
+                return step
+        return None
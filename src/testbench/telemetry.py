@@ -0,0 +1,338 @@
+import re
+import shutil
+import subprocess
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from ipaddress import IPv4Address
+
+from humanfriendly import parse_size
+from urllib3.connectionpool import HTTPConnectionPool
+
+from testbench.utils.host import ratio
+from testbench.utils.instrumentation import tracked_run
+from testbench.utils.procfs import CPUTimes, parse_cpu_times, parse_meminfo
+from testbench.utils.sampler import DEFAULT_CAPACITY, PeriodicSampler
+
+TIMEOUT: float = 5.0
+
+METRICS_PATH: str = "/metrics"
+# jiffies per second (USER_HZ), to express node-exporter's seconds like /proc/stat
+USER_HZ: int = 100
+IDLE_MODES: tuple[str, ...] = ("idle", "iowait")
+# name{label="value",…} value [timestamp]
+METRIC_RE = re.compile(
+    r"^(?P<name>[a-zA-Z_:][\w:]*)(?:\{(?P<labels>.*)\})?\s+(?P<value>\S+)"
+)
+LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+SSH_BINARY: str = shutil.which("ssh") or "/usr/bin/ssh"
+# each section's output follows a `## <name>` line
+SSH_SECTIONS: dict[str, str] = {
+    "stat": "cat /proc/stat",
+    "meminfo": "cat /proc/meminfo",
+    "loadavg": "cat /proc/loadavg",
+    # millidegrees Celsius
+    "thermal": "cat /sys/class/thermal/thermal_zone*/temp",
+    "containers": "docker stats --no-stream "
+    "--format '{{.Name}}\t{{.CPUPerc}}\t{{.MemUsage}}'",
+}
+SSH_SCRIPT: str = "; ".join(
+    f"echo '## {name}'; {command} 2>/dev/null" for name, command in SSH_SECTIONS.items()
+)
+
+
+@dataclass(kw_only=True, slots=True)
+class ContainerReading:
+    memory: int  # bytes
+    # cumulative CPU seconds (metrics endpoint)
+    cpu_seconds: float | None = None
+    # busy cores, as measured by the source itself (docker stats)
+    cpu: float | None = None
+
+
+@dataclass(kw_only=True)
+class TargetReading:
+    """target's resources, as read from a source (cumulative CPU times)"""
+
+    cpu: CPUTimes | None = None
+    memory_total: int = 0  # bytes
+    memory_available: int = 0  # bytes
+    load: float | None = None  # 1 minute load average
+    temperature: float | None = None  # °C, hottest zone
+    containers: dict[str, ContainerReading] = field(
+        default_factory=dict[str, ContainerReading]
+    )
+
+
+def parse_metrics(text: str) -> TargetReading:
+    """reading from a Prometheus text exposition (node-exporter, cAdvisor)"""
+    reading = TargetReading()
+    busy = idle = softirq = 0.0
+    temperatures: list[float] = []
+    for line in text.splitlines():
+        match = METRIC_RE.match(line)
+        if not match:
+            continue
+        name = match.group("name")
+        labels = dict(LABEL_RE.findall(match.group("labels") or ""))
+        try:
+            value = float(match.group("value"))
+        except ValueError:
+            continue
+        if name == "node_cpu_seconds_total":
+            mode = labels.get("mode", "")
+            if mode in IDLE_MODES:
+                idle += value
+            elif mode not in ("guest", "guest_nice"):
+                # guest times are already included in user and nice
+                busy += value
+            if mode == "softirq":
+                softirq += value
+        elif name == "node_memory_MemTotal_bytes":
+            reading.memory_total = int(value)
+        elif name == "node_memory_MemAvailable_bytes":
+            reading.memory_available = int(value)
+        elif name == "node_load1":
+            reading.load = value
+        elif name in ("node_thermal_zone_temp", "node_hwmon_temp_celsius"):
+            temperatures.append(value)
+        elif name.startswith("container_") and labels.get("name"):
+            # cgroups without a name are not containers (slices, root)
+            container = reading.containers.setdefault(
+                labels["name"], ContainerReading(memory=0)
+            )
+            if name == "container_cpu_usage_seconds_total":
+                container.cpu_seconds = (container.cpu_seconds or 0) + value
+            elif name == "container_memory_usage_bytes":
+                container.memory = int(value)
+    if busy or idle:
+        reading.cpu = CPUTimes(
+            busy=round(busy * USER_HZ),
+            softirq=round(softirq * USER_HZ),
+            total=round((busy + idle) * USER_HZ),
+        )
+    reading.temperature = max(temperatures, default=None)
+    return reading
+
+
+def parse_sections(text: str) -> TargetReading:
+    """reading from SSH_SCRIPT's output"""
+    sections: dict[str, list[str]] = {}
+    lines: list[str] = []
+    for line in text.splitlines():
+        if line.startswith("## "):
+            lines = sections.setdefault(line[3:].strip(), [])
+        else:
+            lines.append(line)
+
+    reading = TargetReading()
+    reading.cpu = parse_cpu_times("\n".join(sections.get("stat", []))).get("cpu")
+    meminfo = parse_meminfo("\n".join(sections.get("meminfo", [])))
+    reading.memory_total = meminfo.get("MemTotal", 0)
+    reading.memory_available = meminfo.get("MemAvailable", 0)
+    if loadavg := sections.get("loadavg"):
+        reading.load = float(loadavg[0].split()[0])
+    reading.temperature = max(
+        (int(line) / 1000 for line in sections.get("thermal", []) if line.strip()),
+        default=None,
+    )
+    # name, CPU % (of a core) and `used / limit` memory
+    for line in sections.get("containers", []):
+        fields = line.split("\t")
+        if len(fields) != 3:  # noqa: PLR2004
+            continue
+        name, cpu, memory = fields
+        try:
+            reading.containers[name] = ContainerReading(
+                cpu=float(cpu.rstrip("%")) / 100,
+                memory=parse_size(memory.split("/")[0].strip(), binary=True),
+            )
+        except ValueError:
+            continue
+    return reading
+
+
+def fetch_metrics(
+    address: IPv4Address, port: int, timeout: float = TIMEOUT
+) -> TargetReading:
+    """reading from the metrics endpoint of address. OSError on failure"""
+    with HTTPConnectionPool(str(address), port, timeout=timeout, retries=False) as pool:
+        try:
+            response = pool.request("GET", METRICS_PATH)
+        except Exception as exc:
+            raise OSError(f"Unable to fetch metrics: {exc}") from exc
+    if response.status != HTTPStatus.OK:
+        raise OSError(f"Unable to fetch metrics: HTTP {response.status}")
+    return parse_metrics(response.data.decode("utf-8", errors="replace"))
+
+
+def run_over_ssh(
+    address: IPv4Address, user: str, timeout: float = TIMEOUT
+) -> TargetReading:
+    """reading from SSH_SCRIPT run on address (key-based). OSError on failure"""
+    try:
+        ps = tracked_run(
+            [
+                SSH_BINARY,
+                "-o",
+                "BatchMode=yes",
+                "-o",
+                f"ConnectTimeout={int(timeout)}",
+                f"{user}@{address}",
+                SSH_SCRIPT,
+            ],
+            capture_output=True,
+            text=True,
+            # docker stats measures over a couple of seconds
+            timeout=timeout * 2,
+            check=False,
+        )
+    except subprocess.TimeoutExpired as exc:
+        raise OSError(f"SSH to {address} timed out") from exc
+    if not ps.stdout.strip():
+        raise OSError(f"SSH to {address} failed: {ps.stderr.strip()}")
+    return parse_sections(ps.stdout)
+
+
+@dataclass(kw_only=True, slots=True)
+class ContainerSample:
+    cpu: float | None  # busy cores
+    memory: int  # bytes
+
+
+@dataclass(kw_only=True, slots=True)
+class TargetSample:
+    """target's usage over the interval ending on `on`"""
+
+    on: float  # timestamp
+    cpu: float | None  # busy ratio, all cores (None on first reading)
+    memory: float  # used (not available) ratio
+    memory_used: int  # bytes
+    load: float | None
+    temperature: float | None  # °C
+    containers: dict[str, ContainerSample]
+
+
+@dataclass(kw_only=True)
+class ContainerSummary:
+    cpu_avg: float
+    cpu_max: float
+    memory_max: int
+
+
+@dataclass(kw_only=True)
+class TargetSummary:
+    nb_samples: int
+    cpu_avg: float | None
+    cpu_max: float | None
+    memory_max: float
+    memory_used_max: int
+    load_max: float | None
+    temperature_max: float | None
+    containers: dict[str, ContainerSummary]
+
+    @classmethod
+    def of(cls, samples: list[TargetSample]) -> "TargetSummary":
+        def avg(values: list[float]) -> float | None:
+            return sum(values) / len(values) if values else None
+
+        cpus = [sample.cpu for sample in samples if sample.cpu is not None]
+        loads = [sample.load for sample in samples if sample.load is not None]
+        temperatures = [
+            sample.temperature for sample in samples if sample.temperature is not None
+        ]
+        containers: dict[str, ContainerSummary] = {}
+        for name in sorted({name for sample in samples for name in sample.containers}):
+            readings = [
+                sample.containers[name]
+                for sample in samples
+                if name in sample.containers
+            ]
+            usages = [reading.cpu for reading in readings if reading.cpu is not None]
+            containers[name] = ContainerSummary(
+                cpu_avg=avg(usages) or 0.0,
+                cpu_max=max(usages, default=0.0),
+                memory_max=max(reading.memory for reading in readings),
+            )
+        return cls(
+            nb_samples=len(samples),
+            cpu_avg=avg(cpus),
+            cpu_max=max(cpus, default=None),
+            memory_max=max((sample.memory for sample in samples), default=0.0),
+            memory_used_max=max((sample.memory_used for sample in samples), default=0),
+            load_max=max(loads, default=None),
+            temperature_max=max(temperatures, default=None),
+            containers=containers,
+        )
+
+
+class TargetSampler(PeriodicSampler[TargetSample]):
+    """Collects the target's resources for the lifetime of a run
+
+    Readings come from source (fetch_metrics or run_over_ssh on the gateway);
+    CPU usages are computed between consecutive readings. Samples are
+    timestamped on the test host's clock, as results are."""
+
+    name: str = "target"
+
+    def __init__(
+        self,
+        source: Callable[[], TargetReading],
+        interval: float,
+        capacity: int = DEFAULT_CAPACITY,
+    ):
+        super().__init__(interval=interval, capacity=capacity)
+        self.source = source
+        self.previous: tuple[float, TargetReading] | None = None
+
+    def sample(self):
+        reading = self.source()
+        now = time.time()
+        previous, self.previous = self.previous, (now, reading)
+
+        cpu: float | None = None
+        before: TargetReading | None = None
+        duration = self.interval
+        if previous is not None:
+            duration = (now - previous[0]) or self.interval
+            before = previous[1]
+            if reading.cpu and before.cpu:
+                cpu = ratio(
+                    reading.cpu.busy - before.cpu.busy,
+                    reading.cpu.total - before.cpu.total,
+                )
+
+        containers: dict[str, ContainerSample] = {}
+        for name, container in reading.containers.items():
+            usage = container.cpu
+            previous_container = before.containers.get(name) if before else None
+            if (
+                usage is None
+                and container.cpu_seconds is not None
+                and previous_container
+                and previous_container.cpu_seconds is not None
+            ):
+                usage = (container.cpu_seconds - previous_container.cpu_seconds) / (
+                    duration
+                )
+            containers[name] = ContainerSample(cpu=usage, memory=container.memory)
+
+        memory_used = reading.memory_total - reading.memory_available
+        self.record(
+            TargetSample(
+                on=now,
+                cpu=cpu,
+                memory=ratio(memory_used, reading.memory_total),
+                memory_used=memory_used if reading.memory_total else 0,
+                load=reading.load,
+                temperature=reading.temperature,
+                containers=containers,
+            )
+        )
+
+    def summary(
+        self, start: float | None = None, end: float | None = None
+    ) -> TargetSummary:
+        return TargetSummary.of(self.samples(start=start, end=end))
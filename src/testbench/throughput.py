@@ -0,0 +1,281 @@
+import math
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from ipaddress import IPv4Address
+from urllib.parse import urlsplit
+
+from testbench.context import Context
+from testbench.utils.dns import get_dns_answer_for
+from testbench.utils.icmp import SO_BINDTODEVICE
+from testbench.utils.wlan import WirelessDevice
+
+logger = Context.logger
+
+DOWNLOAD = "download"
+UPLOAD = "upload"
+# size of each stream's (preallocated) transfer buffer and socket buffers
+BUFFER_SIZE: int = 256 * 1024
+# body size announced for uploads (streams are cut at deadline anyway)
+UPLOAD_SIZE: int = 2**30
+# width (seconds) of timeline buckets
+BUCKET_WIDTH: float = 1.0
+# time given to all streams to resolve and connect before the measure starts
+WARMUP: float = 2.0
+CONNECT_TIMEOUT: float = 5.0
+HEADERS_MAX_SIZE: int = 16384
+
+
+def to_mbps(nb_bytes: float, duration: float) -> float:
+    return nb_bytes * 8 / duration / 1_000_000 if duration > 0 else 0.0
+
+
+@dataclass(kw_only=True)
+class Target:
+    """HTTP endpoint to transfer bulk payloads from/to"""
+
+    host: str
+    port: int
+    path: str
+
+    @classmethod
+    def from_url(cls, url: str) -> "Target":
+        parts = urlsplit(url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError(f"Unsupported URL (plain http only): {url}")
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+        return cls(host=parts.hostname, port=parts.port or 80, path=path)
+
+
+@dataclass(kw_only=True)
+class StreamStats:
+    ifname: str
+    direction: str
+    duration: float
+    nb_bytes: int = 0
+    nb_requests: int = 0
+    # bytes transferred in each BUCKET_WIDTH-wide slot of the measure
+    buckets: list[int] = field(default_factory=list[int])
+    error: str = ""
+
+    def __post_init__(self):
+        if not self.buckets:
+            self.buckets = [0] * max(math.ceil(self.duration / BUCKET_WIDTH), 1)
+
+    @property
+    def mbps(self) -> float:
+        return to_mbps(self.nb_bytes, self.duration)
+
+    def record(self, nb_bytes: int, elapsed: float):
+        index = min(max(int(elapsed / BUCKET_WIDTH), 0), len(self.buckets) - 1)
+        self.buckets[index] += nb_bytes
+        self.nb_bytes += nb_bytes
+
+
+class BulkStream:
+    """Back-to-back HTTP bulk transfers over a single interface until deadline
+
+    Socket is bound to the interface (SO_BINDTODEVICE) and data is read into
+    (or sent from) a buffer allocated once, so the host does not copy
+    nor allocate per chunk."""
+
+    def __init__(
+        self,
+        device: WirelessDevice,
+        target: Target,
+        direction: str,
+        dns_server: IPv4Address,
+    ):
+        self.device = device
+        self.target = target
+        self.direction = direction
+        self.dns_server = dns_server
+        self.buffer = bytearray(BUFFER_SIZE)
+        self.view = memoryview(self.buffer)
+
+    def resolve(self) -> str:
+        try:
+            return str(IPv4Address(self.target.host))
+        except ValueError:
+            pass
+        if not self.device.ip4:
+            raise OSError(f"{self.device.ifname} has no IPv4 link")
+        address = get_dns_answer_for(
+            source_addr=self.device.ip4.address,
+            server=self.device.ip4.dns or self.dns_server,
+            domain=self.target.host,
+        )
+        if not address:
+            raise OSError(f"Unable to resolve {self.target.host}")
+        return str(address)
+
+    def open(self, address: str) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.setsockopt(
+                socket.SOL_SOCKET, SO_BINDTODEVICE, self.device.ifname.encode()
+            )
+            if self.device.ip4:
+                sock.bind((str(self.device.ip4.address), 0))
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, BUFFER_SIZE)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, BUFFER_SIZE)
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect((address, self.target.port))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def request_head(self, method: str, extra: str = "") -> bytes:
+        return (
+            f"{method} {self.target.path} HTTP/1.1\r\n"
+            f"Host: {self.target.host}\r\n"
+            "User-Agent: testbench\r\n"
+            f"{extra}"
+            "Connection: close\r\n\r\n"
+        ).encode("ascii")
+
+    def read_headers(self, sock: socket.socket) -> int:
+        """read response headers, returning number of body bytes read with them"""
+        filled = 0
+        while filled < HEADERS_MAX_SIZE:
+            nb_read = sock.recv_into(self.view[filled:HEADERS_MAX_SIZE])
+            if not nb_read:
+                raise OSError("Connection closed before response headers")
+            filled += nb_read
+            end = self.buffer.find(b"\r\n\r\n", 0, filled)
+            if end < 0:
+                continue
+            status_line = bytes(self.view[: self.buffer.find(b"\r\n")])
+            parts = status_line.split(b" ", 2)
+            if len(parts) < 2 or not parts[1].startswith(b"2"):  # noqa: PLR2004
+                raise OSError(f"Unexpected response: {status_line.decode()}")
+            return filled - end - 4
+        raise OSError("Response headers too large")
+
+    def download(self, sock: socket.socket, stats: StreamStats, start: float) -> int:
+        deadline = start + stats.duration
+        sock.sendall(self.request_head("GET"))
+        nb_bytes = self.read_headers(sock)
+        stats.record(nb_bytes, time.monotonic() - start)
+        while (remaining := deadline - time.monotonic()) > 0:
+            sock.settimeout(remaining)
+            try:
+                nb_read = sock.recv_into(self.view)
+            except (TimeoutError, ConnectionResetError):
+                break
+            if not nb_read:
+                break
+            nb_bytes += nb_read
+            stats.record(nb_read, time.monotonic() - start)
+        return nb_bytes
+
+    def upload(self, sock: socket.socket, stats: StreamStats, start: float) -> int:
+        deadline = start + stats.duration
+        sock.sendall(
+            self.request_head(
+                "POST",
+                "Content-Type: application/octet-stream\r\n"
+                f"Content-Length: {UPLOAD_SIZE}\r\n",
+            )
+        )
+        nb_bytes = 0
+        while nb_bytes < UPLOAD_SIZE and (remaining := deadline - time.monotonic()) > 0:
+            sock.settimeout(remaining)
+            try:
+                nb_sent = sock.send(self.view[: UPLOAD_SIZE - nb_bytes])
+            except (TimeoutError, ConnectionResetError, BrokenPipeError):
+                break
+            nb_bytes += nb_sent
+            stats.record(nb_sent, time.monotonic() - start)
+        return nb_bytes
+
+    def run(self, start: float, duration: float) -> StreamStats:
+        """transfer from (monotonic) start for duration seconds"""
+        stats = StreamStats(
+            ifname=self.device.ifname, direction=self.direction, duration=duration
+        )
+        transfer = self.download if self.direction == DOWNLOAD else self.upload
+        try:
+            address = self.resolve()
+            # first connection is established during warmup
+            sock = self.open(address)
+            time.sleep(max(start - time.monotonic(), 0))
+            while True:
+                with sock:
+                    nb_bytes = transfer(sock, stats, start)
+                stats.nb_requests += 1
+                if time.monotonic() >= start + duration:
+                    break
+                if not nb_bytes:
+                    raise OSError("No data transferred")
+                sock = self.open(address)
+        except OSError as exc:
+            logger.debug(f"{self.device.ifname} {self.direction} failed: {exc}")
+            stats.error = str(exc)
+        return stats
+
+
+@dataclass(kw_only=True)
+class ThroughputLevel:
+    """concurrent transfers of a set of devices in one direction"""
+
+    direction: str
+    duration: float
+    streams: list[StreamStats]
+
+    @property
+    def nb_devices(self) -> int:
+        return len(self.streams)
+
+    @property
+    def nb_failed(self) -> int:
+        return len([stream for stream in self.streams if stream.error])
+
+    @property
+    def mbps(self) -> float:
+        return sum(stream.mbps for stream in self.streams)
+
+    @property
+    def timeline(self) -> list[float]:
+        """aggregate Mb/s of each BUCKET_WIDTH-wide slot"""
+        if not self.streams:
+            return []
+        return [
+            to_mbps(sum(slot), BUCKET_WIDTH)
+            for slot in zip(*[stream.buckets for stream in self.streams], strict=True)
+        ]
+
+
+def measure_throughput(
+    devices: list[WirelessDevice],
+    target: Target,
+    *,
+    direction: str,
+    duration: float,
+    dns_server: IPv4Address,
+) -> ThroughputLevel:
+    """aggregate throughput of all devices transferring at once"""
+    streams = [
+        BulkStream(device, target, direction=direction, dns_server=dns_server)
+        for device in devices
+    ]
+    start = time.monotonic() + WARMUP
+
+    def run(stream: BulkStream) -> StreamStats:
+        return stream.run(start, duration)
+
+    with ThreadPoolExecutor(max_workers=max(len(streams), 1)) as executor:
+        results = list(executor.map(run, streams))
+    return ThroughputLevel(direction=direction, duration=duration, streams=results)
+
+
+def get_ramp_levels(nb_devices: int, step: int) -> list[int]:
+    """number of devices of each ramp step, always ending with all devices"""
+    levels = list(range(max(step, 1), nb_devices + 1, max(step, 1)))
+    if nb_devices and (not levels or levels[-1] != nb_devices):
+        levels.append(nb_devices)
+    return levels
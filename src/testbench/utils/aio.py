@@ -0,0 +1,40 @@
+import asyncio
+import threading
+from collections.abc import Coroutine
+from concurrent.futures import Future
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class BackgroundLoop:
+    """asyncio loop running in a daemon thread, shared by all callers
+
+    Lets the per-device worker threads submit their I/O (probes, queries)
+    to a single event loop instead of each blocking on its own sockets."""
+
+    # singleton instance
+    _instance: "BackgroundLoop | None" = None
+    _lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="aio-loop", daemon=True
+        )
+        self.thread.start()
+
+    @classmethod
+    def get(cls) -> "BackgroundLoop":
+        with cls._lock:
+            if not cls._instance:
+                cls._instance = cls()
+            return cls._instance
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """run coro on the shared loop and block until its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> Future[T]:
+        """run coro on the shared loop, without waiting for it"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
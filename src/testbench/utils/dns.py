@@ -1,51 +1,203 @@
-import re
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
 from ipaddress import IPv4Address, IPv4Network
+from typing import Any
 
-import dns
-import dns.query
+import dns.asyncquery
+import dns.exception
+import dns.message
+import dns.rcode
+import dns.rdatatype
+from dns.rdata import Rdata
+from dns.rdtypes.IN.A import A
 
 from testbench.context import Context
+from testbench.utils.aio import BackgroundLoop
 
-RE_DNS_ANSWER = re.compile(
-    r"^(?P<domain>.+)\. (?P<ttl>\d+) IN A (?P<dest_address>[0-9\.]+)"
-)
-logger = Context.get().logger
+logger = Context.logger
+
+DNS_PORT: int = 53
+DEFAULT_TIMEOUT: float = 2.0
+DEFAULT_RETRIES: int = 2
+
+
+@dataclass(kw_only=True)
+class DNSAnswer:
+    """outcome of an A query (possibly retried)"""
+
+    domain: str
+    server: IPv4Address
+    source: IPv4Address | None = None
+    addresses: list[IPv4Address] = field(default_factory=list[IPv4Address])
+    # lowest TTL of the A records
+    ttl: int | None = None
+    rcode: str = ""
+    # duration of the answered attempt, in milliseconds
+    latency: float = 0.0
+    attempts: int = 0
+    error: str = ""
+
+    @property
+    def succeeded(self) -> bool:
+        return not self.error and self.rcode == "NOERROR"
+
+    @property
+    def address(self) -> IPv4Address | None:
+        return self.addresses[0] if self.addresses else None
+
+    def matches(self, expected: IPv4Address) -> bool:
+        """whether expected is the one and only address answered"""
+        return self.succeeded and self.addresses == [expected]
+
+    def within(self, network: IPv4Network) -> bool:
+        """whether all answered addresses are inside network"""
+        return (
+            self.succeeded
+            and bool(self.addresses)
+            and all(address in network for address in self.addresses)
+        )
+
+    def __str__(self) -> str:
+        if self.error:
+            return f"{self.error} after {self.attempts} attempt(s)"
+        if not self.addresses:
+            return f"{self.rcode} in {self.latency:.1f} ms"
+        return (
+            f"{', '.join(str(address) for address in self.addresses)} "
+            f"(TTL {self.ttl}) in {self.latency:.1f} ms"
+        )
+
+
+def get_a_records(
+    response: dns.message.Message,
+) -> tuple[list[IPv4Address], int | None]:
+    """addresses of all A records of a response and their lowest TTL"""
+    addresses: list[IPv4Address] = []
+    ttl: int | None = None
+    for rrset in response.answer:
+        if rrset.rdtype != dns.rdatatype.A:
+            continue
+        ttl = rrset.ttl if ttl is None else min(ttl, rrset.ttl)
+        rdatas: list[Rdata] = list(rrset)
+        addresses += [
+            IPv4Address(rdata.address) for rdata in rdatas if isinstance(rdata, A)
+        ]
+    return addresses, ttl
+
+
+async def query(
+    domain: str,
+    server: IPv4Address,
+    source: IPv4Address | None = None,
+    *,
+    port: int = DNS_PORT,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+) -> DNSAnswer:
+    """A records of domain from server, sent from source address
+
+    Lost or failed queries are retried up to `retries` times"""
+    answer = DNSAnswer(domain=domain, server=server, source=source)
+    message = dns.message.make_query(domain, dns.rdatatype.A)
+    while answer.attempts <= retries:
+        answer.attempts += 1
+        start = time.perf_counter()
+        try:
+            response = await dns.asyncquery.udp(
+                message,
+                where=str(server),
+                port=port,
+                source=str(source) if source else None,
+                timeout=timeout,
+            )
+        except dns.exception.Timeout:
+            answer.error = f"Timed out after {timeout}s"
+            continue
+        except (OSError, dns.exception.DNSException) as exc:
+            answer.error = str(exc) or type(exc).__name__
+            continue
+        answer.latency = (time.perf_counter() - start) * 1000
+        answer.error = ""
+        answer.rcode = dns.rcode.to_text(response.rcode())
+        answer.addresses, answer.ttl = get_a_records(response)
+        break
+    return answer
+
+
+@dataclass(kw_only=True)
+class DNSQuery:
+    domain: str
+    server: IPv4Address
+    source: IPv4Address | None = None
+    port: int = DNS_PORT
+
+
+async def query_all(
+    queries: list[DNSQuery],
+    *,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+) -> list[DNSAnswer]:
+    """answers to all queries, sent concurrently"""
+    return await asyncio.gather(
+        *[
+            query(
+                item.domain,
+                item.server,
+                item.source,
+                port=item.port,
+                timeout=timeout,
+                retries=retries,
+            )
+            for item in queries
+        ]
+    )
+
+
+def resolve(
+    domain: str,
+    server: IPv4Address,
+    source: IPv4Address | None = None,
+    *,
+    port: int = DNS_PORT,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+) -> DNSAnswer:
+    """query from any thread, using the shared event loop"""
+    return BackgroundLoop.get().run(
+        query(domain, server, source, port=port, timeout=timeout, retries=retries)
+    )
+
+
+def resolve_all(
+    queries: list[DNSQuery],
+    *,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+) -> list[DNSAnswer]:
+    """all queries at once, using the shared event loop"""
+    return BackgroundLoop.get().run(
+        query_all(queries, timeout=timeout, retries=retries)
+    )
 
 
 def verify_dns_for(
     source_addr: str, server: str, domain: str, dest_address: str
 ) -> bool:
     """Whether DNS query from source_addr via server for domain returns des_address"""
-
-    query = dns.message.make_query(  # pyright: ignore[reportUnknownMemberType, reportUnknownVariableType, reportAttributeAccessIssue]
-        domain,
-        dns.rdatatype.A,  # pyright: ignore[reportUnknownMemberType, reportAttributeAccessIssue]
-    )
-    resp = dns.query.udp(  # pyright: ignore[reportUnknownArgumentType]
-        query,  # pyright: ignore[reportUnknownArgumentType]
-        where=server,
-        source=source_addr,
-    )
-    return resp.answer[0].to_text() == f"{domain}. 0 IN A {dest_address}"
+    return resolve(
+        domain, server=IPv4Address(server), source=IPv4Address(source_addr)
+    ).matches(IPv4Address(dest_address))
 
 
 def get_dns_answer_for(
     source_addr: IPv4Address, server: IPv4Address, domain: str
 ) -> IPv4Address | None:
     """IP address for requested domain"""
-    query = dns.message.make_query(  # pyright: ignore[reportUnknownMemberType, reportUnknownVariableType, reportAttributeAccessIssue]
-        domain,
-        dns.rdatatype.A,  # pyright: ignore[reportUnknownMemberType, reportAttributeAccessIssue]
-    )
-    resp = dns.query.udp(  # pyright: ignore[reportUnknownArgumentType]
-        query,  # pyright: ignore[reportUnknownArgumentType]
-        where=str(server),
-        source=str(source_addr),
-    )
-    m = RE_DNS_ANSWER.match(resp.answer[0].to_text())
-    if not m or m.groupdict()["domain"] != domain:
-        return None
-    return IPv4Address(m.groupdict()["dest_address"])
+    return resolve(domain, server=server, source=source_addr).address
 
 
 def verify_dns_within_for(
@@ -60,13 +212,115 @@ def verify_dns_within_for(
     or an IP within dest_network"""
     if not dest_address and not dest_network:
         raise OSError("dest_address or dest_network must be set")
-    answer_dest_address = get_dns_answer_for(
-        source_addr=source_addr, server=server, domain=domain
-    )
-    if not answer_dest_address:
-        return False
+    answer = resolve(domain, server=server, source=source_addr)
     if dest_address:
-        return answer_dest_address == dest_address
+        return answer.matches(dest_address)
     if dest_network:
-        return answer_dest_address in dest_network
+        return answer.within(dest_network)
     return False
+
+
+class DNSCache:
+    """TTL-aware cache of DNS answers (one per device)
+
+    - answers are kept for their TTL, but at least min_ttl seconds
+      (the hotspot answers with a TTL of 0)
+    - NXDOMAIN and empty answers are kept negative_ttl seconds
+    - failed queries (timeouts, SERVFAIL…) are never cached"""
+
+    # named instances (per device)
+    _instances: "dict[str, DNSCache]" = {}  # noqa: RUF012
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        *,
+        min_ttl: float,
+        negative_ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_ttl = min_ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        # (domain, server): (expires_on, answer)
+        self.entries: dict[tuple[str, IPv4Address], tuple[float, DNSAnswer]] = {}
+        self.nb_hits: int = 0
+        self.nb_misses: int = 0
+
+    @classmethod
+    def get(cls, name: str) -> "DNSCache":
+        """named cache, created from context's settings"""
+        with cls._lock:
+            if name not in cls._instances:
+                context = Context.get()
+                cls._instances[name] = cls(
+                    min_ttl=context.dns_cache_min_ttl,
+                    negative_ttl=context.dns_cache_negative_ttl,
+                )
+            return cls._instances[name]
+
+    @classmethod
+    def get_totals(cls) -> tuple[int, int]:
+        """hits and misses of all named caches"""
+        with cls._lock:
+            caches = list(cls._instances.values())
+        return (
+            sum(cache.nb_hits for cache in caches),
+            sum(cache.nb_misses for cache in caches),
+        )
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.nb_hits + self.nb_misses
+        return self.nb_hits / total if total else 0.0
+
+    def get_ttl(self, answer: DNSAnswer) -> float | None:
+        """how long answer can be kept (None if it must not)"""
+        if answer.error:
+            return None
+        if answer.succeeded and answer.addresses:
+            return max(answer.ttl or 0, self.min_ttl)
+        if answer.rcode in ("NXDOMAIN", "NOERROR"):
+            return self.negative_ttl
+        return None
+
+    def lookup(self, domain: str, server: IPv4Address) -> DNSAnswer | None:
+        key = (domain.lower(), server)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > self.clock():
+                self.nb_hits += 1
+                return entry[1]
+            if entry:
+                del self.entries[key]
+            self.nb_misses += 1
+            return None
+
+    def store(self, answer: DNSAnswer):
+        ttl = self.get_ttl(answer)
+        if not ttl or ttl <= 0:
+            return
+        with self.lock:
+            self.entries[(answer.domain.lower(), answer.server)] = (
+                self.clock() + ttl,
+                answer,
+            )
+
+    def resolve(
+        self,
+        domain: str,
+        server: IPv4Address,
+        source: IPv4Address | None = None,
+        **kwargs: Any,
+    ) -> DNSAnswer:
+        """cached answer or a fresh one (see resolve())"""
+        if answer := self.lookup(domain, server):
+            return answer
+        answer = resolve(domain, server, source, **kwargs)
+        self.store(answer)
+        return answer
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,210 @@
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from testbench.utils.procfs import (
+    PROC_ROOT,
+    CPUTimes,
+    NetDevCounters,
+    get_process_tree,
+    read_cpu_times,
+    read_meminfo,
+    read_net_dev,
+    read_rss,
+)
+from testbench.utils.sampler import DEFAULT_CAPACITY, PeriodicSampler
+
+# a sample is saturated over any of those (ratios)
+CPU_THRESHOLD: float = 0.85
+CORE_THRESHOLD: float = 0.95
+SOFTIRQ_THRESHOLD: float = 0.5
+MEMORY_THRESHOLD: float = 0.9
+# and a run once that share of its samples are
+SATURATED_SHARE: float = 0.1
+
+
+def ratio(part: int, total: int) -> float:
+    return part / total if total > 0 else 0.0
+
+
+@dataclass(kw_only=True, slots=True)
+class HostSample:
+    """test host's usage over the interval ending on `on`"""
+
+    on: float  # timestamp
+    cpu: float  # busy ratio, all cores
+    busiest_core: float  # busy ratio of the busiest core
+    softirq: float  # softirq ratio of the core spending the most in it
+    memory: float  # used (not available) ratio
+    rss: int  # bytes, load generator's process tree
+    # watched interfaces, all together
+    rx_rate: float  # bytes/s
+    tx_rate: float  # bytes/s
+    drops: int  # rx and tx
+
+
+@dataclass(kw_only=True)
+class HostSummary:
+    nb_samples: int
+    cpu_avg: float
+    busiest_core_avg: float
+    softirq_max: float
+    memory_max: float
+    rss_max: int
+    rx_rate_avg: float
+    tx_rate_avg: float
+    drops: int
+    # share of samples over each threshold
+    cpu_share: float
+    core_share: float
+    softirq_share: float
+    memory_share: float
+
+    @classmethod
+    def of(cls, samples: list[HostSample]) -> "HostSummary":
+        nb_samples = len(samples)
+
+        def avg(values: list[float]) -> float:
+            return sum(values) / nb_samples if nb_samples else 0.0
+
+        def share(values: list[float], threshold: float) -> float:
+            return avg([1.0 if value >= threshold else 0.0 for value in values])
+
+        cpus = [sample.cpu for sample in samples]
+        cores = [sample.busiest_core for sample in samples]
+        softirqs = [sample.softirq for sample in samples]
+        memories = [sample.memory for sample in samples]
+        return cls(
+            nb_samples=nb_samples,
+            cpu_avg=avg(cpus),
+            busiest_core_avg=avg(cores),
+            softirq_max=max(softirqs, default=0.0),
+            memory_max=max(memories, default=0.0),
+            rss_max=max((sample.rss for sample in samples), default=0),
+            rx_rate_avg=avg([sample.rx_rate for sample in samples]),
+            tx_rate_avg=avg([sample.tx_rate for sample in samples]),
+            drops=sum(sample.drops for sample in samples),
+            cpu_share=share(cpus, CPU_THRESHOLD),
+            core_share=share(cores, CORE_THRESHOLD),
+            softirq_share=share(softirqs, SOFTIRQ_THRESHOLD),
+            memory_share=share(memories, MEMORY_THRESHOLD),
+        )
+
+    @property
+    def reasons(self) -> list[str]:
+        """why the host was the bottleneck (empty if it was not)"""
+        reasons = [
+            f"{name} ≥{threshold:.0%} {share:.0%} of the time"
+            for name, threshold, share in (
+                ("CPU", CPU_THRESHOLD, self.cpu_share),
+                ("busiest core", CORE_THRESHOLD, self.core_share),
+                ("softirq", SOFTIRQ_THRESHOLD, self.softirq_share),
+                ("memory", MEMORY_THRESHOLD, self.memory_share),
+            )
+            if share >= SATURATED_SHARE
+        ]
+        if self.drops:
+            reasons.append(f"{self.drops} packets dropped")
+        return reasons
+
+    @property
+    def saturated(self) -> bool:
+        return bool(self.reasons)
+
+    @property
+    def verdict(self) -> str:
+        if not self.nb_samples:
+            return "Host saturation unknown (no samples)"
+        if self.saturated:
+            return (
+                f"Host saturated ({', '.join(self.reasons)}): results are bound "
+                "by the test host, not the target"
+            )
+        return "Host not saturated"
+
+
+class HostSampler(PeriodicSampler[HostSample]):
+    """Samples the test host's resources for the lifetime of a run
+
+    CPU (per core, softirq included), memory and ifnames' counters from /proc,
+    plus the resident memory of the load generator's process tree (`pid`,
+    set once started). Usage is computed between consecutive samples."""
+
+    name: str = "host"
+
+    def __init__(
+        self,
+        ifnames: list[str],
+        interval: float,
+        capacity: int = DEFAULT_CAPACITY,
+        proc_root: Path = PROC_ROOT,
+    ):
+        super().__init__(interval=interval, capacity=capacity)
+        self.ifnames = ifnames
+        self.proc_root = proc_root
+        self.pid: int | None = None
+        self.previous: (
+            tuple[float, dict[str, CPUTimes], dict[str, NetDevCounters]] | None
+        ) = None
+
+    def get_rss(self) -> int:
+        if self.pid is None:
+            return 0
+        return sum(
+            read_rss(pid, self.proc_root)
+            for pid in get_process_tree(self.pid, self.proc_root)
+        )
+
+    def sample(self):
+        now = time.time()
+        cpus = read_cpu_times(self.proc_root)
+        counters = read_net_dev(self.proc_root)
+        previous, self.previous = self.previous, (now, cpus, counters)
+        if previous is None:
+            return
+        previous_on, previous_cpus, previous_counters = previous
+
+        usages: dict[str, tuple[float, float]] = {}
+        for name, times in cpus.items():
+            before = previous_cpus.get(name)
+            if before is None:
+                continue
+            total = times.total - before.total
+            usages[name] = (
+                ratio(times.busy - before.busy, total),
+                ratio(times.softirq - before.softirq, total),
+            )
+        cores = [usage for name, usage in usages.items() if name != "cpu"]
+
+        rx_bytes = tx_bytes = drops = 0
+        for ifname in self.ifnames:
+            current, before = counters.get(ifname), previous_counters.get(ifname)
+            if current is None or before is None:
+                continue
+            rx_bytes += current.rx_bytes - before.rx_bytes
+            tx_bytes += current.tx_bytes - before.tx_bytes
+            drops += current.rx_drop - before.rx_drop + current.tx_drop - before.tx_drop
+
+        memory = read_meminfo(self.proc_root)
+        duration = (now - previous_on) or self.interval
+        self.record(
+            HostSample(
+                on=now,
+                cpu=usages.get("cpu", (0.0, 0.0))[0],
+                busiest_core=max((usage[0] for usage in cores), default=0.0),
+                softirq=max((usage[1] for usage in cores), default=0.0),
+                memory=ratio(
+                    memory.get("MemTotal", 0) - memory.get("MemAvailable", 0),
+                    memory.get("MemTotal", 0),
+                ),
+                rss=self.get_rss(),
+                rx_rate=rx_bytes / duration,
+                tx_rate=tx_bytes / duration,
+                drops=drops,
+            )
+        )
+
+    def summary(
+        self, start: float | None = None, end: float | None = None
+    ) -> HostSummary:
+        return HostSummary.of(self.samples(start=start, end=end))
@@ -1,24 +1,48 @@
 import socket
+import threading
+import time
+from dataclasses import dataclass, field
 from http import HTTPStatus
 from ipaddress import IPv4Address
+from typing import Any
 
 # from urllib3 import PoolManager
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 from urllib3.contrib.resolver.protocols import BaseResolver, ProtocolResolver
 from urllib3.poolmanager import PoolManager
+from urllib3.response import HTTPResponse
 
-from testbench.utils.dns import get_dns_answer_for
+from testbench.context import Context
+from testbench.utils.dns import DNSCache, resolve
+from testbench.utils.icmp import SO_BINDTODEVICE
 from testbench.utils.wlan import WirelessDevice
 
 DEFAULT_TIMEOUT = 5
+# body bytes read looking for a marker before giving up
+DEFAULT_MAX_BYTES: int = 512 * 1024
+CHUNK_SIZE: int = 8 * 1024
+# rest of a body read (and discarded) once done with it, to keep its connection
+DRAIN_MAX_BYTES: int = 64 * 1024
+# urllib3's default (TCP_NODELAY)
+DEFAULT_SOCKET_OPTIONS: list[tuple[int, int, int | bytes, str]] = [
+    (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1, "tcp")
+]
 
 
 class DeviceResolver(BaseResolver):
     protocol = ProtocolResolver.MANUAL
 
-    def __init__(self, device: WirelessDevice, dns_server: IPv4Address):
+    def __init__(
+        self,
+        device: WirelessDevice,
+        dns_server: IPv4Address,
+        cache: DNSCache | None = None,
+    ):
         super().__init__(server=str(dns_server), port=None)
         self.device = device
         self.dns_server = dns_server
+        self.cache = cache
 
     def getaddrinfo(
         self,
@@ -51,14 +75,19 @@ class DeviceResolver(BaseResolver):
         if family == socket.AF_INET6:
             raise socket.gaierror("Address family for hostname not supported")
 
-        dest_address: IPv4Address | None = get_dns_answer_for(
-            source_addr=(
-                self.device.ip4.address if self.device.ip4 else IPv4Address("1.1.1.1")
-            ),
-            server=self.dns_server,
-            domain=host.decode("utf-8") if isinstance(host, bytes) else str(host),
-        )
-        host_addr: str = str(dest_address)
+        domain = host.decode("utf-8") if isinstance(host, bytes) else str(host)
+        try:
+            # no query for IP literals
+            host_addr = str(IPv4Address(domain))
+        except ValueError:
+            answer = (self.cache.resolve if self.cache else resolve)(
+                domain,
+                server=self.dns_server,
+                source=self.device.ip4.address if self.device.ip4 else None,
+            )
+            if not answer.address:
+                raise socket.gaierror(f"Unable to resolve {domain}: {answer}") from None
+            host_addr = str(answer.address)
         return [
             (
                 socket.AF_INET,
@@ -76,13 +105,338 @@ class DeviceResolver(BaseResolver):
         return True
 
 
-def get_session_for(device: WirelessDevice, dns_server: IPv4Address) -> PoolManager:
-    return PoolManager(resolver=DeviceResolver(device=device, dns_server=dns_server))
+@dataclass(kw_only=True)
+class PoolStats:
+    """connections usage of a device's pools"""
+
+    nb_opened: int = 0
+    # requests sent over an already used connection (keep-alive)
+    nb_reused: int = 0
+    # closed before the session was (idle timeout, server close, errors)
+    nb_dropped: int = 0
+    nb_requests: int = 0
+    # session is being closed: closed connections are not dropped ones
+    closing: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def incr(self, **counters: int):
+        with self.lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def __iadd__(self, other: "PoolStats") -> "PoolStats":
+        self.incr(
+            nb_opened=other.nb_opened,
+            nb_reused=other.nb_reused,
+            nb_dropped=other.nb_dropped,
+            nb_requests=other.nb_requests,
+        )
+        return self
+
+
+class TrackedConnectionMixin:
+    """Records its usage into the PoolStats passed by the pool"""
+
+    def __init__(self, *args: Any, stats: PoolStats, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.stats = stats
+        self.nb_served: int = 0
+
+    def connect(self) -> None:
+        super().connect()  # pyright: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+        self.nb_served = 0
+        self.stats.incr(nb_opened=1)
+
+    def request(self, *args: Any, **kwargs: Any) -> Any:
+        self.stats.incr(nb_requests=1, nb_reused=1 if self.nb_served else 0)
+        self.nb_served += 1
+        return super().request(  # pyright: ignore[reportAttributeAccessIssue, reportUnknownMemberType, reportUnknownVariableType]
+            *args, **kwargs
+        )
+
+    def close(self) -> None:
+        if self.nb_served and not self.stats.closing:
+            self.stats.incr(nb_dropped=1)
+        self.nb_served = 0
+        super().close()  # pyright: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+
+    def discard(self) -> None:
+        """close on purpose (response left unread): not a dropped connection"""
+        self.nb_served = 0
+        self.close()
+
+
+class TrackedHTTPConnection(TrackedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TrackedHTTPSConnection(TrackedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TrackedPoolManager(PoolManager):
+    """PoolManager which pools' connections record into stats"""
+
+    def __init__(self, *args: Any, stats: PoolStats, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.stats = stats
+
+    def _new_pool(
+        self,
+        scheme: str,
+        host: str,
+        port: int,
+        request_context: dict[str, Any] | None = None,
+    ) -> HTTPConnectionPool:
+        pool = super()._new_pool(scheme, host, port, request_context)
+        pool.ConnectionCls = (  # pyright: ignore[reportAttributeAccessIssue]
+            TrackedHTTPSConnection
+            if isinstance(pool, HTTPSConnectionPool)
+            else TrackedHTTPConnection
+        )
+        # passed to every new connection
+        pool.conn_kw["stats"] = self.stats
+        return pool
+
+
+# ifname, DNS server and whether DNS cache is used
+SessionKey = tuple[str, IPv4Address, bool]
+
+
+class DeviceSession:
+    """Warm HTTP pools of a device, kept for the life of a run
+
+    Every connection is bound to the device's address and interface so its
+    traffic can't leave through another device (whatever the routing table)"""
+
+    # per device, DNS server and cache use (see get_session_for())
+    _instances: "dict[SessionKey, DeviceSession]" = {}  # noqa: RUF012
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        device: WirelessDevice,
+        dns_server: IPv4Address,
+        cache: DNSCache | None = None,
+        *,
+        bind_to_device: bool = True,
+    ):
+        self.device = device
+        self.source = device.ip4.address if device.ip4 else None
+        self.stats = PoolStats()
+        socket_options = list(DEFAULT_SOCKET_OPTIONS)
+        if bind_to_device:
+            socket_options.append(
+                (socket.SOL_SOCKET, SO_BINDTODEVICE, device.ifname.encode(), "tcp")
+            )
+        self.manager = TrackedPoolManager(
+            resolver=DeviceResolver(device=device, dns_server=dns_server, cache=cache),
+            source_address=(str(self.source), 0) if self.source else None,
+            socket_options=socket_options,
+            stats=self.stats,
+        )
+
+    @classmethod
+    def get(
+        cls, device: WirelessDevice, dns_server: IPv4Address, *, cached: bool = True
+    ) -> "DeviceSession":
+        """device's session, renewed should its address have changed"""
+        key = (device.ifname, dns_server, cached)
+        source = device.ip4.address if device.ip4 else None
+        with cls._lock:
+            session = cls._instances.get(key)
+            if session and session.source != source:
+                session.close()
+                session = None
+            if not session:
+                cache = (
+                    DNSCache.get(device.ifname)
+                    if cached and not Context.get().bypass_dns_cache
+                    else None
+                )
+                session = cls._instances[key] = cls(
+                    device=device, dns_server=dns_server, cache=cache
+                )
+            return session
+
+    @classmethod
+    def close_all(cls):
+        with cls._lock:
+            sessions = list(cls._instances.values())
+            cls._instances.clear()
+        for session in sessions:
+            session.close()
+
+    @classmethod
+    def get_totals(cls) -> PoolStats:
+        """stats of all current sessions"""
+        with cls._lock:
+            sessions = list(cls._instances.values())
+        totals = PoolStats()
+        for session in sessions:
+            totals += session.stats
+        return totals
+
+    def close(self):
+        """close all pools and their connections (not counted as dropped)"""
+        self.stats.closing = True
+        self.manager.clear()
+
+
+def get_session_for(
+    device: WirelessDevice, dns_server: IPv4Address, *, cached: bool = True
+) -> PoolManager:
+    """device's persistent session resolving via dns_server
+
+    using device's DNS cache unless bypassed"""
+    return DeviceSession.get(device, dns_server, cached=cached).manager
+
+
+class StreamMatcher:
+    """Searches marker in a body fed chunk by chunk
+
+    Keeps the last len(marker) - 1 bytes so a marker spanning two chunks
+    is found, without ever holding the whole body"""
+
+    def __init__(self, marker: bytes):
+        if not marker:
+            raise ValueError("Empty marker")
+        self.marker = marker
+        self.tail = b""
+        self.nb_fed: int = 0
+        # offset of the marker's end in the body, once found
+        self.end: int | None = None
+
+    @property
+    def found(self) -> bool:
+        return self.end is not None
+
+    def feed(self, chunk: bytes) -> bool:
+        """whether marker has been found (with this chunk or before)"""
+        if self.end is not None:
+            return True
+        window = self.tail + chunk
+        index = window.find(self.marker)
+        window_start = self.nb_fed - len(self.tail)
+        self.nb_fed += len(chunk)
+        if index >= 0:
+            self.end = window_start + index + len(self.marker)
+            return True
+        self.tail = window[-(len(self.marker) - 1) :] if len(self.marker) > 1 else b""
+        return False
+
+
+@dataclass(kw_only=True)
+class URLMatch:
+    """outcome of looking for a marker in a URL's body"""
+
+    url: str
+    marker: str
+    status: int = 0
+    found: bool = False
+    # time to first byte (response headers), in milliseconds
+    ttfb: float = 0.0
+    # body bytes read, and those needed to find the marker
+    nb_read: int = 0
+    nb_needed: int | None = None
+    # stopped reading at the byte cap
+    capped: bool = False
+    error: str = ""
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status == HTTPStatus.OK and self.found
+
+    def __str__(self) -> str:
+        if self.error:
+            return self.error
+        if self.found:
+            return (
+                f"HTTP {self.status}, found after {self.nb_needed} bytes "
+                f"(TTFB {self.ttfb:.1f} ms)"
+            )
+        return (
+            f"HTTP {self.status}, not found in {self.nb_read} bytes"
+            f"{' (capped)' if self.capped else ''} (TTFB {self.ttfb:.1f} ms)"
+        )
+
+
+def drain(resp: HTTPResponse, max_bytes: int, chunk_size: int) -> bool:
+    """read and discard the rest of resp's body, if no more than max_bytes
+
+    Whether the body is complete, and its connection reusable"""
+    length = resp.headers.get("Content-Length", "")
+    if length.isdigit() and int(length) - resp.tell() > max_bytes:
+        return False
+    nb_read = 0
+    while nb_read <= max_bytes:
+        chunk = resp.read(chunk_size)
+        if not chunk:
+            return True
+        nb_read += len(chunk)
+    return False
+
+
+def match_url(
+    device: WirelessDevice,
+    dns_server: IPv4Address,
+    url: str,
+    marker: str,
+    *,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    chunk_size: int = CHUNK_SIZE,
+) -> URLMatch:
+    """look for marker in url's body, reading no more than needed
+
+    The body is streamed and reading stops once marker is found or max_bytes
+    read. The connection goes back to the pool if the body was complete or its
+    rest small enough to be drained, it is closed otherwise"""
+    match = URLMatch(url=url, marker=marker)
+    session = get_session_for(device=device, dns_server=dns_server)
+    start = time.perf_counter()
+    try:
+        resp = session.request(
+            "GET",
+            url=url,
+            timeout=DEFAULT_TIMEOUT,
+            redirect=False,
+            preload_content=False,
+        )
+    except Exception as exc:
+        match.error = str(exc) or type(exc).__name__
+        return match
+    match.ttfb = (time.perf_counter() - start) * 1000
+    match.status = resp.status
+    matcher = StreamMatcher(marker.encode("utf-8"))
+    complete = drained = False
+    try:
+        while not matcher.found and matcher.nb_fed < max_bytes:
+            chunk = resp.read(min(chunk_size, max_bytes - matcher.nb_fed))
+            if not chunk:
+                complete = True
+                break
+            matcher.feed(chunk)
+        drained = not complete and drain(resp, DRAIN_MAX_BYTES, chunk_size)
+    except Exception as exc:
+        match.error = str(exc) or type(exc).__name__
+    finally:
+        if complete or drained:
+            resp.release_conn()
+        else:
+            # unread body would be served to the next request otherwise
+            if not match.error and isinstance(resp.connection, TrackedConnectionMixin):
+                resp.connection.discard()
+            resp.close()
+    match.found = matcher.found
+    match.nb_read = matcher.nb_fed
+    match.nb_needed = matcher.end
+    match.capped = not matcher.found and not complete and not match.error
+    return match
 
 
 def assert_url_contains(
     device: WirelessDevice, dns_server: IPv4Address, url: str, title: str
 ) -> bool:
-    session = get_session_for(device=device, dns_server=dns_server)
-    resp = session.request("GET", url=url, timeout=DEFAULT_TIMEOUT, redirect=False)
-    return resp.status == HTTPStatus.OK and title in resp.data.decode("utf-8")
+    return match_url(
+        device=device, dns_server=dns_server, url=url, marker=title
+    ).succeeded
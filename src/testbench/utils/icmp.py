@@ -0,0 +1,210 @@
+import asyncio
+import random
+import socket
+import struct
+import time
+from dataclasses import dataclass, field
+
+from testbench.utils.aio import BackgroundLoop
+from testbench.utils.stats import Distribution
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+# type, code, checksum, identifier, sequence
+ICMP_HEADER = struct.Struct("!BBHHH")
+SO_BINDTODEVICE: int = getattr(socket, "SO_BINDTODEVICE", 25)
+
+DEFAULT_COUNT: int = 4
+DEFAULT_INTERVAL: float = 0.2
+DEFAULT_TIMEOUT: float = 2.0
+PAYLOAD_SIZE: int = 56
+ICMP_UNAVAILABLE: str = "Unable to open ICMP socket"
+
+
+def checksum(data: bytes) -> int:
+    """RFC1071 internet checksum"""
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo_request(ident: int, seq: int, payload: bytes) -> bytes:
+    header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    return (
+        ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, checksum(header + payload), ident, seq)
+        + payload
+    )
+
+
+def parse_echo_reply(data: bytes, *, raw: bool) -> tuple[int, int] | None:
+    """(identifier, sequence) of an echo reply. raw sockets include the IP header"""
+    if raw:
+        data = data[(data[0] & 0x0F) * 4 :]
+    if len(data) < ICMP_HEADER.size:
+        return None
+    icmp_type, _, _, ident, seq = ICMP_HEADER.unpack_from(data)
+    if icmp_type != ICMP_ECHO_REPLY:
+        return None
+    return ident, seq
+
+
+def open_icmp_socket(ifname: str | None) -> tuple[socket.socket, bool]:
+    """non-blocking ICMP socket bound to ifname and whether it is a raw one
+
+    Uses datagram ICMP sockets (no IP header, kernel-filtered replies),
+    falling back to raw sockets if net.ipv4.ping_group_range forbids those"""
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        raw = False
+    except PermissionError:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+        raw = True
+    try:
+        if ifname:
+            sock.setsockopt(socket.SOL_SOCKET, SO_BINDTODEVICE, ifname.encode())
+        sock.setblocking(False)
+    except OSError:
+        sock.close()
+        raise
+    return sock, raw
+
+
+@dataclass(kw_only=True)
+class PingStats:
+    ifname: str | None
+    host: str
+    nb_sent: int = 0
+    # round-trip times of received replies, in milliseconds
+    rtts: list[float] = field(default_factory=list[float])
+    error: str = ""
+
+    @property
+    def nb_received(self) -> int:
+        return len(self.rtts)
+
+    @property
+    def loss(self) -> float:
+        if not self.nb_sent:
+            return 1.0
+        return 1 - self.nb_received / self.nb_sent
+
+    @property
+    def succeeded(self) -> bool:
+        return self.nb_received > 0
+
+    @property
+    def rtt(self) -> Distribution:
+        return Distribution.of(self.rtts)
+
+    def __str__(self) -> str:
+        if self.error:
+            return self.error
+        rtt = self.rtt
+        return (
+            f"{self.nb_received}/{self.nb_sent} received, {self.loss:.0%} loss, "
+            f"rtt min/avg/p95/max = {rtt.min:.1f}/{rtt.avg:.1f}/"
+            f"{rtt.p95:.1f}/{rtt.max:.1f} ms"
+        )
+
+
+async def probe(
+    host: str,
+    ifname: str | None = None,
+    *,
+    count: int = DEFAULT_COUNT,
+    interval: float = DEFAULT_INTERVAL,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> PingStats:
+    """send count echo requests to host via ifname, every interval seconds
+
+    Replies are awaited up to timeout seconds after the last request"""
+    stats = PingStats(ifname=ifname, host=host)
+    loop = asyncio.get_running_loop()
+    try:
+        sock, raw = open_icmp_socket(ifname)
+    except OSError as exc:
+        stats.error = f"{ICMP_UNAVAILABLE}: {exc}"
+        return stats
+
+    # datagram sockets have their identifier rewritten (and filtered) by kernel
+    ident = random.getrandbits(16)
+    payload = bytes(PAYLOAD_SIZE)
+    sent_at: dict[int, float] = {}
+
+    async def receive():
+        while stats.nb_received < count:
+            data = await loop.sock_recv(sock, 2048)
+            received_at = time.perf_counter()
+            reply = parse_echo_reply(data, raw=raw)
+            if not reply or (raw and reply[0] != ident):
+                continue
+            sent = sent_at.pop(reply[1], None)
+            if sent is not None:
+                stats.rtts.append((received_at - sent) * 1000)
+
+    receiver = asyncio.create_task(receive())
+    try:
+        for seq in range(count):
+            if seq:
+                await asyncio.sleep(interval)
+            sent_at[seq] = time.perf_counter()
+            await loop.sock_sendto(
+                sock, build_echo_request(ident, seq, payload), (host, 0)
+            )
+            stats.nb_sent += 1
+        await asyncio.wait_for(receiver, timeout=timeout)
+    except TimeoutError:
+        pass
+    except OSError as exc:
+        stats.error = str(exc)
+    finally:
+        receiver.cancel()
+        sock.close()
+    return stats
+
+
+async def probe_all(
+    targets: dict[str, str],
+    *,
+    count: int = DEFAULT_COUNT,
+    interval: float = DEFAULT_INTERVAL,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> dict[str, PingStats]:
+    """probe all {ifname: host} targets concurrently"""
+    results = await asyncio.gather(
+        *[
+            probe(host, ifname, count=count, interval=interval, timeout=timeout)
+            for ifname, host in targets.items()
+        ]
+    )
+    return {stats.ifname or "": stats for stats in results}
+
+
+def ping(
+    host: str,
+    ifname: str | None = None,
+    *,
+    count: int = DEFAULT_COUNT,
+    interval: float = DEFAULT_INTERVAL,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> PingStats:
+    """probe host from any thread, using the shared event loop"""
+    return BackgroundLoop.get().run(
+        probe(host, ifname, count=count, interval=interval, timeout=timeout)
+    )
+
+
+def ping_all(
+    targets: dict[str, str],
+    *,
+    count: int = DEFAULT_COUNT,
+    interval: float = DEFAULT_INTERVAL,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> dict[str, PingStats]:
+    """probe all {ifname: host} targets at once, using the shared event loop"""
+    return BackgroundLoop.get().run(
+        probe_all(targets, count=count, interval=interval, timeout=timeout)
+    )
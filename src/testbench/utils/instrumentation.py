@@ -0,0 +1,180 @@
+import datetime
+import subprocess
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, cast
+
+from testbench.utils.stats import Distribution
+
+# upper bounds (seconds) of the duration histogram buckets
+HISTOGRAM_BOUNDS: list[float] = [0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+NMCLI_VERBS = (
+    "connect",
+    "disconnect",
+    "show",
+    "delete",
+    "up",
+    "down",
+    "add",
+    "modify",
+    "reapply",
+    "rescan",
+    "list",
+    "status",
+)
+
+
+def classify(args: list[str]) -> tuple[str, str | None]:
+    """(kind, ifname) of a command line. ie: ("nmcli connect", "wlan3")"""
+    args = [str(arg) for arg in args]
+    if args and args[0] == "sudo":
+        args = args[1:]
+    if not args:
+        return "", None
+    program = Path(args[0]).name
+    ifname: str | None = None
+    if "ifname" in args[:-1]:
+        ifname = args[args.index("ifname") + 1]
+    if program == "nmcli":
+        words = [arg for arg in args[1:] if arg in NMCLI_VERBS]
+        verb = words[-1] if words else "other"
+        # nmcli device show|disconnect <ifname>
+        if ifname is None and "device" in args and verb in args:
+            position = args.index(verb) + 1
+            ifname = args[position] if position < len(args) else None
+        return f"nmcli {verb}", ifname
+    return program, ifname
+
+
+@dataclass(kw_only=True)
+class CommandSample:
+    kind: str
+    ifname: str | None
+    started_on: datetime.datetime
+    duration: float = 0.0
+    returncode: int = -1
+    # number of external commands running when this one was launched (incl. it)
+    concurrency: int = 1
+
+
+@dataclass(kw_only=True)
+class CommandStats:
+    kind: str
+    durations: list[float] = field(default_factory=list[float])
+    nb_failed: int = 0
+    max_concurrency: int = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.durations)
+
+    @property
+    def total(self) -> float:
+        return sum(self.durations)
+
+    @property
+    def distribution(self) -> Distribution:
+        return Distribution.of(self.durations)
+
+    @property
+    def histogram(self) -> list[int]:
+        """number of commands per HISTOGRAM_BOUNDS bucket (plus one for above)"""
+        buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        for duration in self.durations:
+            index = next(
+                (idx for idx, bound in enumerate(HISTOGRAM_BOUNDS) if duration < bound),
+                len(HISTOGRAM_BOUNDS),
+            )
+            buckets[index] += 1
+        return buckets
+
+
+class CommandRecorder:
+    """Records every external command launched by the testbench (opt-in)
+
+    Tells how much of a run's wall-clock time is spent in external processes"""
+
+    # singleton instance, only set once enabled
+    _instance: "CommandRecorder | None" = None
+
+    def __init__(self) -> None:
+        self.run_id: str = uuid.uuid4().hex
+        self.started_on = datetime.datetime.now(datetime.UTC)
+        self.lock = threading.Lock()
+        self.in_flight: int = 0
+        self.samples: list[CommandSample] = []
+
+    @classmethod
+    def enable(cls) -> "CommandRecorder":
+        if not cls._instance:
+            cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def get(cls) -> "CommandRecorder | None":
+        return cls._instance
+
+    @contextmanager
+    def track(self, args: list[str]) -> Iterator[CommandSample]:
+        kind, ifname = classify(args)
+        with self.lock:
+            self.in_flight += 1
+            concurrency = self.in_flight
+        sample = CommandSample(
+            kind=kind,
+            ifname=ifname,
+            started_on=datetime.datetime.now(datetime.UTC),
+            concurrency=concurrency,
+        )
+        start = time.perf_counter()
+        try:
+            yield sample
+        finally:
+            sample.duration = time.perf_counter() - start
+            with self.lock:
+                self.in_flight -= 1
+                self.samples.append(sample)
+
+    def get_stats(self) -> dict[str, CommandStats]:
+        stats: dict[str, CommandStats] = {}
+        with self.lock:
+            samples = list(self.samples)
+        for sample in samples:
+            entry = stats.setdefault(sample.kind, CommandStats(kind=sample.kind))
+            entry.durations.append(sample.duration)
+            entry.nb_failed += 1 if sample.returncode != 0 else 0
+            entry.max_concurrency = max(entry.max_concurrency, sample.concurrency)
+        return dict(sorted(stats.items(), key=lambda item: -item[1].total))
+
+
+@contextmanager
+def tracked(args: list[str]) -> Iterator[CommandSample]:
+    """track command if instrumentation is enabled. Set returncode on sample"""
+    recorder = CommandRecorder.get()
+    if recorder is None:
+        yield CommandSample(
+            kind="", ifname=None, started_on=datetime.datetime.now(datetime.UTC)
+        )
+        return
+    with recorder.track(args) as sample:
+        yield sample
+
+
+def tracked_run(args: list[str], **kwargs: Any) -> "subprocess.CompletedProcess[Any]":
+    """subprocess.run replacement for libraries accepting one (nmcli)"""
+    with tracked(args) as sample:
+        try:
+            ps = cast(
+                "subprocess.CompletedProcess[Any]",
+                subprocess.run(args, **kwargs),  # noqa: PLW1510
+            )
+        except subprocess.CalledProcessError as exc:
+            sample.returncode = exc.returncode
+            raise
+        sample.returncode = ps.returncode
+        return ps
@@ -0,0 +1,183 @@
+import errno
+import select
+import socket
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+
+from testbench.context import Context
+from testbench.utils.netlink import (
+    RTMGRP_IPV4_IFADDR,
+    AddressEvent,
+    iter_messages,
+    open_rtnetlink,
+)
+from testbench.utils.wlan import IP4Link, WirelessDevice
+
+logger = Context.logger
+
+# how long the watcher blocks on its source before checking for stop
+READ_TIMEOUT: float = 0.5
+
+
+class LinkEventSource(ABC):
+    """Provider of IPv4 address events for the host's interfaces"""
+
+    @abstractmethod
+    def open(self) -> None:
+        """subscribe to events. Raises OSError if unavailable"""
+
+    @abstractmethod
+    def read(self, timeout: float) -> list[AddressEvent]:
+        """events received within timeout seconds (possibly none)
+
+        Raises OverflowError if events were lost and state must be resynced"""
+
+    def close(self) -> None: ...
+
+
+class NetlinkEventSource(LinkEventSource):
+    """rtnetlink RTM_NEWADDR/RTM_DELADDR multicast subscription"""
+
+    def __init__(self) -> None:
+        self.sock: socket.socket | None = None
+
+    def open(self) -> None:
+        self.sock = open_rtnetlink(RTMGRP_IPV4_IFADDR)
+        self.sock.setblocking(False)
+
+    def read(self, timeout: float) -> list[AddressEvent]:
+        if not self.sock:
+            raise OSError("Source not opened")
+        ready, _, _ = select.select([self.sock], [], [], timeout)
+        events: list[AddressEvent] = []
+        if not ready:
+            return events
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError as exc:
+                if exc.errno == errno.ENOBUFS:
+                    raise OverflowError("Netlink receive buffer overrun") from exc
+                raise
+            for msg_type, payload in iter_messages(data):
+                if event := AddressEvent.parse(msg_type, payload):
+                    events.append(event)
+        return events
+
+    def close(self) -> None:
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+
+def refresh_device(device: WirelessDevice) -> None:
+    """complete link (gateway, DNS) from NetworkManager once address is set"""
+    device.refresh()
+
+
+class DeviceStateWatcher:
+    """Keeps WirelessDevice's IPv4 link updated in place from address events
+
+    Replaces polling nmcli while waiting for DHCP leases: waiters are woken
+    up as soon as the address event is received.
+    `complete` is called on every address change to fill-in the parts of the link
+    that are not in the event (gateway, DNS). Defaults to a single nmcli show."""
+
+    def __init__(
+        self,
+        devices: list[WirelessDevice],
+        source: LinkEventSource | None = None,
+        complete: Callable[[WirelessDevice], None] | None = refresh_device,
+    ):
+        self.devices = {device.ifname: device for device in devices}
+        self.source = source or NetlinkEventSource()
+        self.complete = complete
+        self.condition = threading.Condition()
+        self.running: bool = False
+        self.thread: threading.Thread | None = None
+        self.nb_events: int = 0
+
+    def start(self) -> bool:
+        """start watching. False if event source is not available"""
+        try:
+            self.source.open()
+        except OSError as exc:
+            logger.warning(f"Link events unavailable, falling back to polling: {exc}")
+            return False
+        self.running = True
+        self.thread = threading.Thread(target=self.watch, name="linkwatch", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def watch(self):
+        try:
+            while self.running:
+                try:
+                    events = self.source.read(timeout=READ_TIMEOUT)
+                except OverflowError as exc:
+                    logger.warning(f"{exc}, resyncing devices")
+                    self.resync()
+                    continue
+                for event in events:
+                    self.apply(event)
+        except Exception as exc:
+            logger.error(f"Link watcher failed: {exc}")
+        finally:
+            self.running = False
+            self.source.close()
+            with self.condition:
+                self.condition.notify_all()
+
+    def apply(self, event: AddressEvent):
+        device = self.devices.get(event.ifname)
+        if device is None:
+            return
+        self.nb_events += 1
+        logger.debug(
+            f"{event.ifname}: {'+' if event.added else '-'}"
+            f"{event.address}/{event.prefixlen}"
+        )
+        if event.added:
+            self.complete_device(device)
+            if device.ip4 is None:
+                device.ip4 = IP4Link(
+                    address=event.address, gateway=None, route=None, dns=None
+                )
+            else:
+                device.ip4.address = event.address
+        elif device.ip4 and device.ip4.address == event.address:
+            device.ip4 = None
+        with self.condition:
+            self.condition.notify_all()
+
+    def complete_device(self, device: WirelessDevice):
+        if not self.complete:
+            return
+        try:
+            self.complete(device)
+        except Exception as exc:
+            logger.debug(f"Unable to complete {device.ifname} link: {exc}")
+
+    def resync(self):
+        """refresh all devices after events were lost"""
+        for device in self.devices.values():
+            self.complete_device(device)
+        with self.condition:
+            self.condition.notify_all()
+
+    def wait_for_ip4(self, device: WirelessDevice, timeout: float) -> bool:
+        """whether device got an IPv4 address within timeout seconds"""
+        with self.condition:
+            self.condition.wait_for(
+                lambda: device.ip4 is not None or not self.running, timeout=timeout
+            )
+        return device.ip4 is not None
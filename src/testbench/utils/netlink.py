@@ -0,0 +1,272 @@
+import socket
+import struct
+from collections.abc import Iterator
+from dataclasses import dataclass
+from ipaddress import IPv4Address
+
+# netlink message header: length, type, flags, sequence, port-id
+NLMSG_HEADER = struct.Struct("=LHHLL")
+# netlink attribute header: length, type
+NLA_HEADER = struct.Struct("=HH")
+# struct ifaddrmsg: family, prefixlen, flags, scope, index
+IFADDRMSG = struct.Struct("=BBBBI")
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTMGRP_IPV4_IFADDR = 0x10
+
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_LABEL = 3
+
+NLA_TYPE_MASK = 0x3FFF
+
+
+def align(length: int) -> int:
+    """netlink messages and attributes are 4-bytes aligned"""
+    return (length + 3) & ~3
+
+
+def iter_messages(data: bytes) -> Iterator[tuple[int, bytes]]:
+    """(type, payload) of each netlink message in a datagram"""
+    offset = 0
+    while offset + NLMSG_HEADER.size <= len(data):
+        length, msg_type, _, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+        if length < NLMSG_HEADER.size:
+            break
+        yield msg_type, data[offset + NLMSG_HEADER.size : offset + length]
+        offset += align(length)
+
+
+def iter_attributes(data: bytes) -> Iterator[tuple[int, bytes]]:
+    """(type, value) of each netlink attribute in a payload"""
+    offset = 0
+    while offset + NLA_HEADER.size <= len(data):
+        length, attr_type = NLA_HEADER.unpack_from(data, offset)
+        if length < NLA_HEADER.size:
+            break
+        yield attr_type & NLA_TYPE_MASK, data[
+            offset + NLA_HEADER.size : offset + length
+        ]
+        offset += align(length)
+
+
+def pack_attribute(attr_type: int, value: bytes) -> bytes:
+    length = NLA_HEADER.size + len(value)
+    return NLA_HEADER.pack(length, attr_type) + value + b"\0" * (align(length) - length)
+
+
+def pack_message(msg_type: int, payload: bytes, flags: int = 0, seq: int = 0) -> bytes:
+    return (
+        NLMSG_HEADER.pack(NLMSG_HEADER.size + len(payload), msg_type, flags, seq, 0)
+        + payload
+    )
+
+
+def decode_string(value: bytes) -> str:
+    return value.split(b"\0", 1)[0].decode("utf-8", errors="replace")
+
+
+@dataclass(kw_only=True)
+class AddressEvent:
+    """IPv4 address added to or removed from an interface (RTM_NEWADDR/DELADDR)"""
+
+    added: bool
+    ifname: str
+    address: IPv4Address
+    prefixlen: int
+
+    @classmethod
+    def parse(cls, msg_type: int, payload: bytes) -> "AddressEvent | None":
+        if msg_type not in (RTM_NEWADDR, RTM_DELADDR):
+            return None
+        family, prefixlen, _, _, index = IFADDRMSG.unpack_from(payload)
+        if family != socket.AF_INET:
+            return None
+        attrs = dict(iter_attributes(payload[IFADDRMSG.size :]))
+        raw_address = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+        if not raw_address:
+            return None
+        if IFA_LABEL in attrs:
+            ifname = decode_string(attrs[IFA_LABEL])
+        else:
+            try:
+                ifname = socket.if_indextoname(index)
+            except OSError:
+                return None
+        return cls(
+            added=msg_type == RTM_NEWADDR,
+            ifname=ifname,
+            address=IPv4Address(raw_address),
+            prefixlen=prefixlen,
+        )
+
+    def pack(self, index: int = 0) -> bytes:
+        """netlink message for this event (used to feed fake sources)"""
+        return pack_message(
+            RTM_NEWADDR if self.added else RTM_DELADDR,
+            IFADDRMSG.pack(socket.AF_INET, self.prefixlen, 0, 0, index)
+            + pack_attribute(IFA_LOCAL, self.address.packed)
+            + pack_attribute(IFA_LABEL, self.ifname.encode("utf-8") + b"\0"),
+        )
+
+
+def open_rtnetlink(groups: int) -> socket.socket:
+    """rtnetlink socket subscribed to multicast groups"""
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+    sock.bind((0, groups))
+    return sock
+
+
+NETLINK_GENERIC = 16
+NLM_F_REQUEST = 0x1
+NLM_F_ACK = 0x4
+NLM_F_DUMP = 0x300
+# struct genlmsghdr: cmd, version, reserved
+GENLMSGHDR = struct.Struct("=BBH")
+GENL_ID_CTRL = 0x10
+CTRL_CMD_GETFAMILY = 3
+CTRL_ATTR_FAMILY_ID = 1
+CTRL_ATTR_FAMILY_NAME = 2
+
+NL80211_CMD_GET_STATION = 17
+NL80211_ATTR_IFINDEX = 3
+NL80211_ATTR_STA_INFO = 21
+NL80211_STA_INFO_RX_PACKETS = 9
+NL80211_STA_INFO_TX_PACKETS = 10
+NL80211_STA_INFO_SIGNAL = 7
+NL80211_STA_INFO_TX_BITRATE = 8
+NL80211_STA_INFO_TX_RETRIES = 11
+NL80211_STA_INFO_TX_FAILED = 12
+NL80211_STA_INFO_RX_BITRATE = 14
+NL80211_RATE_INFO_BITRATE = 1
+NL80211_RATE_INFO_BITRATE32 = 5
+
+
+def decode_uint(value: bytes) -> int:
+    return int.from_bytes(value, "little")
+
+
+def decode_bitrate(value: bytes) -> float | None:
+    """rate info nested attribute to Mb/s (kernel reports in 100kb/s units)"""
+    rate = dict(iter_attributes(value))
+    if NL80211_RATE_INFO_BITRATE32 in rate:
+        return decode_uint(rate[NL80211_RATE_INFO_BITRATE32]) / 10
+    if NL80211_RATE_INFO_BITRATE in rate:
+        return decode_uint(rate[NL80211_RATE_INFO_BITRATE]) / 10
+    return None
+
+
+@dataclass(kw_only=True)
+class StationInfo:
+    """nl80211 station info (the AP, for a device in client mode)"""
+
+    signal: int | None = None  # dBm
+    tx_bitrate: float | None = None  # Mb/s
+    rx_bitrate: float | None = None  # Mb/s
+    tx_retries: int | None = None
+    tx_failed: int | None = None
+    tx_packets: int | None = None
+    rx_packets: int | None = None
+
+    @classmethod
+    def parse(cls, sta_info: bytes) -> "StationInfo":
+        attrs = dict(iter_attributes(sta_info))
+        info = cls()
+        if NL80211_STA_INFO_SIGNAL in attrs:
+            info.signal = int.from_bytes(
+                attrs[NL80211_STA_INFO_SIGNAL][:1], "little", signed=True
+            )
+        if NL80211_STA_INFO_TX_BITRATE in attrs:
+            info.tx_bitrate = decode_bitrate(attrs[NL80211_STA_INFO_TX_BITRATE])
+        if NL80211_STA_INFO_RX_BITRATE in attrs:
+            info.rx_bitrate = decode_bitrate(attrs[NL80211_STA_INFO_RX_BITRATE])
+        for key, attr in (
+            ("tx_retries", NL80211_STA_INFO_TX_RETRIES),
+            ("tx_failed", NL80211_STA_INFO_TX_FAILED),
+            ("tx_packets", NL80211_STA_INFO_TX_PACKETS),
+            ("rx_packets", NL80211_STA_INFO_RX_PACKETS),
+        ):
+            if attr in attrs:
+                setattr(info, key, decode_uint(attrs[attr]))
+        return info
+
+
+class NL80211:
+    """Minimal nl80211 generic netlink client (station dump only)"""
+
+    def __init__(self) -> None:
+        self.sock: socket.socket | None = None
+        self.family_id: int = 0
+        self.seq: int = 0
+
+    def open(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_GENERIC)
+        self.sock.bind((0, 0))
+        replies = self.request(
+            GENL_ID_CTRL,
+            CTRL_CMD_GETFAMILY,
+            pack_attribute(CTRL_ATTR_FAMILY_NAME, b"nl80211\0"),
+        )
+        for payload in replies:
+            attrs = dict(iter_attributes(payload[GENLMSGHDR.size :]))
+            if CTRL_ATTR_FAMILY_ID in attrs:
+                self.family_id = decode_uint(attrs[CTRL_ATTR_FAMILY_ID])
+        if not self.family_id:
+            raise OSError("nl80211 family not found")
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def request(
+        self, family: int, command: int, attributes: bytes, *, dump: bool = False
+    ) -> list[bytes]:
+        """payloads of all replies to a generic netlink request"""
+        if not self.sock:
+            raise OSError("nl80211 socket not opened")
+        self.seq += 1
+        # dumps end with NLMSG_DONE, other requests with an ACK
+        flags = NLM_F_REQUEST | (NLM_F_DUMP if dump else NLM_F_ACK)
+        self.sock.send(
+            pack_message(
+                family,
+                GENLMSGHDR.pack(command, 1, 0) + attributes,
+                flags=flags,
+                seq=self.seq,
+            )
+        )
+        payloads: list[bytes] = []
+        while True:
+            data = self.sock.recv(65536)
+            for msg_type, payload in iter_messages(data):
+                if msg_type == NLMSG_DONE:
+                    return payloads
+                if msg_type == NLMSG_ERROR:
+                    error = int.from_bytes(payload[:4], "little", signed=True)
+                    if error:
+                        raise OSError(-error, f"netlink error {-error}")
+                    # ACK of a non-dump request
+                    return payloads
+                payloads.append(payload)
+
+    def get_station(self, ifname: str) -> StationInfo | None:
+        """station info of first station on ifname (the AP in client mode)"""
+        payloads = self.request(
+            self.family_id,
+            NL80211_CMD_GET_STATION,
+            pack_attribute(
+                NL80211_ATTR_IFINDEX,
+                socket.if_nametoindex(ifname).to_bytes(4, "little"),
+            ),
+            dump=True,
+        )
+        for payload in payloads:
+            attrs = dict(iter_attributes(payload[GENLMSGHDR.size :]))
+            if NL80211_ATTR_STA_INFO in attrs:
+                return StationInfo.parse(attrs[NL80211_ATTR_STA_INFO])
+        return None
@@ -0,0 +1,189 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+PROC_ROOT: Path = Path("/proc")
+
+
+def parse_number(value: str) -> float:
+    """/proc/net/wireless values may carry a trailing dot (updated flag)"""
+    return float(value.rstrip("."))
+
+
+@dataclass(kw_only=True)
+class WirelessStats:
+    """/proc/net/wireless entry for an interface"""
+
+    link: float
+    level: float  # dBm
+    noise: float  # dBm
+    discarded_retry: int
+    discarded_misc: int
+    missed_beacon: int
+
+
+def read_wireless(proc_root: Path = PROC_ROOT) -> dict[str, WirelessStats]:
+    """all interfaces' wireless stats from a single read of /proc/net/wireless"""
+    stats: dict[str, WirelessStats] = {}
+    try:
+        lines = proc_root.joinpath("net/wireless").read_text().splitlines()
+    except OSError:
+        return stats
+    # Inter-| sta-|   Quality        |   Discarded packets               | Missed
+    #  face | tus | link level noise |  nwid  crypt   frag  retry   misc | beacon
+    for line in lines[2:]:
+        if ":" not in line:
+            continue
+        ifname, values = line.split(":", 1)
+        fields = values.split()
+        if len(fields) < 10:  # noqa: PLR2004
+            continue
+        stats[ifname.strip()] = WirelessStats(
+            link=parse_number(fields[1]),
+            level=parse_number(fields[2]),
+            noise=parse_number(fields[3]),
+            discarded_retry=int(fields[7]),
+            discarded_misc=int(fields[8]),
+            missed_beacon=int(fields[9]),
+        )
+    return stats
+
+
+def get_parent_pids(proc_root: Path = PROC_ROOT) -> dict[int, int]:
+    """parent PID of every running process (pid: ppid)"""
+    parents: dict[int, int] = {}
+    for entry in proc_root.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = entry.joinpath("stat").read_text()
+        except OSError:
+            # process exited meanwhile
+            continue
+        # pid (comm) state ppid …, comm may contain spaces and parenthesis
+        parents[int(entry.name)] = int(stat.rsplit(")", 1)[1].split()[1])
+    return parents
+
+
+def get_process_tree(pid: int, proc_root: Path = PROC_ROOT) -> list[int]:
+    """pid and all its descendants, parents first"""
+    children: dict[int, list[int]] = {}
+    for child, parent in get_parent_pids(proc_root).items():
+        children.setdefault(parent, []).append(child)
+    tree = [pid]
+    for member in tree:
+        tree += sorted(children.get(member, []))
+    return tree
+
+
+def get_command_name(pid: int, proc_root: Path = PROC_ROOT) -> str:
+    """process' executable name (/proc/<pid>/comm), empty if gone"""
+    try:
+        return proc_root.joinpath(str(pid), "comm").read_text().strip()
+    except OSError:
+        return ""
+
+
+@dataclass(kw_only=True, slots=True)
+class CPUTimes:
+    """/proc/stat cumulative times of a CPU (or all, as `cpu`), in jiffies"""
+
+    busy: int
+    softirq: int
+    total: int
+
+
+def read_cpu_times(proc_root: Path = PROC_ROOT) -> dict[str, CPUTimes]:
+    """cumulative times of all CPUs (`cpu`) and of each core (`cpu0`…)"""
+    try:
+        return parse_cpu_times(proc_root.joinpath("stat").read_text())
+    except OSError:
+        return {}
+
+
+def parse_cpu_times(text: str) -> dict[str, CPUTimes]:
+    """cumulative CPU times from the content of a /proc/stat file"""
+    times: dict[str, CPUTimes] = {}
+    # cpu0 user nice system idle iowait irq softirq steal guest guest_nice
+    for line in text.splitlines():
+        if not line.startswith("cpu"):
+            continue
+        name, *values = line.split()
+        # guest times are already included in user and nice
+        jiffies = [int(value) for value in values[:8]]
+        idle = jiffies[3] + jiffies[4]
+        times[name] = CPUTimes(
+            busy=sum(jiffies) - idle, softirq=jiffies[6], total=sum(jiffies)
+        )
+    return times
+
+
+def read_meminfo(proc_root: Path = PROC_ROOT) -> dict[str, int]:
+    """/proc/meminfo values, in bytes"""
+    try:
+        return parse_meminfo(proc_root.joinpath("meminfo").read_text())
+    except OSError:
+        return {}
+
+
+def parse_meminfo(text: str) -> dict[str, int]:
+    """values (in bytes) from the content of a /proc/meminfo file"""
+    info: dict[str, int] = {}
+    for line in text.splitlines():
+        name, _, value = line.partition(":")
+        fields = value.split()
+        if not fields:
+            continue
+        info[name] = int(fields[0]) * (1024 if fields[1:] == ["kB"] else 1)
+    return info
+
+
+def read_rss(pid: int, proc_root: Path = PROC_ROOT) -> int:
+    """resident memory of a process, in bytes (0 if gone)"""
+    try:
+        lines = proc_root.joinpath(str(pid), "status").read_text().splitlines()
+    except OSError:
+        return 0
+    for line in lines:
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) * 1024
+    # kernel threads and zombies
+    return 0
+
+
+@dataclass(kw_only=True, slots=True)
+class NetDevCounters:
+    """/proc/net/dev cumulative counters of an interface"""
+
+    rx_bytes: int
+    rx_packets: int
+    rx_drop: int
+    tx_bytes: int
+    tx_packets: int
+    tx_drop: int
+
+
+def read_net_dev(proc_root: Path = PROC_ROOT) -> dict[str, NetDevCounters]:
+    """all interfaces' counters from a single read of /proc/net/dev"""
+    counters: dict[str, NetDevCounters] = {}
+    try:
+        lines = proc_root.joinpath("net/dev").read_text().splitlines()
+    except OSError:
+        return counters
+    # Inter-|   Receive                            |  Transmit
+    #  face |bytes packets errs drop fifo frame compressed multicast|bytes …
+    for line in lines[2:]:
+        if ":" not in line:
+            continue
+        ifname, values = line.split(":", 1)
+        fields = [int(value) for value in values.split()]
+        if len(fields) < 16:  # noqa: PLR2004
+            continue
+        counters[ifname.strip()] = NetDevCounters(
+            rx_bytes=fields[0],
+            rx_packets=fields[1],
+            rx_drop=fields[3],
+            tx_bytes=fields[8],
+            tx_packets=fields[9],
+            tx_drop=fields[11],
+        )
+    return counters
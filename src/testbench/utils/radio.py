@@ -0,0 +1,171 @@
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from testbench.context import Context
+from testbench.utils.netlink import NL80211, StationInfo
+from testbench.utils.procfs import PROC_ROOT, read_wireless
+from testbench.utils.sampler import DEFAULT_CAPACITY, PeriodicSampler
+
+logger = Context.logger
+
+StationReader = Callable[[str], StationInfo | None]
+
+
+class NL80211StationReader:
+    """station info over nl80211, disabled (returns None) if unavailable"""
+
+    def __init__(self) -> None:
+        self.client = NL80211()
+        self.available: bool | None = None
+
+    def __call__(self, ifname: str) -> StationInfo | None:
+        if self.available is None:
+            try:
+                self.client.open()
+                self.available = True
+            except OSError as exc:
+                logger.warning(f"nl80211 unavailable, using /proc only: {exc}")
+                self.available = False
+        if not self.available:
+            return None
+        return self.client.get_station(ifname)
+
+    def close(self):
+        self.client.close()
+
+
+@dataclass(kw_only=True, slots=True)
+class RadioSample:
+    on: float  # timestamp
+    signal: float | None  # dBm
+    noise: float | None  # dBm
+    tx_bitrate: float | None  # Mb/s
+    rx_bitrate: float | None  # Mb/s
+    # counters (cumulative since association)
+    tx_retries: int | None
+    tx_failed: int | None
+    discarded_retry: int | None
+
+
+def mean(values: list[float]) -> float | None:
+    return sum(values) / len(values) if values else None
+
+
+def increase(values: list[int]) -> int | None:
+    return values[-1] - values[0] if values else None
+
+
+@dataclass(kw_only=True)
+class RadioSummary:
+    nb_samples: int
+    signal_avg: float | None
+    signal_min: float | None
+    tx_bitrate_avg: float | None
+    rx_bitrate_avg: float | None
+    # counters' increase over the summarized window
+    tx_retries: int | None
+    tx_failed: int | None
+
+    @classmethod
+    def of(cls, samples: list[RadioSample]) -> "RadioSummary":
+        signals = [s.signal for s in samples if s.signal is not None]
+        return cls(
+            nb_samples=len(samples),
+            signal_avg=mean(signals),
+            signal_min=min(signals) if signals else None,
+            tx_bitrate_avg=mean(
+                [s.tx_bitrate for s in samples if s.tx_bitrate is not None]
+            ),
+            rx_bitrate_avg=mean(
+                [s.rx_bitrate for s in samples if s.rx_bitrate is not None]
+            ),
+            tx_retries=increase(
+                [s.tx_retries for s in samples if s.tx_retries is not None]
+                or [s.discarded_retry for s in samples if s.discarded_retry is not None]
+            ),
+            tx_failed=increase(
+                [s.tx_failed for s in samples if s.tx_failed is not None]
+            ),
+        )
+
+    @property
+    def signal_text(self) -> str:
+        if self.signal_avg is None or self.signal_min is None:
+            return "-"
+        return f"{self.signal_avg:.0f} dBm (min {self.signal_min:.0f})"
+
+    @property
+    def bitrate_text(self) -> str:
+        return "/".join(
+            "-" if rate is None else f"{rate:.0f}"
+            for rate in (self.tx_bitrate_avg, self.rx_bitrate_avg)
+        )
+
+    @property
+    def errors_text(self) -> str:
+        return "/".join(
+            "-" if count is None else str(count)
+            for count in (self.tx_retries, self.tx_failed)
+        )
+
+
+class RadioSampler(PeriodicSampler[RadioSample]):
+    """Samples per-interface radio telemetry for the lifetime of a run
+
+    Reads /proc/net/wireless (once for all interfaces) and nl80211 station
+    info (per interface) every interval seconds, recorded per interface."""
+
+    name: str = "radio"
+
+    def __init__(
+        self,
+        ifnames: list[str],
+        interval: float,
+        capacity: int = DEFAULT_CAPACITY,
+        proc_root: Path = PROC_ROOT,
+        station_reader: StationReader | None = None,
+    ):
+        super().__init__(interval=interval, capacity=capacity)
+        self.ifnames = ifnames
+        self.proc_root = proc_root
+        self.station_reader = station_reader or NL80211StationReader()
+
+    def sample(self):
+        now = time.time()
+        wireless = read_wireless(self.proc_root)
+        for ifname in self.ifnames:
+            try:
+                station = self.station_reader(ifname)
+            except OSError as exc:
+                logger.debug(f"No station info for {ifname}: {exc}")
+                station = None
+            proc = wireless.get(ifname)
+            if station is None and proc is None:
+                continue
+            signal = station.signal if station else None
+            if signal is None and proc:
+                signal = proc.level
+            self.record(
+                RadioSample(
+                    on=now,
+                    signal=signal,
+                    noise=proc.noise if proc else None,
+                    tx_bitrate=station.tx_bitrate if station else None,
+                    rx_bitrate=station.rx_bitrate if station else None,
+                    tx_retries=station.tx_retries if station else None,
+                    tx_failed=station.tx_failed if station else None,
+                    discarded_retry=proc.discarded_retry if proc else None,
+                ),
+                key=ifname,
+            )
+
+    def teardown(self):
+        if isinstance(self.station_reader, NL80211StationReader):
+            self.station_reader.close()
+
+    def summary(
+        self, ifname: str, start: float | None = None, end: float | None = None
+    ) -> RadioSummary:
+        return RadioSummary.of(self.samples(ifname, start=start, end=end))
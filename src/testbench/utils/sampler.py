@@ -0,0 +1,91 @@
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Generic, Protocol, TypeVar
+
+from testbench.context import Context
+
+logger = Context.logger
+
+# max number of samples kept (per key)
+DEFAULT_CAPACITY: int = 7200
+
+
+class Timestamped(Protocol):
+    @property
+    def on(self) -> float: ...
+
+
+SampleT = TypeVar("SampleT", bound=Timestamped)
+
+
+class PeriodicSampler(ABC, Generic[SampleT]):
+    """Calls sample() every interval seconds in a background thread
+
+    A failing sample is logged and does not stop the sampler.
+    Recorded samples are kept in ring buffers of capacity samples, one per key
+    (per interface for instance). They are timestamped so they can be lined up
+    with results (see samples(key, start, end))."""
+
+    name: str = "sampler"
+
+    def __init__(self, interval: float, capacity: int = DEFAULT_CAPACITY):
+        self.interval = interval
+        self.capacity = capacity
+        self.stopped = threading.Event()
+        self.thread: threading.Thread | None = None
+        self.nb_samples: int = 0
+        self.buffers_lock = threading.Lock()
+        self.buffers: dict[str, deque[SampleT]] = {}
+
+    @abstractmethod
+    def sample(self) -> None: ...
+
+    def setup(self) -> None:
+        """called in the sampler thread before first sample"""
+
+    def teardown(self) -> None:
+        """called in the sampler thread after last sample"""
+
+    def record(self, sample: SampleT, key: str = ""):
+        with self.buffers_lock:
+            if key not in self.buffers:
+                self.buffers[key] = deque(maxlen=self.capacity)
+            self.buffers[key].append(sample)
+
+    def samples(
+        self, key: str = "", start: float | None = None, end: float | None = None
+    ) -> list[SampleT]:
+        """samples of key, optionally within [start, end] timestamps"""
+        with self.buffers_lock:
+            samples = list(self.buffers.get(key, []))
+        return [
+            sample
+            for sample in samples
+            if (start is None or sample.on >= start)
+            and (end is None or sample.on <= end)
+        ]
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.loop, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def loop(self):
+        self.setup()
+        try:
+            while not self.stopped.is_set():
+                try:
+                    self.sample()
+                    self.nb_samples += 1
+                except Exception as exc:
+                    logger.debug(f"{self.name} sample failed: {exc}")
+                self.stopped.wait(self.interval)
+        finally:
+            self.teardown()
@@ -0,0 +1,59 @@
+import itertools
+import math
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+
+def percentile(sorted_values: list[float], pc: float) -> float:
+    """nearest-rank percentile (pc in 0-100) of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pc / 100 * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+@dataclass(kw_only=True)
+class Distribution:
+    """summary of a series of measures (durations mostly)"""
+
+    count: int = 0
+    min: float = 0.0
+    avg: float = 0.0
+    p50: float = 0.0
+    p90: float = 0.0
+    p95: float = 0.0
+    p99: float = 0.0
+    max: float = 0.0
+
+    @classmethod
+    def of(cls, values: Iterable[float]) -> "Distribution":
+        ordered = sorted(values)
+        if not ordered:
+            return cls()
+        return cls(
+            count=len(ordered),
+            min=ordered[0],
+            avg=math.fsum(ordered) / len(ordered),
+            p50=percentile(ordered, 50),
+            p90=percentile(ordered, 90),
+            p95=percentile(ordered, 95),
+            p99=percentile(ordered, 99),
+            max=ordered[-1],
+        )
+
+
+def find_knee(
+    points: list[tuple[int, float]], min_ratio: float
+) -> tuple[int, float] | None:
+    """first (x, y) point past which increasing x stops paying off
+
+    points are ordered by x. Increasing x stops paying off once the marginal gain
+    (y per added x) falls below min_ratio of the average so far (y/x).
+    None if y scales all along"""
+    for (x, y), (next_x, next_y) in itertools.pairwise(points):
+        if x <= 0 or y <= 0 or next_x <= x:
+            continue
+        marginal = (next_y - y) / (next_x - x)
+        if marginal < min_ratio * y / x:
+            return x, y
+    return None
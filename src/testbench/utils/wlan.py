@@ -2,12 +2,21 @@ import fnmatch
 import random
 import re
 import subprocess
-from dataclasses import dataclass
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from ipaddress import IPv4Address
 from pathlib import Path
 from typing import NamedTuple, Self
 
-from nmcli import device as nmdevice
+from nmcli import (
+    DeviceControl,  # pyright: ignore[reportPrivateImportUsage]
+    SystemCommand,  # pyright: ignore[reportPrivateImportUsage]
+)
+
+from testbench.context import Context
+from testbench.utils.instrumentation import tracked, tracked_run
 
 # from nmcli.data.device import NMDevice
 
@@ -26,12 +35,20 @@ NMSHOW_FIELDS = [
     # "IP6.GATEWAY",
     "GENERAL.VENDOR",
 ]
+# NetworkManager device states at or below which there's nothing to tear down
+NM_STATE_DISCONNECTED = 30
+# returncode for commands that were killed on timeout (as coreutils' timeout)
+TIMEOUT_RETURNCODE = 124
 RE_NUMS_ALPHA = re.compile(r"(\d+)|(\D+)")
 RE_ROUTE_NM = re.compile(
     r"dst = ?P<dst>(\d+\.\d+\.\d+\.\d+\/\d+), "  # noqa: ISC003
     + r"nh = ?P<nh>(\d+\.\d+\.\d+\.\d+\/\d+), mt = ?P<mt>(\d+)"
 )
 
+logger = Context.logger
+# nmcli device control whose subprocesses are instrumented (when enabled)
+nmdevice = DeviceControl(SystemCommand(subprocess_run=tracked_run))
+
 
 @dataclass(kw_only=True)
 class IP4Route:
@@ -97,6 +114,18 @@ class WirelessDevice:
             raise OSError("No IPv4 Link")
         return self.ip4
 
+    @property
+    def state_code(self) -> int:
+        try:
+            return int(self.state.split(" ", 1)[0])
+        except ValueError:
+            return 0
+
+    @property
+    def is_idle(self) -> bool:
+        """disconnected (or unavailable) and without a connection profile"""
+        return self.state_code <= NM_STATE_DISCONNECTED and not self.connection
+
     @classmethod
     def from_nmshow(cls, payload: dict[str, str | None]) -> Self:
         return cls(
@@ -115,7 +144,10 @@ class WirelessDevice:
         )
 
     def refresh(self):
-        payload = nmdevice.show(self.ifname, fields=",".join(NMSHOW_FIELDS))
+        self.update(nmdevice.show(self.ifname, fields=",".join(NMSHOW_FIELDS)))
+
+    def update(self, payload: dict[str, str | None]):
+        """update in place from an nmcli device show payload"""
         self.hwaddr = str(payload["GENERAL.HWADDR"]).lower()
         self.mtu = int(str(payload["GENERAL.MTU"]))
         self.state = str(payload["GENERAL.STATE"])
@@ -138,68 +170,138 @@ def wirelessdevice_name_key(device: WirelessDevice) -> tuple[int | str, ...]:
     )
 
 
-def get_wireless_devices(
-    *,
-    excluding_ifnames: list[str],
-    excluding_vendors: list[str],
-    excluding_hwaddrs: list[str],
-    max_devices: int,
-) -> dict[str, WirelessDevice]:
+class DeviceInventory:
+    """Host's wireless devices, from a single nmcli snapshot
+
+    Filtered views are answered from memory and share the same WirelessDevice
+    instances so that refreshes made during a run are reflected everywhere.
+    Interfaces known to have changed (connected, disconnected) are invalidated
+    and only those are re-read on next access."""
+
+    # singleton instance
+    _instance: "DeviceInventory | None" = None
+
+    # above this number of stale devices, a single show_all is cheaper
+    full_reload_threshold: int = 4
+
+    def __init__(self) -> None:
+        self.devices: dict[str, WirelessDevice] = {}
+        self.stale: set[str] = set()
+        self.loaded: bool = False
+        self.lock = threading.RLock()
 
-    def matches(entry: dict[str, str | None]) -> bool:
-        conditions = [
-            entry["GENERAL.TYPE"] == "wifi",
-            # entry["GENERAL.DEVICE"] not in excluding_ifnames,
+    @classmethod
+    def get(cls) -> "DeviceInventory":
+        if not cls._instance:
+            cls._instance = cls()
+        return cls._instance
+
+    def load(self):
+        """(re)load all wireless devices, updating known ones in place"""
+        entries = [
+            entry
+            for entry in nmdevice.show_all(  # pyright: ignore[reportUnknownMemberType]
+                fields=",".join(NMSHOW_FIELDS)
+            )
+            if entry["GENERAL.TYPE"] == "wifi"
         ]
-        if excluding_ifnames:
+        with self.lock:
+            devices: dict[str, WirelessDevice] = {}
+            for entry in entries:
+                ifname = str(entry["GENERAL.DEVICE"])
+                if device := self.devices.get(ifname):
+                    device.update(entry)
+                else:
+                    device = WirelessDevice.from_nmshow(entry)
+                devices[ifname] = device
+            self.devices = devices
+            self.stale.clear()
+            self.loaded = True
+
+    def invalidate(self, ifnames: list[str] | None = None):
+        """mark ifnames (all devices if None) to be re-read on next access"""
+        with self.lock:
+            if ifnames is None:
+                self.loaded = False
+            else:
+                self.stale.update(ifnames)
+
+    def ensure_fresh(self):
+        with self.lock:
+            if not self.loaded or len(self.stale) >= self.full_reload_threshold:
+                self.load()
+                return
+            for ifname in list(self.stale):
+                device = self.devices.get(ifname)
+                if device:
+                    try:
+                        device.refresh()
+                    except Exception as exc:
+                        logger.debug(f"Dropping {ifname} from inventory: {exc}")
+                        del self.devices[ifname]
+                self.stale.discard(ifname)
+
+    @property
+    def all(self) -> list[WirelessDevice]:
+        """all wireless devices, sorted by name"""
+        self.ensure_fresh()
+        with self.lock:
+            return sorted(self.devices.values(), key=wirelessdevice_name_key)
+
+    def filter(
+        self,
+        *,
+        excluding_ifnames: list[str],
+        excluding_vendors: list[str],
+        excluding_hwaddrs: list[str],
+        max_devices: int,
+    ) -> dict[str, WirelessDevice]:
+
+        def matches(device: WirelessDevice) -> bool:
+            conditions: list[bool] = []
             for ifname in excluding_ifnames:
-                conditions.append(
-                    not fnmatch.fnmatch(str(entry["GENERAL.DEVICE"]), ifname.lower())
-                )
-        if excluding_vendors:
+                conditions.append(not fnmatch.fnmatch(device.ifname, ifname.lower()))
             for vendor in excluding_vendors:
                 conditions.append(
-                    # vendor.lower() not in (entry["GENERAL.VENDOR"] or "").lower()
-                    not fnmatch.fnmatch(
-                        (entry["GENERAL.VENDOR"] or "").lower(), vendor.lower()
-                    )
+                    not fnmatch.fnmatch(device.vendor.lower(), vendor.lower())
                 )
-        if excluding_hwaddrs:
             for hwaddr in excluding_hwaddrs:
                 conditions.append(
-                    not fnmatch.fnmatch(
-                        str(entry["GENERAL.HWADDR"]).lower(), hwaddr.lower()
-                    )
+                    not fnmatch.fnmatch(device.hwaddr.lower(), hwaddr.lower())
                 )
-        return all(conditions)
+            return all(conditions)
 
-    devices: list[WirelessDevice] = [
-        WirelessDevice.from_nmshow(entry)
-        for entry in nmdevice.show_all(  # pyright: ignore[reportUnknownMemberType]
-            fields=",".join(NMSHOW_FIELDS)
-        )
-        if matches(entry)
-    ]
-    devices.sort(key=wirelessdevice_name_key)
+        devices = [device for device in self.all if matches(device)]
+
+        if max_devices:
+            random.shuffle(devices)
+            devices = devices[:max_devices]
+
+        return {device.ifname: device for device in devices}
 
-    if max_devices:
-        random.shuffle(devices)
-        devices = devices[:max_devices]
+    def select(self, ifnames: list[str]) -> dict[str, WirelessDevice]:
+        return {
+            device.ifname: device for device in self.all if device.ifname in ifnames
+        }
 
-    return {device.ifname: device for device in devices}
+
+def get_wireless_devices(
+    *,
+    excluding_ifnames: list[str],
+    excluding_vendors: list[str],
+    excluding_hwaddrs: list[str],
+    max_devices: int,
+) -> dict[str, WirelessDevice]:
+    return DeviceInventory.get().filter(
+        excluding_ifnames=excluding_ifnames,
+        excluding_vendors=excluding_vendors,
+        excluding_hwaddrs=excluding_hwaddrs,
+        max_devices=max_devices,
+    )
 
 
 def get_some_wireless_devices(*, ifnames: list[str]) -> dict[str, WirelessDevice]:
-    return {
-        ifname: device
-        for ifname, device in get_wireless_devices(
-            excluding_ifnames=[],
-            excluding_vendors=[],
-            excluding_hwaddrs=[],
-            max_devices=0,
-        ).items()
-        if ifname in ifnames
-    }
+    return DeviceInventory.get().select(ifnames)
 
 
 class CompletedProcess(NamedTuple):
@@ -212,10 +314,25 @@ class CompletedProcess(NamedTuple):
         return self.returncode == 0
 
 
-def run_command(args: list[str]) -> CompletedProcess:
-    ps = subprocess.run(
-        args, text=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=False
-    )
+def run_command(args: list[str], timeout: float | None = None) -> CompletedProcess:
+    with tracked(args) as sample:
+        try:
+            ps = subprocess.run(
+                args,
+                text=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                check=False,
+                timeout=timeout,
+            )
+        except subprocess.TimeoutExpired:
+            sample.returncode = TIMEOUT_RETURNCODE
+            return CompletedProcess(
+                args=args,
+                returncode=TIMEOUT_RETURNCODE,
+                stdout=f"Timed out after {timeout}s",
+            )
+        sample.returncode = ps.returncode
     return CompletedProcess(
         args=ps.args,
         returncode=ps.returncode,
@@ -237,27 +354,205 @@ def connect_device(
     return run_command(args)
 
 
-def disconnect_device(device: WirelessDevice) -> CompletedProcess:
-    if device.connection:
-        run_command(["nmcli", "connection", "delete", "id", device.connection])
-    return run_command(["nmcli", "device", "disconnect", device.ifname])
+class LaunchStagger:
+    """Spaces out launches across threads by at least `delay` seconds"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
 
+    def wait(self):
+        if self.delay <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.delay
+        time.sleep(slot - now)
 
-def disconnect_devices(devices: list[WirelessDevice]):
-    for device in devices:
-        disconnect_device(device)
 
+@dataclass(kw_only=True)
+class DeviceConnection:
+    ifname: str
+    succeeded: bool = False
+    attempts: int = 0
+    # duration of the last association attempt (the successful one if any)
+    duration: float = 0.0
+    # time from first attempt to outcome, including retries
+    elapsed: float = 0.0
+    feedback: str = ""
 
-def ping_host(ifname: str, host: str) -> tuple[bool, str]:
-    ps = run_command(["ping", "-4", "-c", "4", "-I", ifname, host])
-    last_line = ps.stdout.strip().splitlines()[-1] if ps.stdout else ""
-    return ps.succeedeed, last_line
 
+@dataclass(kw_only=True)
+class ConnectionsReport:
+    connections: dict[str, DeviceConnection] = field(
+        default_factory=dict[str, DeviceConnection]
+    )
+    duration: float = 0.0
+
+    @property
+    def connected(self) -> list[str]:
+        return [ifname for ifname, conn in self.connections.items() if conn.succeeded]
 
-def reset_connections():
-    devices = get_wireless_devices(
-        excluding_ifnames=[], excluding_vendors=[], excluding_hwaddrs=[], max_devices=0
+    @property
+    def failed(self) -> list[str]:
+        return [
+            ifname for ifname, conn in self.connections.items() if not conn.succeeded
+        ]
+
+
+def connect_with_retries(
+    ifname: str,
+    *,
+    ssid: str,
+    passphrase: str | None,
+    retries: int,
+    stagger: LaunchStagger,
+) -> DeviceConnection:
+    """associate ifname to ssid, retrying up to `retries` times on failure"""
+    conn = DeviceConnection(ifname=ifname)
+    first_start = time.monotonic()
+    while conn.attempts <= retries:
+        stagger.wait()
+        conn.attempts += 1
+        start = time.monotonic()
+        ps = connect_device(ifname, ssid=ssid, passphrase=passphrase)
+        DeviceInventory.get().invalidate([ifname])
+        conn.duration = time.monotonic() - start
+        conn.succeeded = ps.succeedeed
+        conn.feedback = "" if ps.succeedeed else f"{ps.returncode}: {ps.stdout}"
+        if conn.succeeded:
+            break
+        logger.debug(f"Failed to connect {ifname} (#{conn.attempts}): {conn.feedback}")
+    conn.elapsed = time.monotonic() - first_start
+    return conn
+
+
+def connect_devices(
+    ifnames: list[str],
+    *,
+    ssid: str,
+    passphrase: str | None,
+    parallelism: int,
+    stagger: float = 0.0,
+    retries: int = 0,
+) -> ConnectionsReport:
+    """associate all ifnames concurrently, never aborting on a single failure
+
+    - at most `parallelism` associations are in flight at once
+    - launches (incl. retries) are spaced by at least `stagger` seconds
+    - each device is retried up to `retries` times"""
+    report = ConnectionsReport(
+        connections={ifname: DeviceConnection(ifname=ifname) for ifname in ifnames}
+    )
+    if not ifnames:
+        return report
+    launcher = LaunchStagger(stagger)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+        futures = {
+            ifname: executor.submit(
+                connect_with_retries,
+                ifname,
+                ssid=ssid,
+                passphrase=passphrase,
+                retries=retries,
+                stagger=launcher,
+            )
+            for ifname in ifnames
+        }
+        for ifname, future in futures.items():
+            try:
+                report.connections[ifname] = future.result()
+            except Exception as exc:
+                report.connections[ifname].feedback = str(exc)
+    report.duration = time.monotonic() - start
+    return report
+
+
+def disconnect_device(
+    device: WirelessDevice, timeout: float | None = None
+) -> CompletedProcess:
+    """delete device's connection and disconnect it, within timeout seconds"""
+    deadline = time.monotonic() + timeout if timeout else None
+
+    def remaining() -> float | None:
+        return max(deadline - time.monotonic(), 0.1) if deadline else None
+
+    if device.connection:
+        run_command(
+            ["nmcli", "connection", "delete", "id", device.connection],
+            timeout=remaining(),
+        )
+    # even when the profile could not be deleted (stale or renamed)
+    ps = run_command(
+        ["nmcli", "device", "disconnect", device.ifname], timeout=remaining()
+    )
+    # deleting an active connection deactivates the device already
+    if "not active" in ps.stdout:
+        ps = CompletedProcess(args=ps.args, returncode=0, stdout=ps.stdout)
+    DeviceInventory.get().invalidate([device.ifname])
+    return ps
+
+
+@dataclass(kw_only=True)
+class TeardownReport:
+    nb_devices: int = 0
+    # devices that were already idle and did not need any command
+    nb_skipped: int = 0
+    # ifname: feedback of devices that failed to reset
+    failures: dict[str, str] = field(default_factory=dict[str, str])
+    duration: float = 0.0
+
+    @property
+    def succeeded(self) -> bool:
+        return not self.failures
+
+
+def disconnect_devices(
+    devices: list[WirelessDevice],
+    *,
+    max_workers: int = 1,
+    timeout: float | None = None,
+) -> TeardownReport:
+    """disconnect devices concurrently using at most max_workers threads
+
+    Idle devices are skipped. Each device gets timeout seconds to reset"""
+    report = TeardownReport(nb_devices=len(devices))
+    start = time.monotonic()
+    active = [device for device in devices if not device.is_idle]
+    report.nb_skipped = len(devices) - len(active)
+    if active:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {
+                device.ifname: executor.submit(disconnect_device, device, timeout)
+                for device in active
+            }
+            for ifname, future in futures.items():
+                try:
+                    ps = future.result()
+                except Exception as exc:
+                    report.failures[ifname] = str(exc)
+                    continue
+                if not ps.succeedeed:
+                    report.failures[ifname] = f"{ps.returncode}: {ps.stdout}"
+    report.duration = time.monotonic() - start
+    return report
+
+
+def reset_connections(
+    max_workers: int | None = None, timeout: float | None = None
+) -> TeardownReport:
+    """disconnect all wireless devices and remove all NM connection profiles"""
+    context = Context.get()
+    report = disconnect_devices(
+        devices=DeviceInventory.get().all,
+        max_workers=max_workers or context.teardown_parallelism,
+        timeout=timeout or context.teardown_timeout,
     )
-    disconnect_devices(devices=list(devices.values()))
     for fpath in NM_CONN_DIR.glob("*.nmconnection"):
         fpath.unlink(missing_ok=True)
+    for ifname, feedback in report.failures.items():
+        logger.warning(f"Failed to reset {ifname}: {feedback}")
+    return report
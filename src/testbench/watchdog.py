@@ -0,0 +1,140 @@
+import os
+import signal
+import socket
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from testbench.context import Context
+from testbench.utils.procfs import get_command_name, get_process_tree
+
+logger = Context.logger
+
+# seconds between escalation steps, while still stalled
+DEFAULT_GRACE: float = 15.0
+PROBE_TIMEOUT: float = 2.0
+# thread dump (on JVM's stdout), then polite then forced stop of the tree
+ESCALATION: tuple[signal.Signals, ...] = (
+    signal.SIGQUIT,
+    signal.SIGTERM,
+    signal.SIGKILL,
+)
+# only the JVM dumps its threads on SIGQUIT, the others would core dump
+DUMPING_COMMANDS: tuple[str, ...] = ("java",)
+
+
+def is_reachable(host: str, port: int, timeout: float = PROBE_TIMEOUT) -> bool:
+    """whether a TCP connection to host:port can be opened"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def signal_tree(pid: int, sig: signal.Signals) -> list[int]:
+    """send sig to pid and its descendants, returning the signaled PIDs
+
+    SIGQUIT is only sent to processes that dump their threads on it"""
+    signaled: list[int] = []
+    for member in get_process_tree(pid):
+        if sig == signal.SIGQUIT and get_command_name(member) not in DUMPING_COMMANDS:
+            continue
+        try:
+            os.kill(member, sig)
+        except ProcessLookupError:
+            continue
+        signaled.append(member)
+    return signaled
+
+
+class StallWatchdog:
+    """stops a load run whose results file stopped growing
+
+    Stalled for `timeout` seconds, the process tree is escalated
+    from a thread dump to SIGTERM then SIGKILL, `grace` seconds apart.
+    Progress resuming after the thread dump cancels the escalation.
+    Meant to be checked periodically, while the process runs."""
+
+    def __init__(
+        self,
+        pid: int,
+        results_path: Path,
+        *,
+        timeout: float,
+        grace: float = DEFAULT_GRACE,
+        probe: Callable[[], bool] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.pid = pid
+        self.results_path = results_path
+        self.timeout = timeout
+        self.grace = grace
+        self.probe = probe
+        self.clock = clock
+        self.size: int = 0
+        self.progressed_on: float = clock()
+        self.escalated_on: float = 0.0
+        # next step in ESCALATION
+        self.level: int = 0
+        # whether the target answered when the stall was detected
+        self.reachable: bool | None = None
+
+    @property
+    def stalled(self) -> bool:
+        """whether the run was (being) stopped"""
+        return self.level > 1
+
+    @property
+    def stalled_for(self) -> float:
+        return self.clock() - self.progressed_on
+
+    @property
+    def verdict(self) -> str:
+        if self.reachable is None:
+            target = ""
+        else:
+            target = (
+                " (target reachable)" if self.reachable else " (target unreachable)"
+            )
+        stopped_with = ESCALATION[self.level - 1].name if self.level else ""
+        return f"No results for {self.stalled_for:.0f}s{target}, sent {stopped_with}"
+
+    def defer(self):
+        """restart the countdown (results not growing on purpose, load paused)"""
+        self.progressed_on = self.clock()
+
+    def get_size(self) -> int:
+        try:
+            return self.results_path.stat().st_size
+        except OSError:
+            return 0
+
+    def check(self):
+        size = self.get_size()
+        if size != self.size:
+            self.size = size
+            self.progressed_on = self.clock()
+            if self.level == 1:
+                logger.warning("Results growing again after thread dump")
+                self.level = 0
+                self.reachable = None
+            return
+
+        if self.timeout <= 0 or self.stalled_for < self.timeout:
+            return
+        if self.level >= len(ESCALATION):
+            return
+        if self.level and self.clock() - self.escalated_on < self.grace:
+            return
+
+        if self.level == 0 and self.probe:
+            self.reachable = self.probe()
+        sig = ESCALATION[self.level]
+        signaled = signal_tree(self.pid, sig)
+        logger.warning(
+            f"No results for {self.stalled_for:.0f}s, "
+            f"sent {sig.name} to {signaled or 'none'}"
+        )
+        self.level += 1
+        self.escalated_on = self.clock()
@@ -0,0 +1,144 @@
+# pyright: strict
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ipaddress import IPv4Address
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from testbench.context import Context
+from testbench.jmeter import JMeterRunner
+from testbench.utils.wlan import IP4Link, WirelessDevice
+
+
+@pytest.fixture(scope="session")
+def context() -> Context:
+    """Context (in-memory database), for code reading it at import or call time"""
+    try:
+        return Context.get()
+    except OSError:
+        Context.setup(command="test", db_path=Path(":memory:"))
+        return Context.get()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_device(ifname: str = "lo", address: str | None = None) -> WirelessDevice:
+    """a wireless device, connected with address if set"""
+    return WirelessDevice(
+        ifname=ifname,
+        hwaddr="",
+        mtu=1500,
+        state="100 (connected)" if address else "30 (disconnected)",
+        connection=None,
+        conpath=None,
+        ip4=(
+            IP4Link(address=IPv4Address(address), gateway=None, route=None, dns=None)
+            if address
+            else None
+        ),
+        vendor="",
+    )
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    def handle_error(self, request: Any, client_address: Any):
+        # clients closing their keep-alive connections, probes hanging up
+        pass
+
+
+@pytest.fixture
+def server(handler: type[BaseHTTPRequestHandler]) -> Iterator[ThreadingHTTPServer]:
+    """local HTTP server running the test module's `handler` fixture"""
+    httpd = QuietHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+# stands for JMeter's non-GUI mode: listens for commands like JMeter does, within
+# [jmeterengine.nongui.port, jmeterengine.nongui.maxport], and ends on Shutdown
+# (unless FAKE_JMETER_DEAF is set) or SIGTERM
+FAKE_JMETER = """\
+#!{python}
+import os, socket, sys, time
+
+props = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("-J"))
+port = int(props.get("jmeterengine.nongui.port", 4445))
+maxport = int(props.get("jmeterengine.nongui.maxport", 4455))
+if port > maxport:
+    print("Failed to create UDP port", flush=True)
+    while True:
+        time.sleep(1)
+sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+sock.bind(("127.0.0.1", port))
+print(f"Waiting for possible Shutdown message on port {{port}}", flush=True)
+while True:
+    command, _ = sock.recvfrom(64)
+    if command == b"Shutdown" and not os.environ.get("FAKE_JMETER_DEAF"):
+        sys.exit(0)
+"""
+
+
+@pytest.fixture
+def fake_jmeter(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """a fake `jmeter` first in PATH"""
+    bin_path = tmp_path.joinpath("bin")
+    bin_path.mkdir()
+    jmeter = bin_path.joinpath("jmeter")
+    jmeter.write_text(FAKE_JMETER.format(python=sys.executable))
+    jmeter.chmod(0o755)
+    monkeypatch.setenv("PATH", str(bin_path), prepend=":")
+    return jmeter
+
+
+@pytest.fixture
+def start_jmeter(
+    fake_jmeter: Path, tmp_path: Path
+) -> Iterator[Callable[[], JMeterRunner]]:
+    """starts a looping JMeterRunner on fake_jmeter, listening once returned"""
+    runners: list[JMeterRunner] = []
+
+    def start() -> JMeterRunner:
+        workdir = tmp_path.joinpath(f"workdir{len(runners)}")
+        workdir.mkdir()
+        runner = JMeterRunner(
+            fake_jmeter.with_name("perf.jmx"),
+            ifnames=["wlan0"],
+            workdir=workdir,
+            loops=-1,
+        )
+        runner.start()
+        runners.append(runner)
+        deadline = time.monotonic() + 10
+        while "Waiting" not in runner.output_path.read_text():
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        return runner
+
+    yield start
+    for runner in runners:
+        runner.terminate()
+        runner.ps.wait()
+
+
+def wait_for_end(runner: JMeterRunner, timeout: float) -> bool:
+    """whether runner ended within timeout"""
+    deadline = time.monotonic() + timeout
+    while runner.is_running:
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
@@ -0,0 +1,42 @@
+# pyright: strict
+import pytest
+from conftest import make_device
+
+from testbench.capacity import BISECT, RAMP, CapacityLevel, CapacitySearch
+from testbench.utils.wlan import WirelessDevice
+
+CAPACITY = 5
+
+
+@pytest.mark.parametrize(
+    "mode, step, expected_levels",
+    [
+        (RAMP, 2, [2, 4, 6]),
+        (BISECT, 1, [3, 4, 5, 6, 12]),
+    ],
+)
+def test_capacity_search(mode: str, step: int, expected_levels: list[int]):
+    resets: list[int] = []
+
+    def run_level(devices: list[WirelessDevice]) -> CapacityLevel:
+        nb_tests = len(devices) * 10
+        return CapacityLevel(
+            nb_devices=len(devices),
+            nb_tests=nb_tests,
+            nb_passed=nb_tests if len(devices) <= CAPACITY else nb_tests // 2,
+            connect_times=[1.0] * len(devices),
+        )
+
+    search = CapacitySearch(
+        [make_device(f"wlan{index}") for index in range(12)],
+        run_level=run_level,
+        reset=lambda: resets.append(1),
+        threshold=0.95,
+        mode=mode,
+        step=step,
+    )
+    report = search.run()
+    assert sorted(report.levels) == expected_levels
+    assert len(resets) == len(expected_levels)
+    assert report.capacity == (4 if mode == RAMP else CAPACITY)
+    assert report.curve[0].connect.p50 == 1.0
@@ -0,0 +1,93 @@
+# pyright: strict
+import datetime
+from typing import Any, cast
+
+import pytest
+from conftest import FakeClock
+from peewee import Model
+
+from testbench.hardware import SimpleWirelessDevice
+from testbench.integration import IntegrationTestResult
+from testbench.jtl import GroupSummary
+from testbench.utils.stats import Distribution
+
+
+def get_result(ifname: str, name: str, *, succeeded: bool = True):
+    return IntegrationTestResult(
+        name=name,
+        on=datetime.datetime.now(datetime.UTC),
+        ifname=ifname,
+        params={},
+        succeeded=succeeded,
+        feedback="" if succeeded else "Timed out",
+        duration=1.5,
+    )
+
+
+def count(model: type[Model], *conditions: Any) -> int:
+    query = cast(Any, model.select())  # pyright: ignore[reportUnknownMemberType]
+    return query.where(*conditions).count() if conditions else query.count()
+
+
+@pytest.mark.usefixtures("context")
+def test_run_store():
+    # models are bound to the Context's database on import
+    from testbench import database
+    from testbench.database import (
+        Device,
+        IntegrationResult,
+        PerfAggregate,
+        Run,
+        RunStore,
+    )
+
+    clock = FakeClock()
+    devices = [
+        SimpleWirelessDevice(ifname=f"wlan{index}", vendor="Realtek", hwaddr="")
+        for index in range(3)
+    ]
+    store = RunStore(
+        "integration", devices=devices, params={"gateway": "192.168.2.1"}, clock=clock
+    )
+    run_id = store.run_id
+    assert count(Device, Device.run == run_id) == 3
+
+    # buffered until FLUSH_INTERVAL elapsed…
+    store.add_results([get_result("wlan0", "WiFiConnectionTest")])
+    assert count(IntegrationResult) == 0
+    clock.now += database.FLUSH_INTERVAL
+    store.add_results([get_result("wlan1", "WiFiConnectionTest", succeeded=False)])
+    assert count(IntegrationResult) == 2
+
+    # … or BATCH_SIZE are pending
+    store.add_results(
+        [get_result("wlan2", f"Test{index}") for index in range(database.BATCH_SIZE)]
+    )
+    assert count(IntegrationResult) == 2 + database.BATCH_SIZE
+
+    summary = GroupSummary(
+        nb_success=9,
+        nb_failed=1,
+        elapsed=Distribution(p50=10, p90=20, p99=30, max=40),
+        latency=Distribution(),
+        connect=Distribution(),
+    )
+    store.add_summaries("label", {"Dashboard": summary, "Search": summary})
+    store.add_results([get_result("wlan0", "HasExpectedAddressTest")])
+    store.finish({"nb_passed": 4})
+
+    assert count(IntegrationResult) == 3 + database.BATCH_SIZE
+    failed = IntegrationResult.get(  # pyright: ignore
+        IntegrationResult.succeeded == False  # noqa: E712
+    )
+    assert failed.feedback == "Timed out"  # pyright: ignore
+    assert failed.device.ifname == "wlan1"  # pyright: ignore
+    aggregate = PerfAggregate.get(PerfAggregate.key == "Search")  # pyright: ignore
+    assert aggregate.elapsed_p90 == 20  # pyright: ignore
+
+    run = Run.get_by_id(run_id)  # pyright: ignore
+    assert run.ended_on  # pyright: ignore
+    assert run.results == {"nb_passed": 4}  # pyright: ignore
+    assert run.params == {"gateway": "192.168.2.1"}  # pyright: ignore
+    # queried by device count
+    assert count(Run, Run.nb_devices == 3) >= 1
@@ -0,0 +1,154 @@
+# pyright: strict
+import socket
+import threading
+from collections.abc import Iterator
+from ipaddress import IPv4Address, IPv4Network
+
+import dns.message
+import dns.rcode
+import dns.rrset
+import pytest
+
+from testbench.dnsbench import MixEntry, Source, run_load_level
+from testbench.utils.aio import BackgroundLoop
+from testbench.utils.dns import DNSAnswer, DNSCache, DNSQuery, resolve, resolve_all
+
+LOCALHOST = IPv4Address("127.0.0.1")
+RECORDS = {"kiwix.hotspot.": "192.168.2.1", "apple.com.": "198.51.100.1"}
+
+
+class FakeDNSServer:
+    """answers A queries from RECORDS
+
+    never answers void.* names and drops the first query of lost.* ones"""
+
+    def __init__(self) -> None:
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((str(LOCALHOST), 0))
+        self.port: int = self.sock.getsockname()[1]
+        self.nb_queries = 0
+        self.dropped: set[str] = set()
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while True:
+            try:
+                data, peer = self.sock.recvfrom(512)
+            except OSError:
+                return
+            self.nb_queries += 1
+            request = dns.message.from_wire(data)
+            name = request.question[0].name.to_text()
+            if name.startswith("void."):
+                continue
+            if name.startswith("lost.") and name not in self.dropped:
+                self.dropped.add(name)
+                continue
+            response = dns.message.make_response(request)
+            name = name.removeprefix("lost.")
+            if name in RECORDS:
+                response.answer.append(
+                    dns.rrset.from_text(name, 0, "IN", "A", RECORDS[name])
+                )
+            else:
+                response.set_rcode(dns.rcode.NXDOMAIN)
+            self.sock.sendto(response.to_wire(), peer)
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def dns_server() -> Iterator[FakeDNSServer]:
+    server = FakeDNSServer()
+    yield server
+    server.close()
+
+
+def test_resolve(dns_server: FakeDNSServer):
+    answer = resolve("kiwix.hotspot", LOCALHOST, port=dns_server.port)
+    assert answer.matches(IPv4Address("192.168.2.1"))
+    assert (answer.ttl, answer.attempts) == (0, 1)
+    assert not answer.matches(IPv4Address("192.168.2.2"))
+    assert answer.within(IPv4Network("192.168.2.0/24"))
+
+    missing = resolve("missing.hotspot", LOCALHOST, port=dns_server.port)
+    assert missing.rcode == "NXDOMAIN"
+    assert missing.address is None
+
+    retried = resolve("lost.apple.com", LOCALHOST, port=dns_server.port, timeout=0.2)
+    assert retried.attempts == 2
+    assert retried.address == IPv4Address("198.51.100.1")
+
+
+def test_resolve_all(dns_server: FakeDNSServer):
+    answers = resolve_all(
+        [
+            DNSQuery(domain=domain, server=LOCALHOST, port=dns_server.port)
+            for domain in ("kiwix.hotspot", "apple.com") * 10
+        ],
+        timeout=0.5,
+        retries=0,
+    )
+    assert [str(answer.address) for answer in answers[:2]] == [
+        "192.168.2.1",
+        "198.51.100.1",
+    ]
+    assert all(answer.succeeded for answer in answers)
+    assert dns_server.nb_queries == 20
+
+
+def test_dns_load_level(dns_server: FakeDNSServer):
+    mix = [
+        MixEntry(domain="kiwix.hotspot", expected=IPv4Address("192.168.2.1"), weight=2),
+        MixEntry(domain="apple.com", expected=None),
+        MixEntry(domain="missing.hotspot", expected=IPv4Address("192.168.2.1")),
+        MixEntry(domain="void.hotspot", expected=None),
+    ]
+    level = BackgroundLoop.get().run(
+        run_load_level(
+            [Source(address=LOCALHOST), Source(address=LOCALHOST)],
+            LOCALHOST,
+            mix=mix,
+            qps=100,
+            duration=0.2,
+            timeout=0.2,
+            port=dns_server.port,
+        )
+    )
+    # 20 queries per source, cycling through the 5 weighted entries
+    assert level.nb_sent == 40
+    assert (level.nb_correct, level.nb_wrong, level.nb_timeouts) == (24, 8, 8)
+    assert level.latency.count == 32
+    assert level.target_qps == 200
+
+
+def test_dns_cache(dns_server: FakeDNSServer):
+    now = [0.0]
+    cache = DNSCache(min_ttl=5, negative_ttl=2, clock=lambda: now[0])
+
+    def lookup(domain: str) -> DNSAnswer:
+        return cache.resolve(
+            domain, LOCALHOST, port=dns_server.port, timeout=0.2, retries=0
+        )
+
+    assert lookup("kiwix.hotspot").address == IPv4Address("192.168.2.1")
+    # TTL 0 answer is kept min_ttl
+    lookup("kiwix.hotspot")
+    assert lookup("missing.hotspot").rcode == "NXDOMAIN"
+    lookup("missing.hotspot")
+    # timeouts are not cached
+    lookup("void.hotspot")
+    lookup("void.hotspot")
+    assert (cache.nb_hits, cache.nb_misses) == (2, 4)
+    assert dns_server.nb_queries == 4
+
+    now[0] = 3
+    lookup("kiwix.hotspot")
+    lookup("missing.hotspot")
+    assert (cache.nb_hits, cache.nb_misses) == (3, 5)
+    now[0] = 6
+    lookup("kiwix.hotspot")
+    assert cache.nb_misses == 6
+    assert cache.hit_ratio == 1 / 3
@@ -0,0 +1,31 @@
+# pyright: strict
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from testbench.context import Context
+from testbench.entrypoint import prepare_context
+
+
+@pytest.mark.parametrize(
+    "args, attr",
+    [
+        pytest.param(["--connect-retries", "0", "status"], "connect_retries"),
+        pytest.param(["--connect-stagger", "0", "status"], "connect_stagger"),
+        pytest.param(["--dns-cache-min-ttl", "0", "status"], "dns_cache_min_ttl"),
+        pytest.param(
+            ["--dns-cache-negative-ttl", "0", "status"], "dns_cache_negative_ttl"
+        ),
+        pytest.param(["perf", "--jitter", "0"], "perf_jitter"),
+        pytest.param(["perf", "--stepped", "--warmup", "0"], "perf_warmup"),
+    ],
+)
+def test_zero_reaches_context(
+    args: list[str], attr: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    # a fresh Context, the session's one restored after
+    monkeypatch.setattr(Context, "_instance", None)
+    prepare_context(["--db", str(tmp_path / "test.db"), *args])
+    value: Any = getattr(Context.get(), attr)
+    assert value == 0
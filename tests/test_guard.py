@@ -0,0 +1,174 @@
+# pyright: strict
+import contextlib
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ipaddress import IPv4Address
+from typing import Any
+
+import pytest
+from conftest import FakeClock, wait_for_end
+
+from testbench.guard import (
+    DEGRADED_PROBES,
+    PAUSED,
+    RECOVERED_PROBES,
+    RESUMED,
+    STOPPED,
+    HealthGuard,
+    probe_http,
+)
+from testbench.jmeter import JMeterRunner
+from testbench.utils.icmp import ICMP_UNAVAILABLE, PingStats
+
+LOCALHOST = IPv4Address("127.0.0.1")
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # response delay (seconds)
+    delay: float = 0.0
+
+    def do_GET(self):  # noqa: N802
+        time.sleep(HealthHandler.delay)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        # probe hangs up after the first bytes
+        with contextlib.suppress(ConnectionError):
+            self.wfile.write(b"ok")
+
+    def log_message(self, format: str, *args: Any):  # noqa: A002
+        pass
+
+
+@pytest.fixture
+def handler() -> type[BaseHTTPRequestHandler]:
+    HealthHandler.delay = 0.0
+    return HealthHandler
+
+
+class FakeRunner:
+    def __init__(self):
+        self.calls: list[str] = []
+
+    def pause(self):
+        self.calls.append("pause")
+
+    def resume(self):
+        self.calls.append("resume")
+
+    def stop(self):
+        self.calls.append("stop")
+
+
+def get_guard(
+    server: ThreadingHTTPServer, action: str, clock: FakeClock, loss: float = 0.0
+) -> HealthGuard:
+    def pinger(host: str, ifname: str | None) -> PingStats:
+        nb_received = round(3 * (1 - loss))
+        return PingStats(ifname=ifname, host=host, nb_sent=3, rtts=[1.0] * nb_received)
+
+    return HealthGuard(
+        address=LOCALHOST,
+        host="localhost",
+        action=action,
+        max_loss=0.5,
+        max_response=100,
+        port=server.server_address[1],
+        pinger=pinger,
+        pause_timeout=60,
+        clock=clock,
+    )
+
+
+def test_probe_http(server: ThreadingHTTPServer):
+    assert probe_http(LOCALHOST, "localhost", port=server.server_address[1]) < 1000
+    port = server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    with pytest.raises(OSError):
+        probe_http(LOCALHOST, "localhost", port=port, timeout=1)
+
+
+def test_guard_pause(server: ThreadingHTTPServer):
+    clock = FakeClock()
+    runner = FakeRunner()
+    guard = get_guard(server, "pause", clock)
+
+    def probe(times: int) -> list[str]:
+        for _ in range(times):
+            guard.sample()
+        event = guard.apply(runner, elapsed=clock.now, nb_users=8, rate=40.0)
+        return [event.action] if event else []
+
+    assert probe(5) == []
+
+    # a single slow response is tolerated
+    HealthHandler.delay = 0.15
+    assert probe(DEGRADED_PROBES - 1) == []
+    assert probe(1) == [PAUSED]
+    assert guard.paused
+    first = guard.first_degradation
+    assert first and first.nb_users == 8 and first.rate == 40.0
+    assert "HTTP in" in first.reason
+
+    HealthHandler.delay = 0.0
+    assert probe(RECOVERED_PROBES) == [RESUMED]
+    assert not guard.paused
+
+    # not recovering within pause_timeout stops the load
+    HealthHandler.delay = 0.15
+    assert probe(DEGRADED_PROBES) == [PAUSED]
+    clock.now += 60
+    assert probe(1) == [STOPPED]
+    assert guard.stopped
+    assert runner.calls == ["pause", "resume", "pause", "stop"]
+    # nothing more once stopped
+    assert probe(RECOVERED_PROBES) == []
+
+
+def test_guard_stop(server: ThreadingHTTPServer):
+    clock = FakeClock()
+    runner = FakeRunner()
+    guard = get_guard(server, "stop", clock, loss=2 / 3)
+    for _ in range(DEGRADED_PROBES):
+        guard.sample()
+    event = guard.apply(runner, elapsed=12, nb_users=4, rate=10.0)
+    assert event and event.action == STOPPED
+    assert event.reason == "67% ICMP loss"
+    assert str(event) == "Load stopped after 12s at 4 users, 10.0 req/s: 67% ICMP loss"
+    assert runner.calls == ["stop"]
+
+
+def test_guard_stops_jmeter(
+    server: ThreadingHTTPServer, start_jmeter: Callable[[], JMeterRunner]
+):
+    clock = FakeClock()
+    runner = start_jmeter()
+    guard = get_guard(server, "pause", clock, loss=2 / 3)
+    for _ in range(DEGRADED_PROBES):
+        guard.sample()
+    event = guard.apply(runner, elapsed=12, nb_users=1, rate=10.0)
+    assert event and event.action == PAUSED
+    assert runner.paused and runner.is_running
+
+    # not recovering: the frozen JMeter must end, not load the target again
+    clock.now += 60
+    event = guard.apply(runner, elapsed=72, nb_users=1, rate=0.0)
+    assert event and event.action == STOPPED
+    assert wait_for_end(runner, timeout=5)
+
+
+def test_guard_without_icmp(server: ThreadingHTTPServer):
+    def pinger(host: str, ifname: str | None) -> PingStats:
+        return PingStats(ifname=ifname, host=host, error=f"{ICMP_UNAVAILABLE}: EPERM")
+
+    guard = get_guard(server, "stop", FakeClock())
+    guard.pinger = pinger
+    for _ in range(DEGRADED_PROBES):
+        guard.sample()
+    # HTTP alone keeps guarding
+    assert not guard.icmp_available
+    assert guard.apply(FakeRunner(), elapsed=0, nb_users=1, rate=0.0) is None
+    assert guard.samples()[-1].loss is None
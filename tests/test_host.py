@@ -0,0 +1,96 @@
+# pyright: strict
+from pathlib import Path
+
+from testbench.utils.host import HostSample, HostSampler, HostSummary
+from testbench.utils.procfs import read_cpu_times, read_net_dev
+
+STAT = """\
+cpu  {total_user} 0 100 {total_idle} 0 0 {softirq} 0 0 0
+cpu0 {user} 0 50 {idle} 0 0 {softirq} 0 0 0
+cpu1 0 0 50 {other_idle} 0 0 0 0 0 0
+intr 1234
+"""
+
+NET_DEV = """\
+Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes …
+  wlan0: {rx} 10 0 {drop} 0 0 0 0 {tx} 10 0 0 0 0 0 0
+     lo: 999 1 0 0 0 0 0 0 999 1 0 0 0 0 0 0
+"""
+
+
+def write_stat(proc: Path, user: int, idle: int, softirq: int, other_idle: int):
+    proc.joinpath("stat").write_text(
+        STAT.format(
+            total_user=user,
+            total_idle=idle + other_idle,
+            softirq=softirq,
+            user=user,
+            idle=idle,
+            other_idle=other_idle,
+        )
+    )
+
+
+def test_host_sampler(tmp_path: Path):
+    tmp_path.joinpath("net").mkdir()
+    tmp_path.joinpath("meminfo").write_text(
+        "MemTotal:       1000 kB\nMemAvailable:     50 kB\nHugePages_Total: 0\n"
+    )
+    tmp_path.joinpath("42").mkdir()
+    tmp_path.joinpath("42", "stat").write_text("42 (java) S 1 42 42 0 -1\n")
+    tmp_path.joinpath("42", "status").write_text("Name:\tjava\nVmRSS:\t 2048 kB\n")
+
+    sampler = HostSampler(ifnames=["wlan0"], interval=1, proc_root=tmp_path)
+    sampler.pid = 42
+    write_stat(tmp_path, user=0, idle=0, softirq=0, other_idle=0)
+    tmp_path.joinpath("net", "dev").write_text(NET_DEV.format(rx=0, tx=0, drop=0))
+    sampler.sample()
+    # first sample is a baseline
+    assert sampler.samples() == []
+
+    # cpu0 fully busy (a quarter in softirq), cpu1 idle
+    write_stat(tmp_path, user=300, idle=0, softirq=100, other_idle=450)
+    tmp_path.joinpath("net", "dev").write_text(
+        NET_DEV.format(rx=10_000, tx=2_000, drop=3)
+    )
+    sampler.sample()
+
+    assert read_cpu_times(tmp_path)["cpu1"].busy == 50
+    assert read_net_dev(tmp_path)["lo"].rx_bytes == 999
+    (sample,) = sampler.samples()
+    assert sample.busiest_core == 1.0
+    assert sample.softirq == 0.25
+    assert 0.4 < sample.cpu < 0.5
+    assert sample.memory == 0.95
+    assert sample.rss == 2048 * 1024
+    assert sample.drops == 3
+
+    summary = sampler.summary()
+    assert summary.saturated
+    assert summary.reasons == [
+        "busiest core ≥95% 100% of the time",
+        "memory ≥90% 100% of the time",
+        "3 packets dropped",
+    ]
+
+
+def test_host_summary():
+    def get_sample(cpu: float) -> HostSample:
+        return HostSample(
+            on=0,
+            cpu=cpu,
+            busiest_core=cpu,
+            softirq=0.0,
+            memory=0.5,
+            rss=0,
+            rx_rate=0,
+            tx_rate=0,
+            drops=0,
+        )
+
+    # a short spike is tolerated
+    summary = HostSummary.of([get_sample(0.99)] + [get_sample(0.2)] * 19)
+    assert not summary.saturated
+    assert summary.verdict == "Host not saturated"
+    assert HostSummary.of([]).verdict.startswith("Host saturation unknown")
@@ -0,0 +1,133 @@
+# pyright: strict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ipaddress import IPv4Address
+from typing import Any
+
+import pytest
+from conftest import make_device
+
+from testbench.utils.http import DeviceSession, StreamMatcher, match_url
+from testbench.utils.wlan import IP4Link
+
+LARGE_HEAD = b"<html><head><title>Kiwix</title>"
+LARGE_BODY = LARGE_HEAD + b" " * 100_000 + b"</head></html>"
+# rest of it small enough to be drained
+SMALL_BODY = LARGE_HEAD + b" " * 10_000 + b"</head></html>"
+BODIES = {"/large": LARGE_BODY, "/small": SMALL_BODY}
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # noqa: N802
+        self.send_response(200)
+        if self.path in BODIES:
+            self.send_header("Content-Length", str(len(BODIES[self.path])))
+            self.end_headers()
+            self.wfile.write(BODIES[self.path])
+            return
+        self.send_header("Content-Length", "2")
+        if self.path == "/close":
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format: str, *args: Any):  # noqa: A002
+        pass
+
+
+@pytest.fixture
+def handler() -> type[BaseHTTPRequestHandler]:
+    return KeepAliveHandler
+
+
+# DNS cache settings come from the Context
+@pytest.mark.usefixtures("context")
+def test_device_session(server: ThreadingHTTPServer):
+    device = make_device(address="127.0.0.1")
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    session = DeviceSession.get(device, IPv4Address("127.0.0.1"))
+    assert DeviceSession.get(device, IPv4Address("127.0.0.1")) is session
+    try:
+        for _ in range(3):
+            resp = session.manager.request("GET", f"{url}/")
+            assert resp.data == b"ok"
+    except Exception as exc:
+        if "not permitted" in str(exc):
+            pytest.skip(f"Unable to bind to interface: {exc}")
+        raise
+    assert session.stats.nb_opened == 1
+    assert session.stats.nb_reused == 2
+
+    # server closing the connection
+    session.manager.request("GET", f"{url}/close")
+    session.manager.request("GET", f"{url}/")
+    assert session.stats.nb_opened == 2
+    assert session.stats.nb_dropped == 1
+    assert DeviceSession.get_totals().nb_requests == 5
+
+    # new address renews the session
+    device.ip4 = IP4Link(
+        address=IPv4Address("127.0.0.2"), gateway=None, route=None, dns=None
+    )
+    assert DeviceSession.get(device, IPv4Address("127.0.0.1")) is not session
+    assert session.stats.nb_dropped == 1
+
+    DeviceSession.close_all()
+    assert DeviceSession.get_totals().nb_requests == 0
+
+
+def test_stream_matcher():
+    matcher = StreamMatcher(b"<title>")
+    assert not matcher.feed(b"<html><ti")
+    assert matcher.feed(b"tle>Kiwix")
+    assert matcher.end == len(b"<html><title>")
+    # single byte marker, found in a later chunk
+    matcher = StreamMatcher(b"!")
+    assert not matcher.feed(b"abc")
+    assert matcher.feed(b"de!f")
+    assert matcher.end == 6
+
+
+# DNS cache settings come from the Context
+@pytest.mark.usefixtures("context")
+def test_match_url(server: ThreadingHTTPServer):
+    device = make_device(address="127.0.0.1")
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    url = f"{base_url}/large"
+    kwargs: dict[str, Any] = {
+        "device": device,
+        "dns_server": IPv4Address("127.0.0.1"),
+        "chunk_size": 1024,
+    }
+    match = match_url(url=url, marker="<title>Kiwix</title>", **kwargs)
+    if "not permitted" in match.error:
+        pytest.skip(f"Unable to bind to interface: {match.error}")
+    assert match.succeeded
+    assert match.nb_needed == len(LARGE_HEAD)
+    # stopped early, well before the end of the body
+    assert match.nb_read < len(LARGE_BODY) // 2
+    assert match.ttfb > 0
+
+    stats = DeviceSession.get(device, IPv4Address("127.0.0.1")).stats
+    # closed on purpose, the rest of the body being too large to drain
+    assert stats.nb_dropped == 0
+
+    match = match_url(url=url, marker="<title>Other</title>", **kwargs)
+    assert not match.found
+    assert match.nb_read == len(LARGE_BODY)
+    assert not match.capped
+
+    # the rest of a small body is drained, keeping the connection
+    for _ in range(2):
+        match = match_url(url=f"{base_url}/small", marker="<title>", **kwargs)
+        assert match.found
+        assert match.nb_read < len(SMALL_BODY)
+    assert stats.nb_opened == 2
+    assert stats.nb_reused == 2
+
+    match = match_url(url=url, marker="</html>", max_bytes=10_000, **kwargs)
+    assert match.capped
+    assert match.nb_read == 10_000
+    assert stats.nb_dropped == 0
+    DeviceSession.close_all()
@@ -0,0 +1,37 @@
+# pyright: strict
+import pytest
+
+from testbench.utils.icmp import (
+    build_echo_request,
+    checksum,
+    parse_echo_reply,
+    ping,
+)
+from testbench.utils.stats import Distribution
+
+
+def test_echo_request_checksum():
+    packet = build_echo_request(0x1234, 7, b"abc")
+    # checksum over a packet including its own checksum folds to zero
+    assert checksum(packet) == 0
+    reply = b"\0" + packet[1:]
+    assert parse_echo_reply(reply, raw=False) == (0x1234, 7)
+    ip_header = bytes([0x45]) + bytes(19)
+    assert parse_echo_reply(ip_header + reply, raw=True) == (0x1234, 7)
+    assert parse_echo_reply(packet, raw=False) is None
+
+
+def test_distribution():
+    dist = Distribution.of(float(value) for value in range(1, 101))
+    assert (dist.count, dist.min, dist.max) == (100, 1, 100)
+    assert (dist.p50, dist.p95, dist.avg) == (50, 95, 50.5)
+    assert Distribution.of([]).count == 0
+
+
+def test_ping_loopback():
+    stats = ping("127.0.0.1", "lo", count=3, interval=0.01, timeout=1)
+    if stats.error:
+        pytest.skip(f"ICMP sockets unavailable: {stats.error}")
+    assert stats.nb_sent == 3
+    assert stats.loss == 0
+    assert stats.rtt.max < 1000
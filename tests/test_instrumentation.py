@@ -0,0 +1,33 @@
+# pyright: strict
+from testbench.utils.instrumentation import CommandRecorder, classify
+
+
+def test_classify():
+    assert classify(["sudo", "nmcli", "-f", "GENERAL.DEVICE", "device", "show"]) == (
+        "nmcli show",
+        None,
+    )
+    assert classify(["nmcli", "device", "show", "wlan3"]) == ("nmcli show", "wlan3")
+    assert classify(
+        ["nmcli", "device", "wifi", "connect", "Kiwix Hotspot", "ifname", "wlan2"]
+    ) == ("nmcli connect", "wlan2")
+    assert classify(["nmcli", "connection", "delete", "id", "Kiwix Hotspot"]) == (
+        "nmcli delete",
+        None,
+    )
+    assert classify(["ssh", "-o", "BatchMode=yes", "root@192.168.2.1", "uptime"]) == (
+        "ssh",
+        None,
+    )
+
+
+def test_recorder_concurrency_and_histogram():
+    recorder = CommandRecorder()
+    with recorder.track(["nmcli", "device", "disconnect", "wlan1"]) as first:
+        first.returncode = 0
+        with recorder.track(["nmcli", "device", "disconnect", "wlan2"]) as second:
+            second.returncode = 6
+    assert (first.concurrency, second.concurrency) == (1, 2)
+    stats = recorder.get_stats()["nmcli disconnect"]
+    assert (stats.count, stats.nb_failed, stats.max_concurrency) == (2, 1, 2)
+    assert stats.histogram[0] == 2
@@ -0,0 +1,34 @@
+# pyright: strict
+from collections.abc import Callable
+
+import pytest
+from conftest import wait_for_end
+
+from testbench.jmeter import JMeterRunner
+
+
+def test_stop(start_jmeter: Callable[[], JMeterRunner]):
+    runner = start_jmeter()
+    runner.stop()
+    assert wait_for_end(runner, timeout=5)
+    assert runner.succeeded
+
+
+def test_stop_paused(start_jmeter: Callable[[], JMeterRunner]):
+    runner = start_jmeter()
+    runner.pause()
+    assert runner.is_running
+    runner.stop()
+    assert not runner.paused
+    assert wait_for_end(runner, timeout=5)
+
+
+def test_stop_unanswered(
+    start_jmeter: Callable[[], JMeterRunner], monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setenv("FAKE_JMETER_DEAF", "1")
+    runner = start_jmeter()
+    runner.stop(grace=0.5)
+    # SIGTERM-ed after grace
+    assert wait_for_end(runner, timeout=5)
+    assert not runner.succeeded
@@ -0,0 +1,141 @@
+# pyright: strict
+import csv
+from pathlib import Path
+
+from testbench.jtl import (
+    IfnameIndex,
+    JTLColumns,
+    JTLTail,
+    RollingWindow,
+    get_records_end,
+)
+from testbench.loadgen import JTL_FIELDS
+
+# saved by threads 1-4
+IFNAMES: list[str] = ["wlan0", "wlan1", "wlan2", ""]
+HEADER = "timeStamp,elapsed,label,responseCode,threadName,success,failureMessage\n"
+
+
+def get_row(timestamp: int, label: str, thread: int, *, success: bool = True) -> str:
+    return (
+        f"{timestamp},100,{label},200,Users 1-{thread},{str(success).lower()},"
+        f'"{"" if success else "not 200, really"}"\n'
+    )
+
+
+def test_jtl_tail(tmp_path: Path):
+    path = tmp_path / "results.csv"
+    tail = JTLTail(path)
+    assert tail.read() == []
+
+    path.write_text(HEADER + get_row(1000, "Dashboard", 1))
+    samples = tail.read()
+    assert [sample.label for sample in samples] == ["Dashboard"]
+    assert samples[0].ended_on == 1.1
+
+    # incomplete line is held until complete
+    row = get_row(2000, "Content Home", 2, success=False)
+    with open(path, "a") as fh:
+        fh.write(row[:10])
+    assert tail.read() == []
+    with open(path, "a") as fh:
+        fh.write(row[10:] + "garbage\n")
+    samples = tail.read()
+    assert len(samples) == 1
+    assert samples[0].thread == "Users 1-2"
+    assert not samples[0].success
+    assert tail.nb_malformed == 1
+
+    # multi-line message, written in two parts
+    row = get_row(3000, "Content Random", 3, success=False).replace(", ", "\n")
+    with open(path, "a") as fh:
+        fh.write(row[:-5])
+    assert tail.read() == []
+    with open(path, "a") as fh:
+        fh.write(row[-5:])
+    samples = tail.read()
+    assert [sample.label for sample in samples] == ["Content Random"]
+
+
+def test_records_end():
+    assert get_records_end(b'1,"a\nb",2\n3,"c') == 10
+    assert get_records_end(b'1,"a ""quoted""\n","\n') == 0
+    assert get_records_end(b"1,2\n3,4\n") == 8
+
+
+def test_ifname_index(tmp_path: Path):
+    path = tmp_path / "ifnames.csv"
+    path.write_text("ifname\nwlan0\nwlan1")
+    index = IfnameIndex.from_csv(path)
+    assert index.get("Users 1-2") == "wlan1"
+    # saved ifname prevails, threads reading a row per iteration
+    assert index.get("Users 1-2", "wlan0") == "wlan0"
+    assert index.get("Users 1-2", "wlan9") == "wlan9"
+    assert index.get("Users 1-2", "") == "Users 1-2"
+    assert index.get("Other group 2-1") == "wlan0"
+    assert index.get("Users 1-3") == "Users 1-3"
+    assert index.get("setUp") == "setUp"
+
+
+def test_rolling_window(tmp_path: Path):
+    path = tmp_path / "results.csv"
+    path.write_text(
+        HEADER
+        + "".join(get_row(ts * 1000, "Dashboard", 1) for ts in range(20))
+        + get_row(19000, "Content Random", 2, success=False)
+    )
+    window = RollingWindow(4.5)
+    window.add(JTLTail(path).read())
+    assert window.nb_total == 21
+    by_label = window.get_stats(lambda sample: sample.label)
+    # samples ending in the last 4.5s: 15-19 (ending at 15.1…19.1)
+    assert by_label["Dashboard"].nb_samples == 5
+    assert by_label["Dashboard"].rate == 5 / 4.5
+    assert by_label["Content Random"].error_rate == 1
+    assert by_label["Dashboard"].elapsed.p99 == 100
+
+
+def test_jtl_columns(tmp_path: Path):
+    path = tmp_path / "results.csv"
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(JTL_FIELDS)
+        for index in range(100):
+            row = dict.fromkeys(JTL_FIELDS, "")
+            row.update(
+                timeStamp=str(1_000_000 + index * 100),
+                elapsed=str(index + 1),
+                label="Dashboard" if index % 2 else "Content Home",
+                threadName=f"Users 1-{index % 4 + 1}",
+                success="false" if index == 0 else "true",
+                failureMessage="not 200,\nreally" if index == 0 else "",
+                Latency=str(index),
+                Connect="3",
+                # saved, last sample's thread having moved to another row
+                ifname="wlan0" if index == 99 else IFNAMES[index % 4],
+            )
+            writer.writerow([row[name] for name in JTL_FIELDS])
+        # truncated row, bad values
+        writer.writerow(["1000000", "1"])
+        writer.writerow(["x" if name == "elapsed" else "" for name in JTL_FIELDS])
+    index = IfnameIndex(IFNAMES[:3])
+
+    quarantine = tmp_path / "quarantine.csv"
+    results = JTLColumns.load(path, index, quarantine)
+    assert len(results) == 100
+    assert results.nb_quarantined == 2
+    assert len(quarantine.read_text().splitlines()) == 3
+    by_label = results.by_label()
+    assert list(by_label) == ["Content Home", "Dashboard"]
+    assert by_label["Content Home"].nb_failed == 1
+    assert by_label["Dashboard"].nb_success == 50
+    assert by_label["Dashboard"].elapsed.max == 100
+    assert by_label["Content Home"].connect.p99 == 3
+    by_ifname = results.by_ifname()
+    # 4th thread has no saved ifname
+    assert sorted(by_ifname) == ["Users 1-4", "wlan0", "wlan1", "wlan2"]
+    assert by_ifname["wlan0"].nb_total == 26
+    assert by_ifname["wlan1"].nb_total == 25
+    assert by_ifname["Users 1-4"].nb_total == 24
+    # 100 samples over 10s
+    assert results.get_rates(5) == [(0.0, 10.0), (5.0, 10.0)]
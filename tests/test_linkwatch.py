@@ -0,0 +1,81 @@
+# pyright: strict
+import threading
+import time
+from ipaddress import IPv4Address
+from queue import Empty, Queue
+
+from conftest import make_device
+
+from testbench.utils.linkwatch import DeviceStateWatcher, LinkEventSource
+from testbench.utils.netlink import AddressEvent, iter_messages
+
+
+class FakeEventSource(LinkEventSource):
+    def __init__(self) -> None:
+        self.queue: Queue[AddressEvent] = Queue()
+        self.closed = False
+
+    def open(self) -> None: ...
+
+    def read(self, timeout: float) -> list[AddressEvent]:
+        try:
+            return [self.queue.get(timeout=timeout)]
+        except Empty:
+            return []
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_netlink_address_event_roundtrip():
+    event = AddressEvent(
+        added=True, ifname="wlan12", address=IPv4Address("192.168.2.140"), prefixlen=24
+    )
+    messages = list(iter_messages(event.pack() + event.pack()))
+    assert len(messages) == 2
+    assert AddressEvent.parse(*messages[0]) == event
+
+
+def test_watcher_wakes_up_on_event():
+    device = make_device("wlan1")
+    other = make_device("wlan2")
+    completed: list[str] = []
+    source = FakeEventSource()
+    watcher = DeviceStateWatcher(
+        [device, other],
+        source=source,
+        complete=lambda dev: completed.append(dev.ifname),
+    )
+    assert watcher.start()
+
+    def emit():
+        time.sleep(0.1)
+        source.queue.put(
+            AddressEvent(
+                added=True,
+                ifname="wlan1",
+                address=IPv4Address("192.168.2.130"),
+                prefixlen=24,
+            )
+        )
+
+    threading.Thread(target=emit).start()
+    start = time.monotonic()
+    assert watcher.wait_for_ip4(device, timeout=5)
+    assert time.monotonic() - start < 1
+    assert device.ip4 and device.ip4.address == IPv4Address("192.168.2.130")
+    assert other.ip4 is None
+    assert completed == ["wlan1"]
+
+    source.queue.put(
+        AddressEvent(
+            added=False,
+            ifname="wlan1",
+            address=IPv4Address("192.168.2.130"),
+            prefixlen=24,
+        )
+    )
+    assert not watcher.wait_for_ip4(other, timeout=0.2)
+    watcher.stop()
+    assert device.ip4 is None
+    assert source.closed
@@ -0,0 +1,163 @@
+# pyright: strict
+import csv
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ipaddress import IPv4Address
+from pathlib import Path
+from typing import Any
+
+import pytest
+from conftest import make_device
+
+from testbench import loadgen
+from testbench.loadgen import JTL_FIELDS, NativeRunner, OpenLoopRunner, Sampler
+
+HOME = b'<html><img src="/logo.png"><script src="app.js"></script></html>'
+
+
+class ContentHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # noqa: N802
+        if self.path == "/slow":
+            time.sleep(0.2)
+        if self.path == "/random":
+            self.send_response(302)
+            self.send_header("Location", "/content/home")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/chunked":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self.wfile.write(b"5\r\nhello\r\n0\r\n\r\n")
+            return
+        body = HOME if self.path == "/content/home" else b"x" * 1000
+        self.send_response(404 if self.path == "/missing" else 200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any):  # noqa: A002
+        pass
+
+
+@pytest.fixture
+def handler() -> type[BaseHTTPRequestHandler]:
+    return ContentHandler
+
+
+def test_native_runner(server: ThreadingHTTPServer, tmp_path: Path):
+    device = make_device(address="127.0.0.1")
+    host = "127.0.0.1"
+    runner = NativeRunner(
+        [device, device],
+        scenario=[
+            Sampler(label="Dashboard", host=host, path="/"),
+            Sampler(label="Home", host=host, path="/content/home", embedded=True),
+            Sampler(label="Random", host=host, path="/random"),
+            Sampler(label="Chunked", host=host, path="/chunked"),
+            Sampler(label="Missing", host=host, path="/missing"),
+        ],
+        dns_server=IPv4Address("127.0.0.1"),
+        ramp_up=0.2,
+        port=server.server_address[1],
+        workdir=tmp_path,
+    )
+    runner.start()
+    while runner.is_running:
+        time.sleep(0.05)
+    assert runner.succeeded
+
+    with open(runner.results_csv_path) as fh:
+        reader = csv.DictReader(fh)
+        assert reader.fieldnames == JTL_FIELDS
+        rows = list(reader)
+    if "not permitted" in rows[0]["failureMessage"]:
+        pytest.skip(f"Unable to bind to interface: {rows[0]['failureMessage']}")
+    assert len(rows) == runner.nb_samples == 10
+    assert {row["threadName"] for row in rows} == {"Users 1-1", "Users 1-2"}
+    results = {row["label"]: row for row in rows if row["threadName"] == "Users 1-1"}
+    assert results["Dashboard"]["success"] == "true"
+    assert int(results["Dashboard"]["Connect"]) >= 0
+    # home page + its 2 embedded resources
+    assert int(results["Home"]["bytes"]) > len(HOME) + 2000
+    # redirect followed
+    assert results["Random"]["URL"].endswith("/content/home")
+    assert results["Random"]["success"] == "true"
+    assert results["Chunked"]["success"] == "true"
+    assert results["Missing"]["success"] == "false"
+    assert results["Missing"]["responseCode"] == "404"
+
+
+def test_native_runner_stop(server: ThreadingHTTPServer, tmp_path: Path):
+    runner = NativeRunner(
+        [make_device(address="127.0.0.1")],
+        scenario=[Sampler(label="Dashboard", host="127.0.0.1", path="/")],
+        dns_server=IPv4Address("127.0.0.1"),
+        loops=-1,
+        ramp_up=0,
+        port=server.server_address[1],
+        workdir=tmp_path,
+    )
+    runner.start()
+    time.sleep(0.3)
+    assert runner.is_running
+    runner.stop()
+    deadline = time.monotonic() + 5
+    while runner.is_running and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert runner.succeeded
+    # looped until stopped
+    assert runner.nb_samples > 1
+
+
+def test_open_loop_offsets(tmp_path: Path):
+    runner = OpenLoopRunner(
+        [make_device(address="127.0.0.1")],
+        rate=10,
+        scenario=[],
+        dns_server=IPv4Address("127.0.0.1"),
+        workdir=tmp_path,
+    )
+    offsets = runner.get_offsets()
+    assert [round(next(offsets), 3) for _ in range(3)] == [0, 0.1, 0.2]
+    runner.arrivals = "poisson"
+    offsets = runner.get_offsets()
+    last = [next(offsets) for _ in range(10_000)][-1]
+    # about 10 per second
+    assert 950 < last < 1050
+
+
+def test_open_loop_runner(
+    server: ThreadingHTTPServer, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(loadgen, "MAX_IN_FLIGHT", 3)
+    runner = OpenLoopRunner(
+        [make_device(address="127.0.0.1"), make_device(address="127.0.0.1")],
+        rate=50,
+        duration=0.2,
+        scenario=[Sampler(label="Slow", host="127.0.0.1", path="/slow")],
+        dns_server=IPv4Address("127.0.0.1"),
+        port=server.server_address[1],
+        workdir=tmp_path,
+    )
+    runner.start()
+    while runner.is_running:
+        time.sleep(0.05)
+    assert runner.succeeded
+
+    with open(runner.results_csv_path) as fh:
+        rows = list(csv.DictReader(fh))
+    sent = [row for row in rows if row["failureMessage"] != loadgen.REJECTED_MESSAGE]
+    if "not permitted" in sent[0]["failureMessage"]:
+        pytest.skip(f"Unable to bind to interface: {sent[0]['failureMessage']}")
+    # arrivals kept coming while slow requests were in flight
+    assert len(rows) == runner.nb_samples == 10
+    assert len(sent) == 3
+    assert runner.nb_rejected == 7
+    assert all(int(row["elapsed"]) >= 200 for row in sent)
+    assert {row["ifname"] for row in rows} == {"lo"}
+    assert {row["threadName"] for row in rows} == {"Users 1-1", "Users 1-2"}
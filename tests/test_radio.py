@@ -0,0 +1,62 @@
+# pyright: strict
+from pathlib import Path
+
+from testbench.utils.netlink import (
+    NL80211_RATE_INFO_BITRATE32,
+    NL80211_STA_INFO_SIGNAL,
+    NL80211_STA_INFO_TX_BITRATE,
+    NL80211_STA_INFO_TX_RETRIES,
+    StationInfo,
+    pack_attribute,
+)
+from testbench.utils.procfs import read_wireless
+from testbench.utils.radio import RadioSampler
+
+WIRELESS = """\
+Inter-| sta-|   Quality        |   Discarded packets               | Missed | WE
+ face | tus | link level noise |  nwid  crypt   frag  retry   misc | beacon | 22
+ wlan0: 0000   54.  -56.  -256        0      0      0     {retry}      0        0
+"""
+
+
+def test_station_info_parse():
+    sta_info = (
+        pack_attribute(
+            NL80211_STA_INFO_SIGNAL, (-61).to_bytes(1, "little", signed=True)
+        )
+        + pack_attribute(
+            NL80211_STA_INFO_TX_BITRATE,
+            pack_attribute(NL80211_RATE_INFO_BITRATE32, (1445).to_bytes(4, "little")),
+        )
+        + pack_attribute(NL80211_STA_INFO_TX_RETRIES, (12).to_bytes(4, "little"))
+    )
+    info = StationInfo.parse(sta_info)
+    assert (info.signal, info.tx_bitrate, info.tx_retries) == (-61, 144.5, 12)
+    assert info.rx_bitrate is None
+
+
+def test_radio_sampler(tmp_path: Path):
+    wireless = tmp_path / "net" / "wireless"
+    wireless.parent.mkdir()
+    stations = {"wlan0": StationInfo(signal=-60, tx_bitrate=72.2, tx_retries=10)}
+    sampler = RadioSampler(
+        ifnames=["wlan0", "wlan1"],
+        interval=1,
+        proc_root=tmp_path,
+        station_reader=stations.get,
+    )
+
+    for retry in (3, 8):
+        wireless.write_text(WIRELESS.format(retry=retry))
+        sampler.sample()
+        stations["wlan0"] = StationInfo(signal=-70, tx_bitrate=72.2, tx_retries=25)
+
+    assert read_wireless(tmp_path)["wlan0"].level == -56
+    summary = sampler.summary("wlan0")
+    assert summary.nb_samples == 2
+    assert (summary.signal_avg, summary.signal_min) == (-65, -70)
+    assert summary.tx_retries == 15
+    assert summary.bitrate_text == "72/-"
+    # no data at all for wlan1
+    assert sampler.summary("wlan1").signal_text == "-"
+    assert sampler.samples("wlan0", start=sampler.samples("wlan0")[-1].on + 1) == []
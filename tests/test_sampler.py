@@ -0,0 +1,32 @@
+# pyright: strict
+from dataclasses import dataclass
+
+from testbench.utils.sampler import PeriodicSampler
+
+
+@dataclass
+class Tick:
+    on: float
+
+
+class TickSampler(PeriodicSampler[Tick]):
+    def __init__(self):
+        super().__init__(interval=1, capacity=3)
+        self.now = 0.0
+
+    def sample(self):
+        self.now += 1
+        self.record(Tick(self.now))
+        self.record(Tick(-self.now), key="negative")
+
+
+def test_ring_buffers():
+    sampler = TickSampler()
+    for _ in range(5):
+        sampler.sample()
+    # oldest samples dropped, per key
+    assert [tick.on for tick in sampler.samples()] == [3, 4, 5]
+    assert [tick.on for tick in sampler.samples("negative")] == [-3, -4, -5]
+    assert [tick.on for tick in sampler.samples(start=4)] == [4, 5]
+    assert [tick.on for tick in sampler.samples(start=3.5, end=4.5)] == [4]
+    assert sampler.samples("unknown") == []
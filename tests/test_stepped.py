@@ -0,0 +1,82 @@
+# pyright: strict
+import csv
+from pathlib import Path
+
+from testbench.jtl import GroupSummary, IfnameIndex
+from testbench.loadgen import JTL_FIELDS
+from testbench.stepped import LoadCurve, LoadStep, get_step_levels
+from testbench.utils.stats import Distribution
+
+
+def test_step_levels():
+    assert get_step_levels(10, []) == [1, 2, 4, 8, 10]
+    assert get_step_levels(8, []) == [1, 2, 4, 8]
+    assert get_step_levels(1, []) == [1]
+    assert get_step_levels(0, []) == []
+    assert get_step_levels(10, [12, 5, 0, 5, 2]) == [2, 5]
+
+
+def test_load_step(tmp_path: Path):
+    path = tmp_path / "results.csv"
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(JTL_FIELDS)
+        # one sample per 100ms from t=1000s
+        for index in range(100):
+            row = dict.fromkeys(JTL_FIELDS, "0")
+            row.update(
+                timeStamp=str(1_000_000 + index * 100),
+                elapsed=str(index),
+                label="Dashboard",
+                threadName="Users 1-1",
+                success="false" if index % 10 == 0 else "true",
+                ifname="wlan0",
+            )
+            writer.writerow([row[name] for name in JTL_FIELDS])
+
+    # warm-up of the first 2 seconds left out
+    step = LoadStep.from_results(
+        1, path, IfnameIndex(["wlan0"]), hold_from=1002, hold_to=1012
+    )
+    assert step.summary.nb_total == 80
+    assert step.summary.elapsed.min == 20
+    assert step.rate == 8
+    assert step.error_rate == 0.1
+
+
+def get_step(nb_users: int, nb_total: int, p90: float) -> LoadStep:
+    return LoadStep(
+        nb_users=nb_users,
+        hold=10,
+        summary=GroupSummary(
+            nb_success=nb_total,
+            nb_failed=0,
+            elapsed=Distribution(p90=p90),
+            latency=Distribution(),
+            connect=Distribution(),
+        ),
+        results_csv_path=Path("results.csv"),
+    )
+
+
+def test_load_curve():
+    curve = LoadCurve(
+        knee_ratio=0.25,
+        steps=[
+            get_step(1, 100, 50),
+            get_step(2, 200, 60),
+            get_step(4, 380, 90),
+            get_step(8, 420, 300),
+        ],
+    )
+    knee = curve.throughput_knee
+    assert knee and knee.nb_users == 4
+    latency_knee = curve.latency_knee
+    assert latency_knee and latency_knee.nb_users == 8
+    best = curve.best
+    assert best and best.rate == 42
+
+    # scaling all along
+    curve.steps = curve.steps[:2]
+    assert curve.throughput_knee is None
+    assert curve.latency_knee is None
@@ -0,0 +1,165 @@
+# pyright: strict
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ipaddress import IPv4Address
+from pathlib import Path
+from typing import Any, ClassVar
+
+import pytest
+
+from testbench import telemetry
+from testbench.telemetry import (
+    TargetSampler,
+    fetch_metrics,
+    parse_sections,
+    run_over_ssh,
+)
+from testbench.utils.instrumentation import CommandRecorder
+
+METRICS = """\
+# HELP node_cpu_seconds_total Seconds the CPUs spent in each mode.
+# TYPE node_cpu_seconds_total counter
+node_cpu_seconds_total{{cpu="0",mode="idle"}} {idle}
+node_cpu_seconds_total{{cpu="0",mode="user"}} {user}
+node_cpu_seconds_total{{cpu="0",mode="softirq"}} 0
+node_cpu_seconds_total{{cpu="1",mode="idle"}} {idle}
+node_cpu_seconds_total{{cpu="1",mode="user"}} {user}
+node_memory_MemTotal_bytes 4e+09
+node_memory_MemAvailable_bytes {available}
+node_load1 {load}
+node_thermal_zone_temp{{type="cpu-thermal",zone="0"}} {temperature}
+container_cpu_usage_seconds_total{{id="/system.slice",name=""}} 9999
+container_cpu_usage_seconds_total{{id="/docker/ab",name="kiwix"}} {kiwix_cpu}
+container_memory_usage_bytes{{id="/docker/ab",name="kiwix"}} {kiwix_memory}
+"""
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # values of METRICS' next scrape
+    values: ClassVar[dict[str, float]] = {}
+
+    def do_GET(self):  # noqa: N802
+        if self.path != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = METRICS.format(**MetricsHandler.values).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any):  # noqa: A002
+        pass
+
+
+@pytest.fixture
+def handler() -> type[BaseHTTPRequestHandler]:
+    return MetricsHandler
+
+
+def scrape(**values: float):
+    MetricsHandler.values = {
+        "idle": 100,
+        "user": 100,
+        "available": 3e9,
+        "load": 0.5,
+        "temperature": 50,
+        "kiwix_cpu": 10,
+        "kiwix_memory": 100e6,
+        **values,
+    }
+
+
+def test_target_sampler(server: ThreadingHTTPServer):
+    port = server.server_address[1]
+    sampler = TargetSampler(
+        source=lambda: fetch_metrics(IPv4Address("127.0.0.1"), port), interval=5
+    )
+    scrape()
+    sampler.sample()
+    # CPU usage needs a previous reading
+    (first,) = sampler.samples()
+    assert first.cpu is None
+    assert first.memory == 0.25
+    assert first.containers["kiwix"].cpu is None
+    assert "" not in first.containers
+
+    # both cores busy 3/4 of the time, memory filling up
+    scrape(idle=105, user=115, available=4e8, load=3.2, temperature=71.5)
+    sampler.sample()
+    second = sampler.samples()[-1]
+    assert second.cpu == 0.75
+    assert second.memory == 0.9
+    assert second.memory_used == 3.6e9
+    assert second.temperature == 71.5
+    assert second.containers["kiwix"].memory == 100e6
+
+    summary = sampler.summary()
+    assert summary.nb_samples == 2
+    assert summary.cpu_max == 0.75
+    assert summary.memory_max == 0.9
+    assert summary.load_max == 3.2
+    assert summary.temperature_max == 71.5
+    assert list(summary.containers) == ["kiwix"]
+    # lined up with results' timeline
+    assert sampler.summary(start=second.on).nb_samples == 1
+    assert not sampler.samples(end=first.on - 1)
+
+
+def test_fetch_metrics_failure(server: ThreadingHTTPServer):
+    port = server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    with pytest.raises(OSError):
+        fetch_metrics(IPv4Address("127.0.0.1"), port, timeout=1)
+
+
+def test_parse_sections():
+    reading = parse_sections(
+        "## stat\n"
+        "cpu  300 0 100 600 0 0 50 0 0 0\n"
+        "cpu0 300 0 100 600 0 0 50 0 0 0\n"
+        "## meminfo\n"
+        "MemTotal:       1000 kB\n"
+        "MemAvailable:    250 kB\n"
+        "## loadavg\n"
+        "1.50 0.80 0.40 2/150 4242\n"
+        "## thermal\n"
+        "48312\n"
+        "52100\n"
+        "## containers\n"
+        "kiwix\t120.50%\t12.5MiB / 1.8GiB\n"
+        "reverse-proxy\t0.10%\t3MiB / 1.8GiB\n"
+    )
+    assert reading.cpu and reading.cpu.busy == 450
+    assert reading.memory_total == 1_024_000
+    assert reading.memory_available == 256_000
+    assert reading.load == 1.5
+    assert reading.temperature == 52.1
+    assert reading.containers["kiwix"].cpu == 1.205
+    assert reading.containers["kiwix"].memory == int(12.5 * 1024**2)
+    assert reading.containers["reverse-proxy"].memory == 3 * 1024**2
+
+    # no docker on target
+    assert parse_sections("## stat\n## containers\n").containers == {}
+
+
+def test_run_over_ssh(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    ssh = tmp_path.joinpath("ssh")
+    ssh.write_text(
+        f"#!{sys.executable}\n"
+        "print('## loadavg')\n"
+        "print('0.25 0.10 0.05 1/100 42')\n"
+    )
+    ssh.chmod(0o755)
+    monkeypatch.setattr(telemetry, "SSH_BINARY", str(ssh))
+    monkeypatch.setattr(CommandRecorder, "_instance", None)
+    recorder = CommandRecorder.enable()
+
+    assert run_over_ssh(IPv4Address("127.0.0.1"), "root").load == 0.25
+    # instrumented as other external commands
+    assert recorder.get_stats()["ssh"].count == 1
@@ -0,0 +1,57 @@
+# pyright: strict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ipaddress import IPv4Address
+from typing import Any
+
+import pytest
+from conftest import make_device
+
+from testbench import throughput
+from testbench.throughput import DOWNLOAD, Target, get_ramp_levels, measure_throughput
+from testbench.utils.stats import find_knee
+
+PAYLOAD_SIZE = 1024 * 1024
+
+
+class PayloadHandler(BaseHTTPRequestHandler):
+    def do_GET(self):  # noqa: N802
+        self.send_response(200)
+        self.send_header("Content-Length", str(PAYLOAD_SIZE))
+        self.end_headers()
+        self.wfile.write(bytes(PAYLOAD_SIZE))
+
+    def log_message(self, format: str, *args: Any):  # noqa: A002
+        pass
+
+
+@pytest.fixture
+def handler() -> type[BaseHTTPRequestHandler]:
+    return PayloadHandler
+
+
+def test_find_knee():
+    assert find_knee([(1, 10), (2, 20), (3, 30)], 0.25) is None
+    assert find_knee([(1, 10), (2, 20), (3, 21), (4, 21)], 0.25) == (2, 20)
+    assert get_ramp_levels(5, 2) == [2, 4, 5]
+    assert Target.from_url("http://host:8080/file?a=1").path == "/file?a=1"
+
+
+def test_measure_download(server: ThreadingHTTPServer, monkeypatch: Any):
+    monkeypatch.setattr(throughput, "WARMUP", 0.1)
+    device = make_device(address="127.0.0.1")
+    level = measure_throughput(
+        [device],
+        Target(host="127.0.0.1", port=server.server_address[1], path="/"),
+        direction=DOWNLOAD,
+        duration=0.5,
+        dns_server=IPv4Address("127.0.0.1"),
+    )
+    stream = level.streams[0]
+    if "not permitted" in stream.error:
+        pytest.skip(f"Unable to bind to interface: {stream.error}")
+    assert not stream.error
+    # payloads are downloaded back-to-back until deadline
+    assert stream.nb_requests >= 1
+    assert stream.nb_bytes >= PAYLOAD_SIZE * (stream.nb_requests - 1)
+    assert level.mbps > 0
+    assert sum(stream.buckets) == stream.nb_bytes
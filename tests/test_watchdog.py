@@ -0,0 +1,65 @@
+# pyright: strict
+import signal
+import subprocess
+import time
+from pathlib import Path
+
+from conftest import FakeClock
+
+from testbench.utils.procfs import get_parent_pids, get_process_tree
+from testbench.watchdog import StallWatchdog
+
+
+def test_parent_pids(tmp_path: Path):
+    tmp_path.joinpath("12").mkdir()
+    tmp_path.joinpath("12", "stat").write_text("12 (a) b) S 7 12 12 0 -1\n")
+    tmp_path.joinpath("self").mkdir()
+    assert get_parent_pids(tmp_path) == {12: 7}
+
+
+def test_stall_watchdog(tmp_path: Path):
+    ps = subprocess.Popen(["/bin/sh", "-c", "sleep 30 & wait"])
+    try:
+        deadline = time.monotonic() + 5
+        while len(get_process_tree(ps.pid)) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(get_process_tree(ps.pid)) == 2
+
+        results = tmp_path.joinpath("results.csv")
+        clock = FakeClock()
+        watchdog = StallWatchdog(
+            ps.pid, results, timeout=60, grace=10, probe=lambda: False, clock=clock
+        )
+        results.write_text("header\n")
+        watchdog.check()
+        clock.now = 59
+        watchdog.check()
+        assert watchdog.level == 0
+
+        # thread dump only (no JVM here): still running
+        clock.now = 61
+        watchdog.check()
+        assert watchdog.level == 1
+        assert not watchdog.stalled
+        assert ps.poll() is None
+
+        # progress cancels escalation
+        results.write_text("header\nrow\n")
+        watchdog.check()
+        assert watchdog.level == 0
+
+        clock.now = 200
+        watchdog.check()
+        clock.now = 205
+        watchdog.check()
+        assert watchdog.level == 1
+        clock.now = 211
+        watchdog.check()
+        assert watchdog.stalled
+        assert watchdog.reachable is False
+        assert "SIGTERM" in watchdog.verdict
+        assert "unreachable" in watchdog.verdict
+        assert ps.wait(timeout=5) == -signal.SIGTERM
+    finally:
+        ps.kill()
+        ps.wait()
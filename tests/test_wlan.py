@@ -0,0 +1,203 @@
+# pyright: strict
+import threading
+import time
+from typing import Any
+
+import pytest
+
+from testbench.utils import wlan
+
+
+class FakeNMDevice:
+    def __init__(self, entries: list[dict[str, str | None]]) -> None:
+        self.entries = entries
+        self.calls: list[str] = []
+
+    def show_all(self, fields: str) -> list[dict[str, str | None]]:  # noqa: ARG002
+        self.calls.append("show_all")
+        return [dict(entry) for entry in self.entries]
+
+    def show(self, ifname: str, fields: str) -> dict[str, str | None]:  # noqa: ARG002
+        self.calls.append(f"show {ifname}")
+        return next(dict(e) for e in self.entries if e["GENERAL.DEVICE"] == ifname)
+
+
+def entry(ifname: str, vendor: str, kind: str = "wifi") -> dict[str, str | None]:
+    return {
+        "GENERAL.DEVICE": ifname,
+        "GENERAL.TYPE": kind,
+        "GENERAL.HWADDR": "7C:C2:C6:1B:09:60",
+        "GENERAL.MTU": "1500",
+        "GENERAL.STATE": "30 (disconnected)",
+        "GENERAL.CONNECTION": None,
+        "GENERAL.CON-PATH": None,
+        "GENERAL.VENDOR": vendor,
+    }
+
+
+@pytest.fixture
+def nmdevice(monkeypatch: Any) -> FakeNMDevice:
+    fake = FakeNMDevice(
+        [
+            entry("wlan10", "Realtek"),
+            entry("eth0", "Broadcom Corp.", kind="ethernet"),
+            entry("wlan0", "Broadcom Corp."),
+            entry("wlan2", "Realtek"),
+        ]
+    )
+    monkeypatch.setattr(wlan, "nmdevice", fake)
+    monkeypatch.setattr(wlan.DeviceInventory, "_instance", None)
+    return fake
+
+
+def test_inventory_single_snapshot(nmdevice: FakeNMDevice):
+    devices = wlan.get_wireless_devices(
+        excluding_ifnames=[],
+        excluding_vendors=["broadcom*"],
+        excluding_hwaddrs=[],
+        max_devices=0,
+    )
+    assert list(devices.keys()) == ["wlan2", "wlan10"]
+    some = wlan.get_some_wireless_devices(ifnames=["wlan10"])
+    assert some["wlan10"] is devices["wlan10"]
+    assert [dev.ifname for dev in wlan.DeviceInventory.get().all] == [
+        "wlan0",
+        "wlan2",
+        "wlan10",
+    ]
+    assert nmdevice.calls == ["show_all"]
+
+
+def test_inventory_invalidates_changed_only(nmdevice: FakeNMDevice):
+    inventory = wlan.DeviceInventory.get()
+    device = inventory.select(["wlan2"])["wlan2"]
+    nmdevice.entries[3]["GENERAL.CONNECTION"] = "testbench 2"
+    inventory.invalidate(["wlan2"])
+    assert inventory.select(["wlan2"])["wlan2"] is device
+    assert device.connection == "testbench 2"
+    assert nmdevice.calls == ["show_all", "show wlan2"]
+
+
+def test_disconnect_devices_reports_failures(
+    nmdevice: FakeNMDevice, monkeypatch: Any  # noqa: ARG001
+):
+    commands: list[list[str]] = []
+
+    def run_command(args: list[str], timeout: float | None = None):  # noqa: ARG001
+        commands.append(args)
+        if args[1] == "connection":
+            # stale profile
+            return wlan.CompletedProcess(args=args, returncode=10, stdout="unknown")
+        if args[-1] == "wlan2":
+            # deactivated with its (deleted) connection
+            return wlan.CompletedProcess(
+                args=args, returncode=6, stdout="Error: Device 'wlan2' not active"
+            )
+        failed = args[-1] == "wlan10"
+        return wlan.CompletedProcess(
+            args=args, returncode=4 if failed else 0, stdout="boom" if failed else ""
+        )
+
+    monkeypatch.setattr(wlan, "run_command", run_command)
+    devices = wlan.DeviceInventory.get().all
+    devices[1].state = devices[2].state = "100 (connected)"
+    devices[1].connection = "testbench 2"
+
+    report = wlan.disconnect_devices(devices, max_workers=4, timeout=1)
+    assert report.nb_skipped == 1
+    assert report.failures == {"wlan10": "4: boom"}
+    assert sorted(commands) == [
+        ["nmcli", "connection", "delete", "id", "testbench 2"],
+        ["nmcli", "device", "disconnect", "wlan10"],
+        ["nmcli", "device", "disconnect", "wlan2"],
+    ]
+
+
+def test_launch_stagger():
+    stagger = wlan.LaunchStagger(0.05)
+    launches: list[float] = []
+    lock = threading.Lock()
+
+    def launch():
+        stagger.wait()
+        with lock:
+            launches.append(time.monotonic())
+
+    threads = [threading.Thread(target=launch) for _ in range(4)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # nth launch no sooner than n delays after the first one
+    launches.sort()
+    for index, launch_time in enumerate(launches):
+        assert launch_time - start >= index * 0.05 - 0.001
+
+    # no delay, no wait
+    start = time.monotonic()
+    for _ in range(10):
+        wlan.LaunchStagger(0).wait()
+    assert time.monotonic() - start < 0.05
+
+
+@pytest.fixture
+def connect_results(monkeypatch: Any) -> dict[str, list[int]]:
+    """returncodes of each ifname's successive associations (raising once out)"""
+    results: dict[str, list[int]] = {}
+
+    def connect_device(
+        ifname: str, *, ssid: str, passphrase: str | None  # noqa: ARG001
+    ) -> wlan.CompletedProcess:
+        if not results[ifname]:
+            raise OSError("no more attempts")
+        returncode = results[ifname].pop(0)
+        return wlan.CompletedProcess(
+            args=[], returncode=returncode, stdout="boom" if returncode else ""
+        )
+
+    monkeypatch.setattr(wlan, "connect_device", connect_device)
+    return results
+
+
+@pytest.mark.usefixtures("nmdevice")
+def test_connect_with_retries(connect_results: dict[str, list[int]]):
+    connect_results["wlan2"] = [4, 0]
+    conn = wlan.connect_with_retries(
+        "wlan2", ssid="", passphrase=None, retries=2, stagger=wlan.LaunchStagger(0)
+    )
+    assert conn.succeeded
+    assert conn.attempts == 2
+    assert conn.feedback == ""
+
+    # retries exhausted
+    connect_results["wlan2"] = [4, 4, 10, 0]
+    conn = wlan.connect_with_retries(
+        "wlan2", ssid="", passphrase=None, retries=2, stagger=wlan.LaunchStagger(0)
+    )
+    assert not conn.succeeded
+    assert conn.attempts == 3
+    assert conn.feedback == "10: boom"
+    assert connect_results["wlan2"] == [0]
+
+
+@pytest.mark.usefixtures("nmdevice")
+def test_connect_devices(connect_results: dict[str, list[int]]):
+    connect_results.update({"wlan2": [4, 0], "wlan10": [4, 4], "wlan0": []})
+    report = wlan.connect_devices(
+        ["wlan2", "wlan10", "wlan0"],
+        ssid="",
+        passphrase=None,
+        parallelism=2,
+        stagger=0.01,
+        retries=1,
+    )
+    assert report.connected == ["wlan2"]
+    assert report.failed == ["wlan10", "wlan0"]
+    assert report.connections["wlan2"].attempts == 2
+    assert report.connections["wlan10"].attempts == 2
+    assert report.connections["wlan10"].feedback == "4: boom"
+    # raising device is reported, others not aborted
+    assert report.connections["wlan0"].feedback == "no more attempts"
+    # 5 staggered launches
+    assert report.duration >= 0.035